@@ -0,0 +1,43 @@
+"""Сравнение двух прогонов benchmarks.run: python -m benchmarks.compare old.json new.json"""
+import argparse
+import json
+from typing import Sequence
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "rps")
+
+
+def _delta(old: float, new: float) -> str:
+    if not old:
+        return "—"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def compare(old: dict, new: dict) -> None:
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    for mode, results in new["runs"].items():
+        previous = old["runs"].get(mode, {})
+        if "skipped" in results or "skipped" in previous:
+            continue
+        print(f"\n[cache {mode}]")
+        print(f"{'endpoint':<28}" + "".join(f"{m:>29}" for m in METRICS))
+        for name, stats in results.items():
+            before = previous.get(name)
+            if before is None:
+                continue
+            cells = "".join(
+                f"{before[m]:>10.1f} → {stats[m]:<8.1f}{_delta(before[m], stats[m]):>8}" for m in METRICS
+            )
+            print(f"{name:<28}{cells}")
+
+
+def parse_args(argv: Sequence[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Сравнение результатов нагрузочных прогонов")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    with open(args.old, encoding="utf-8") as f_old, open(args.new, encoding="utf-8") as f_new:
+        compare(json.load(f_old), json.load(f_new))
@@ -0,0 +1,240 @@
+"""Нагрузочный прогон по реальным роутерам.
+
+Запуск из каталога backend после benchmarks.seed:
+
+    python -m benchmarks.run --requests 500 --concurrency 16 --cache both
+
+По умолчанию приложение поднимается в процессе (httpx.ASGITransport, с lifespan),
+и кэш включается/выключается подменой cache_manager.redis. С --base-url запросы
+идут в уже запущенный сервер — тогда режим кэша определяется его настройками.
+Результат — JSON в benchmarks/results/<время>-<коммит>.json; два файла можно
+сравнить через benchmarks.compare.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from math import ceil
+from typing import Callable, Dict, List, Optional, Sequence
+
+import httpx
+from sqlalchemy import text
+
+from benchmarks.seed import BENCH_PASSWORD, EMAIL_DOMAIN
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+PERCENTILES = (50, 95, 99)
+
+
+@dataclass
+class Scenario:
+    name: str
+    path: Callable[[random.Random], str]
+
+
+def _window(rng: random.Random) -> str:
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=rng.randrange(0, 14))
+    return f"from={start.isoformat()}&to={(start + timedelta(days=7)).isoformat()}"
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario("users.me", lambda rng: "/users/me"),
+    Scenario("clients.list", lambda rng: "/clients/"),
+    Scenario("properties.list", lambda rng: "/properties/"),
+    Scenario("properties.filter", lambda rng: f"/properties/filter?min_rooms={rng.randint(1, 4)}&active=true"),
+    Scenario("appointments.list", lambda rng: "/appointments/"),
+    Scenario("appointments.occurrences", lambda rng: f"/appointments/occurrences?{_window(rng)}"),
+    Scenario("appointments.availability", lambda rng: f"/appointments/availability?{_window(rng)}"),
+    Scenario("deals.list", lambda rng: "/deals/"),
+    Scenario("deals.commissions", lambda rng: "/deals/reports/commissions"),
+    Scenario("documents.list", lambda rng: "/documents/?limit=50"),
+    Scenario("documents.search", lambda rng: f"/documents/search?q={rng.choice(['договор', 'паспорт', 'выписка', 'акт'])}"),
+    Scenario("search.typeahead", lambda rng: f"/search?q={rng.choice(['Ива', 'Смир', 'Кузн', 'Попо', 'Лени', 'Гага'])}"),
+]
+
+
+def percentile(sorted_values: Sequence[float], p: float) -> float:
+    """Перцентиль по ближайшему рангу — без интерполяции, как в большинстве нагрузочных отчётов."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], statuses: Dict[int, int], errors: int, elapsed: float) -> dict:
+    values = sorted(latencies)
+    result = {
+        "requests": len(values),
+        "rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "errors": errors,
+    }
+    for p in PERCENTILES:
+        result[f"p{p}_ms"] = round(percentile(values, p) * 1000, 3)
+    return result
+
+
+async def run_scenario(
+    scenario: Scenario,
+    clients: List[httpx.AsyncClient],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    rng: random.Random,
+) -> dict:
+    for i in range(warmup):
+        await clients[i % len(clients)].get(scenario.path(rng))
+
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker(n: int) -> None:
+        nonlocal errors
+        client = clients[n % len(clients)]
+        for _ in remaining:
+            path = scenario.path(rng)
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    return summarize(latencies, statuses, errors, time.perf_counter() - started)
+
+
+async def bench_emails(limit: int, tag: Optional[str]) -> List[str]:
+    from src.database import new_session
+
+    pattern = f"bench-{tag}-%@{EMAIL_DOMAIN}" if tag else f"bench-%@{EMAIL_DOMAIN}"
+    async with new_session() as s:
+        rows = await s.execute(
+            text("SELECT email FROM users WHERE email LIKE :pattern AND NOT is_admin ORDER BY id DESC LIMIT :limit"),
+            {"pattern": pattern, "limit": limit},
+        )
+        return [row.email for row in rows]
+
+
+async def login(client: httpx.AsyncClient, email: str) -> None:
+    response = await client.post("/users/login", json={"email": email, "password": BENCH_PASSWORD})
+    response.raise_for_status()
+
+
+async def redis_alive(redis) -> bool:
+    if redis is None:
+        return False
+    try:
+        return bool(await redis.ping())
+    except Exception:
+        return False
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    scenarios = [s for s in SCENARIOS if not args.only or s.name in args.only]
+
+    emails = await bench_emails(args.users, args.tag)
+    if not emails:
+        raise SystemExit("Нет пользователей bench-*; сначала запустите python -m benchmarks.seed")
+
+    report = {
+        "commit": git_commit(),
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "target": args.base_url or "asgi",
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "users": len(emails),
+        "runs": {},
+    }
+
+    async with AsyncExitStack() as stack:
+        if args.base_url:
+            transport, base_url, cache_manager = None, args.base_url, None
+        else:
+            from src.cache import cache_manager
+            from src.main import app
+
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            transport, base_url = httpx.ASGITransport(app=app), "http://bench"
+
+        clients = []
+        for email in emails:
+            client = await stack.enter_async_context(
+                httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout)
+            )
+            await login(client, email)
+            clients.append(client)
+
+        modes = ["on", "off"] if args.cache == "both" else [args.cache]
+        for mode in modes:
+            redis = cache_manager.redis if cache_manager else None
+            if cache_manager is not None:
+                if mode == "on" and not await redis_alive(redis):
+                    report["runs"][mode] = {"skipped": "Redis недоступен"}
+                    continue
+                if mode == "off":
+                    cache_manager.redis = None
+            try:
+                results = {}
+                for scenario in scenarios:
+                    results[scenario.name] = await run_scenario(
+                        scenario, clients, args.requests, args.concurrency, args.warmup, rng
+                    )
+                    print(f"[cache {mode}] {scenario.name}: {results[scenario.name]}")
+                report["runs"][mode] = results
+            finally:
+                if cache_manager is not None:
+                    cache_manager.redis = redis
+
+    return report
+
+
+def parse_args(argv: Sequence[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон по эндпоинтам API")
+    parser.add_argument("--requests", type=int, default=200, help="Запросов на эндпоинт")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=10, help="Запросов прогрева перед замером")
+    parser.add_argument("--users", type=int, default=8, help="Сколько засеянных агентов логинится")
+    parser.add_argument("--tag", default=None, help="Метка набора из benchmarks.seed")
+    parser.add_argument("--cache", choices=["on", "off", "both"], default="both")
+    parser.add_argument("--only", nargs="*", help="Имена сценариев, например deals.list search.typeahead")
+    parser.add_argument("--base-url", default=None, help="Адрес запущенного сервера вместо прогона в процессе")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Файл результата; по умолчанию benchmarks/results/")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(main(args))
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{report['commit'] or 'nogit'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результат: {output}")
@@ -0,0 +1,287 @@
+"""Заполнение локальной базы синтетическими данными для нагрузочных прогонов.
+
+Запуск из каталога backend:
+
+    python -m benchmarks.seed --users 20 --clients-per-user 200
+
+Данные пишутся в базу из настроек (.env) через COPY одной транзакцией.
+Пользователи получают почту bench-<tag>-<n>@bench.example.com и общий пароль —
+по ним benchmarks.run логинится. Без --force база должна называться *bench*,
+чтобы случайно не засеять рабочую.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Sequence
+
+import asyncpg
+
+from src.config import settings
+from src.my_types import AppointmentType, ClientType, DealOperationType, DealType, PropertyType
+from src.users.auth import get_password_hash
+
+BENCH_PASSWORD = "bench-password"
+EMAIL_DOMAIN = "bench.example.com"
+
+FIRST_NAMES = ["Иван", "Анна", "Сергей", "Мария", "Алексей", "Елена", "Дмитрий", "Ольга", "Никита", "Татьяна"]
+LAST_NAMES = ["Иванов", "Смирнова", "Кузнецов", "Попова", "Соколов", "Лебедева", "Козлов", "Новикова", "Морозов", "Волкова"]
+STREETS = ["Ленина", "Гагарина", "Мира", "Советская", "Садовая", "Лесная", "Школьная", "Набережная", "Заводская", "Полевая"]
+MIME_TYPES = [("pdf", "application/pdf"), ("docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"), ("jpg", "image/jpeg")]
+
+
+@dataclass
+class Volumes:
+    users: int = 10
+    clients_per_user: int = 100
+    properties_per_client: float = 0.6
+    max_photos: int = 8
+    appointments_per_property: float = 2.0
+    deals_per_property: float = 0.15
+    documents_per_client: float = 1.5
+    admins: int = 1
+
+
+def _count(rng: random.Random, mean: float) -> int:
+    """Целое число со средним mean: дробная часть добирается случайно."""
+    whole = int(mean)
+    return whole + (1 if rng.random() < mean - whole else 0)
+
+
+async def _reserve_ids(conn: asyncpg.Connection, table: str, n: int) -> List[int]:
+    """id из последовательности таблицы — чтобы ссылаться на строки до COPY."""
+    if n == 0:
+        return []
+    rows = await conn.fetch(
+        "SELECT nextval(pg_get_serial_sequence($1, 'id')) FROM generate_series(1, $2)", table, n
+    )
+    return [row[0] for row in rows]
+
+
+# Номер строится из id строки: id из последовательности не повторяются, поэтому
+# повторный прогон с другим --tag не упирается в уникальность phone_number
+USER_PHONE_PREFIX, CLIENT_PHONE_PREFIX = 900, 901
+
+
+def _phone(prefix: int, row_id: int) -> str:
+    return f"+7{prefix:03d}{row_id:07d}"
+
+
+async def seed(conn: asyncpg.Connection, volumes: Volumes, tag: str, rng: random.Random) -> Dict[str, int]:
+    now = datetime.now(timezone.utc)
+    password = get_password_hash(BENCH_PASSWORD)
+
+    user_ids = await _reserve_ids(conn, "users", volumes.users)
+    users = [
+        (uid, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), _phone(USER_PHONE_PREFIX, uid),
+         f"bench-{tag}-{n}@{EMAIL_DOMAIN}", password, True, True, n < volumes.admins, now)
+        for n, uid in enumerate(user_ids)
+    ]
+
+    clients, owners = [], {}
+    client_ids = await _reserve_ids(conn, "clients", volumes.users * volumes.clients_per_user)
+    for n, cid in enumerate(client_ids):
+        uid = user_ids[n // volumes.clients_per_user]
+        created = now - timedelta(days=rng.randrange(0, 730), minutes=rng.randrange(0, 1440))
+        clients.append((
+            cid, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), _phone(CLIENT_PHONE_PREFIX, cid),
+            f"client-{tag}-{n}@{EMAIL_DOMAIN}", None, rng.choice(list(ClientType)).value, created, created, uid,
+        ))
+        owners[cid] = uid
+
+    property_owner = [cid for cid in client_ids for _ in range(_count(rng, volumes.properties_per_client))]
+    property_ids = await _reserve_ids(conn, "properties", len(property_owner))
+    properties = []
+    for pid, cid in zip(property_ids, property_owner):
+        photos = [f"{pid}_{i}.jpg" for i in range(rng.randint(0, volumes.max_photos))]
+        rooms = rng.randint(1, 5)
+        created = now - timedelta(days=rng.randrange(0, 730))
+        properties.append((
+            pid, f"Объект {pid}: {rooms}-комн., {rng.choice(['свежий ремонт', 'без ремонта', 'у метро', 'с видом на парк'])}",
+            rng.choice(list(PropertyType)).value, rng.random() < 0.9, rng.random() < 0.3,
+            f"ул. {rng.choice(STREETS)}, д. {rng.randint(1, 150)}, кв. {rng.randint(1, 300)}",
+            float(rng.randrange(2_000_000, 40_000_000, 10_000)), round(rng.uniform(20, 200), 1), rooms,
+            cid, json.dumps(photos), created, created,
+        ))
+
+    # Показы каждого агента идут друг за другом в рабочее время — ограничения на пересечение не срабатывают
+    appointments, cursor = [], {}
+    user_clients: Dict[int, List[int]] = {}
+    for cid in client_ids:
+        user_clients.setdefault(owners[cid], []).append(cid)
+    start = (now - timedelta(days=60)).replace(hour=6, minute=0, second=0, microsecond=0)
+    for pid, cid in zip(property_ids, property_owner):
+        uid = owners[cid]
+        for _ in range(_count(rng, volumes.appointments_per_property)):
+            slot = cursor.get(uid, 0)
+            cursor[uid] = slot + 1
+            meeting = start + timedelta(days=slot // 8, hours=slot % 8)
+            status = AppointmentType.COMPLETED if meeting < now else AppointmentType.SCHEDULED
+            if rng.random() < 0.1:
+                status = AppointmentType.CANCELED
+            appointments.append((
+                pid, rng.choice(user_clients[uid]), uid, status.value, meeting, 60, None, meeting - timedelta(days=3),
+            ))
+
+    deals = []
+    for pid, cid in zip(property_ids, property_owner):
+        for _ in range(_count(rng, volumes.deals_per_property)):
+            uid = owners[cid]
+            amount = float(rng.randrange(2_000_000, 40_000_000, 10_000))
+            agency_rate, agent_rate = rng.choice([2, 3, 4]), rng.choice([40, 50, 60])
+            agency = round(amount * agency_rate / 100, 2)
+            operation = rng.choice(list(DealOperationType))
+            seller, buyer = (cid, None) if operation == DealOperationType.SALE else (None, rng.choice(user_clients[uid]))
+            deal_date = (now - timedelta(days=rng.randrange(0, 365))).replace(tzinfo=None)
+            deals.append((
+                pid, operation.value, buyer, None if buyer else "Внешний покупатель",
+                seller, None if seller else "Внешний продавец", amount, 0.0,
+                agency_rate, agency, agent_rate, round(agency * agent_rate / 100, 2),
+                uid, deal_date, rng.choice(list(DealType)).value, now,
+            ))
+
+    documents = []
+    for cid in client_ids:
+        for _ in range(_count(rng, volumes.documents_per_client)):
+            ext, mime = rng.choice(MIME_TYPES)
+            name = f"{rng.choice(['Договор', 'Паспорт', 'Выписка ЕГРН', 'Акт'])} {cid}.{ext}"
+            created = now - timedelta(days=rng.randrange(0, 365))
+            documents.append((
+                f"bench-{tag}-{len(documents)}.{ext}", name, f"bench/{tag}/{len(documents)}.{ext}",
+                rng.randrange(10_000, 5_000_000), mime, cid, owners[cid], created,
+            ))
+
+    await conn.copy_records_to_table(
+        "users", records=users,
+        columns=["id", "first_name", "last_name", "phone_number", "email", "password",
+                 "is_active", "is_user", "is_admin", "created_at"],
+    )
+    await conn.copy_records_to_table(
+        "clients", records=clients,
+        columns=["id", "first_name", "last_name", "phone_number", "email", "notes", "type",
+                 "created_at", "updated_at", "user_id"],
+    )
+    await conn.copy_records_to_table(
+        "properties", records=properties,
+        columns=["id", "description", "type", "is_active", "is_for_viewing", "address", "price", "area",
+                 "rooms", "owner_id", "photos", "created_at", "updated_at"],
+    )
+    await conn.copy_records_to_table(
+        "appointments", records=appointments,
+        columns=["property_id", "client_id", "user_id", "type", "meeting_time", "duration_minutes",
+                 "notes", "created_at"],
+    )
+    await conn.copy_records_to_table(
+        "deals", records=deals,
+        columns=["property_id", "operation_type", "buyer_id", "buyer_name", "seller_id", "seller_name",
+                 "deal_amount", "fixed_payment", "agency_commission_rate", "agency_commission_amount",
+                 "agent_commission_rate", "agent_commission_amount", "user_id", "deal_date", "type", "created_at"],
+    )
+    # Документы без папки и без blob: индексатору и счётчикам папок здесь работы нет
+    await conn.copy_records_to_table(
+        "documents", records=documents,
+        columns=["filename", "original_filename", "file_path", "file_size", "mime_type", "client_id",
+                 "uploaded_by", "created_at"],
+    )
+    await conn.execute("UPDATE documents SET indexed_at = now() WHERE file_path LIKE $1", f"bench/{tag}/%")
+
+    return {
+        "users": len(users),
+        "clients": len(clients),
+        "properties": len(properties),
+        "appointments": len(appointments),
+        "deals": len(deals),
+        "documents": len(documents),
+    }
+
+
+PURGE_STATEMENTS = (
+    "DELETE FROM documents WHERE uploaded_by = ANY($1::int[])",
+    "DELETE FROM deals WHERE user_id = ANY($1::int[])",
+    "DELETE FROM appointments WHERE user_id = ANY($1::int[])",
+    "DELETE FROM properties WHERE owner_id IN (SELECT id FROM clients WHERE user_id = ANY($1::int[]))",
+    "DELETE FROM clients WHERE user_id = ANY($1::int[])",
+    "DELETE FROM users WHERE id = ANY($1::int[])",
+)
+
+
+async def purge(conn: asyncpg.Connection, tag: str) -> int:
+    """Удаляет набор с меткой tag (или все наборы при tag='*') вместе с зависимыми строками."""
+    pattern = f"bench-%@{EMAIL_DOMAIN}" if tag == "*" else f"bench-{tag}-%@{EMAIL_DOMAIN}"
+    user_ids = [row[0] for row in await conn.fetch("SELECT id FROM users WHERE email LIKE $1", pattern)]
+    async with conn.transaction():
+        for statement in PURGE_STATEMENTS:
+            await conn.execute(statement, user_ids)
+    return len(user_ids)
+
+
+async def connect() -> asyncpg.Connection:
+    return await asyncpg.connect(
+        user=settings.DB_USER, password=settings.DB_PASSWORD,
+        host=settings.DB_HOST, port=settings.DB_PORT, database=settings.DB_NAME,
+    )
+
+
+async def main(volumes: Volumes, tag: str, random_seed: int) -> None:
+    conn = await connect()
+    try:
+        started = time.perf_counter()
+        async with conn.transaction():
+            counts = await seed(conn, volumes, tag, random.Random(random_seed))
+        await conn.execute("ANALYZE users, clients, properties, appointments, deals, documents")
+    finally:
+        await conn.close()
+    print(json.dumps({
+        "tag": tag,
+        "volumes": asdict(volumes),
+        "rows": counts,
+        "seconds": round(time.perf_counter() - started, 2),
+    }, ensure_ascii=False, indent=2))
+
+
+def parse_args(argv: Sequence[str] = None) -> argparse.Namespace:
+    defaults = Volumes()
+    parser = argparse.ArgumentParser(description="Синтетические данные для нагрузочных прогонов")
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--clients-per-user", type=int, default=defaults.clients_per_user)
+    parser.add_argument("--properties-per-client", type=float, default=defaults.properties_per_client)
+    parser.add_argument("--max-photos", type=int, default=defaults.max_photos)
+    parser.add_argument("--appointments-per-property", type=float, default=defaults.appointments_per_property)
+    parser.add_argument("--deals-per-property", type=float, default=defaults.deals_per_property)
+    parser.add_argument("--documents-per-client", type=float, default=defaults.documents_per_client)
+    parser.add_argument("--admins", type=int, default=defaults.admins)
+    parser.add_argument("--tag", default=None, help="Метка набора в почте пользователей; по умолчанию — время запуска")
+    parser.add_argument("--seed", type=int, default=42, help="Зерно генератора для воспроизводимых наборов")
+    parser.add_argument("--force", action="store_true", help="Разрешить базу, в имени которой нет 'bench'")
+    parser.add_argument("--purge", metavar="TAG", default=None, help="Удалить набор с этой меткой ('*' — все) и выйти")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if "bench" not in settings.DB_NAME and not args.force:
+        raise SystemExit(f"База {settings.DB_NAME} не похожа на стенд для нагрузки; добавьте --force")
+    if args.purge:
+        async def run_purge() -> None:
+            conn = await connect()
+            try:
+                print(f"Удалено пользователей: {await purge(conn, args.purge)}")
+            finally:
+                await conn.close()
+
+        asyncio.run(run_purge())
+        raise SystemExit(0)
+    volumes = Volumes(
+        users=args.users,
+        clients_per_user=args.clients_per_user,
+        properties_per_client=args.properties_per_client,
+        max_photos=args.max_photos,
+        appointments_per_property=args.appointments_per_property,
+        deals_per_property=args.deals_per_property,
+        documents_per_client=args.documents_per_client,
+        admins=args.admins,
+    )
+    asyncio.run(main(volumes, args.tag or datetime.now().strftime("%Y%m%d%H%M%S"), args.seed))
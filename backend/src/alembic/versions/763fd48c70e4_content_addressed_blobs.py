@@ -0,0 +1,160 @@
+"""Content addressed blobs
+
+Revision ID: 763fd48c70e4
+Revises: 09ab409c69be
+Create Date: 2026-01-20 14:12:37.418205
+
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = '763fd48c70e4'
+down_revision: Union[str, Sequence[str], None] = '09ab409c69be'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Каталог, в котором фото объектов хранились до перехода на блобы
+LEGACY_PROPERTY_PHOTOS_DIR = Path(settings.LEGACY_PROPERTY_PHOTOS_DIR)
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+BLOBS_DIR = Path(settings.STORAGE_DIR) / "blobs"
+
+
+def _hash_file(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(64 * 1024):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _copy_to_store(bind, path: Path) -> str:
+    """Кладёт копию файла в хранилище блобов; оригинал остаётся на месте до коммита миграции.
+
+    Исходные файлы записываются в legacy_files и удаляются отдельно — python -m src.storage.legacy,
+    иначе при откате миграции строки documents указывали бы на уже перенесённые файлы.
+    """
+    sha256 = _hash_file(path)
+    size = path.stat().st_size
+    target = BLOBS_DIR / sha256[:2] / sha256[2:4] / sha256
+
+    if not target.exists():
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_name(f"{sha256}.{uuid.uuid4().hex}.tmp")
+        try:
+            try:
+                # Жёсткая ссылка не копирует данные, но возможна только на том же устройстве
+                os.link(path, tmp_path)
+            except OSError:
+                shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, target)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    bind.execute(
+        sa.text("INSERT INTO legacy_files (path, sha256) VALUES (:path, :sha256) ON CONFLICT (path) DO NOTHING"),
+        {"path": str(path.resolve()), "sha256": sha256},
+    )
+    bind.execute(
+        sa.text(
+            "INSERT INTO blobs (sha256, size, ref_count) VALUES (:sha256, :size, 1) "
+            "ON CONFLICT (sha256) DO UPDATE SET ref_count = blobs.ref_count + 1"
+        ),
+        {"sha256": sha256, "size": size},
+    )
+    return sha256
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'blobs',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('sha256')
+    )
+    op.create_index(op.f('ix_blobs_created_at'), 'blobs', ['created_at'], unique=False)
+    op.create_table(
+        'legacy_files',
+        sa.Column('path', sa.Text(), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.PrimaryKeyConstraint('path')
+    )
+    op.add_column('documents', sa.Column('sha256', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_documents_sha256'), 'documents', ['sha256'], unique=False)
+    op.create_foreign_key(None, 'documents', 'blobs', ['sha256'], ['sha256'])
+
+    # Копирование существующих файлов в хранилище блобов
+    bind = op.get_bind()
+
+    documents = bind.execute(sa.text("SELECT id, filename, file_path FROM documents")).all()
+    for doc_id, filename, file_path in documents:
+        path = Path(file_path)
+        if not path.is_file():
+            continue
+        sha256 = _copy_to_store(bind, path)
+        bind.execute(
+            sa.text(
+                "UPDATE documents SET sha256 = :sha256, file_path = :file_path, filename = :filename "
+                "WHERE id = :id"
+            ),
+            {
+                "id": doc_id,
+                "sha256": sha256,
+                "file_path": f"{sha256[:2]}/{sha256[2:4]}/{sha256}",
+                "filename": f"{sha256}{Path(filename).suffix.lower()}",
+            },
+        )
+
+    properties = bind.execute(sa.text("SELECT id, photos FROM properties WHERE photos IS NOT NULL")).all()
+    missing = 0
+    for property_id, photos in properties:
+        if isinstance(photos, str):
+            photos = json.loads(photos)
+        new_photos = []
+        for photo in photos or []:
+            path = LEGACY_PROPERTY_PHOTOS_DIR / photo
+            if path.is_file():
+                sha256 = _copy_to_store(bind, path)
+                photo = f"{sha256}{Path(photo).suffix.lower()}"
+            else:
+                missing += 1
+            new_photos.append(photo)
+        bind.execute(
+            sa.text("UPDATE properties SET photos = CAST(:photos AS JSON) WHERE id = :id"),
+            {"id": property_id, "photos": json.dumps(new_photos)},
+        )
+    if missing:
+        logger.warning(
+            "Не найдено %s фото объектов в %s (LEGACY_PROPERTY_PHOTOS_DIR), они не перенесены в хранилище",
+            missing, LEGACY_PROPERTY_PHOTOS_DIR,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema.
+
+    Файлы остаются в хранилище блобов: пути документов и имена фото не восстанавливаются.
+    """
+    op.drop_table('legacy_files')
+    op.drop_constraint('documents_sha256_fkey', 'documents', type_='foreignkey')
+    op.drop_index(op.f('ix_documents_sha256'), table_name='documents')
+    op.drop_column('documents', 'sha256')
+    op.drop_index(op.f('ix_blobs_created_at'), table_name='blobs')
+    op.drop_table('blobs')
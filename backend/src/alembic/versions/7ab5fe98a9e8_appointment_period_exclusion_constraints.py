@@ -0,0 +1,77 @@
+"""Appointment period exclusion constraints
+
+Revision ID: 7ab5fe98a9e8
+Revises: 1ab1a8e46e3b
+Create Date: 2026-10-19 08:30:42.927677
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7ab5fe98a9e8'
+down_revision: Union[str, Sequence[str], None] = '1ab1a8e46e3b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = "type <> 'ОТМЕНЕНО'"
+
+
+def _check_overlaps(bind) -> None:
+    """Ограничения не создать поверх уже пересекающихся показов — их нужно развести вручную."""
+    for column in ("user_id", "property_id"):
+        conflicts = bind.execute(sa.text(
+            f"SELECT a.id, b.id FROM appointments a JOIN appointments b "
+            f"ON a.{column} = b.{column} AND a.id < b.id "
+            f"AND a.period && b.period "
+            f"WHERE a.{ACTIVE} AND b.{ACTIVE} ORDER BY a.id, b.id LIMIT 20"
+        )).all()
+        if conflicts:
+            pairs = ", ".join(f"{a}/{b}" for a, b in conflicts)
+            raise RuntimeError(f"Пересекающиеся показы по {column}: {pairs}. Исправьте их и повторите миграцию.")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.execute("""
+        CREATE OR REPLACE FUNCTION appointment_period(start timestamptz, minutes integer)
+        RETURNS tstzrange
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE
+        AS $$ SELECT tstzrange(start, start + make_interval(mins => minutes), '[)') $$
+    """)
+    op.add_column('appointments', sa.Column(
+        'period',
+        postgresql.TSTZRANGE(),
+        sa.Computed('appointment_period(meeting_time, duration_minutes)', persisted=True),
+        nullable=False,
+    ))
+    _check_overlaps(op.get_bind())
+    op.create_exclude_constraint(
+        'ex_appointments_user_period',
+        'appointments',
+        ('user_id', '='),
+        ('period', '&&'),
+        using='gist',
+        where=sa.text(ACTIVE),
+    )
+    op.create_exclude_constraint(
+        'ex_appointments_property_period',
+        'appointments',
+        ('property_id', '='),
+        ('period', '&&'),
+        using='gist',
+        where=sa.text(ACTIVE),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('ex_appointments_property_period', 'appointments', type_='exclude')
+    op.drop_constraint('ex_appointments_user_period', 'appointments', type_='exclude')
+    op.drop_column('appointments', 'period')
+    op.execute("DROP FUNCTION IF EXISTS appointment_period(timestamptz, integer)")
@@ -0,0 +1,101 @@
+"""Document folder index
+
+Revision ID: b23c1c3de9ef
+Revises: 434dc6187878
+Create Date: 2026-10-19 08:26:42.200489
+
+"""
+from collections import defaultdict
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b23c1c3de9ef'
+down_revision: Union[str, Sequence[str], None] = '434dc6187878'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _normalize(folder: Optional[str]) -> Optional[str]:
+    if folder is None:
+        return None
+    parts = [part.strip() for part in folder.replace("\\", "/").split("/")]
+    return "/".join(part for part in parts if part and part not in (".", "..")) or None
+
+
+def _build_folder_index(bind) -> None:
+    documents = bind.execute(sa.text("SELECT id, uploaded_by, folder, file_size FROM documents WHERE folder IS NOT NULL")).all()
+
+    folders = defaultdict(lambda: [0, 0, 0, 0])
+    for document_id, user_id, folder, file_size in documents:
+        path = _normalize(folder)
+        if path != folder:
+            bind.execute(sa.text("UPDATE documents SET folder = :folder WHERE id = :id"), {"folder": path, "id": document_id})
+        if not path:
+            continue
+
+        parts = path.split("/")
+        for i in range(1, len(parts) + 1):
+            counters = folders[(user_id, "/".join(parts[:i]))]
+            if i == len(parts):
+                counters[0] += 1
+                counters[1] += file_size
+            counters[2] += 1
+            counters[3] += file_size
+
+    rows = [
+        {
+            "user_id": user_id,
+            "path": path,
+            "parent_path": path.rsplit("/", 1)[0] if "/" in path else None,
+            "depth": path.count("/"),
+            "document_count": counters[0],
+            "total_bytes": counters[1],
+            "tree_document_count": counters[2],
+            "tree_total_bytes": counters[3],
+        }
+        for (user_id, path), counters in folders.items()
+    ]
+    if rows:
+        bind.execute(
+            sa.text(
+                "INSERT INTO document_folders "
+                "(user_id, path, parent_path, depth, document_count, total_bytes, tree_document_count, tree_total_bytes) "
+                "VALUES (:user_id, :path, :parent_path, :depth, :document_count, :total_bytes, :tree_document_count, :tree_total_bytes)"
+            ),
+            rows,
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('document_folders',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('path', sa.String(length=255), nullable=False),
+    sa.Column('parent_path', sa.String(length=255), nullable=True),
+    sa.Column('depth', sa.Integer(), nullable=False),
+    sa.Column('document_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('total_bytes', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+    sa.Column('tree_document_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('tree_total_bytes', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'path', name='uq_document_folders_user_path')
+    )
+    op.create_index('ix_document_folders_user_parent', 'document_folders', ['user_id', 'parent_path'], unique=False)
+    # ### end Alembic commands ###
+
+    _build_folder_index(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_index('ix_document_folders_user_parent', table_name='document_folders')
+    op.drop_table('document_folders')
+    # ### end Alembic commands ###
@@ -0,0 +1,164 @@
+import base64
+import binascii
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Tuple
+
+from src.appointment.dao import CalendarDAO
+from src.cache import cache_manager
+from src.my_types import AppointmentType
+
+CALENDAR_HISTORY_DAYS = 90
+TOMBSTONE_TTL_DAYS = 30
+FEED_CACHE_EXPIRE = 60 * 60
+
+PRODID = "-//VKR//Показы//RU"
+UID_DOMAIN = "appointments.vkr"
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+def encode_sync_token(version: int, issued_at: datetime) -> str:
+    raw = f"{version}|{int(issued_at.timestamp())}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_sync_token(token: str) -> Tuple[int, datetime]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        version, issued = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return int(version), datetime.fromtimestamp(int(issued), tz=timezone.utc)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidSyncToken(str(e))
+
+
+def etag(user_id: int, version: int, since_version: Optional[int] = None) -> str:
+    suffix = "" if since_version is None else f"-{since_version}"
+    return f'W/"{user_id}.{version}{suffix}"'
+
+
+def _escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """Перенос строк длиннее 75 октетов (RFC 5545, 3.1) без разрыва символов UTF-8."""
+    parts, current, size = [], "", 0
+    for char in line:
+        length = len(char.encode())
+        if size + length > 75:
+            parts.append(current)
+            current, size = " ", 1
+        current += char
+        size += length
+    parts.append(current)
+    return "\r\n".join(parts)
+
+
+def _utc(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _uid(appointment_id: int) -> str:
+    return f"appointment-{appointment_id}@{UID_DOMAIN}"
+
+
+def _event_lines(row) -> List[str]:
+    client = " ".join(filter(None, (row.client_last_name, row.client_first_name)))
+    description = f"Клиент: {client}"
+    if row.notes:
+        description += f"\n{row.notes}"
+    status = "CANCELLED" if row.type == AppointmentType.CANCELED else "CONFIRMED"
+    end = row.meeting_time + timedelta(minutes=row.duration_minutes)
+    return [
+        "BEGIN:VEVENT",
+        f"UID:{_uid(row.id)}",
+        f"DTSTAMP:{_utc(row.updated_at)}",
+        f"LAST-MODIFIED:{_utc(row.updated_at)}",
+        f"SEQUENCE:{row.sync_version}",
+        f"DTSTART:{_utc(row.meeting_time)}",
+        f"DTEND:{_utc(end)}",
+        f"SUMMARY:{_escape(f'Показ: {row.address}')}",
+        f"LOCATION:{_escape(row.address)}",
+        f"DESCRIPTION:{_escape(description)}",
+        f"STATUS:{status}",
+        "END:VEVENT",
+    ]
+
+
+def _tombstone_lines(tombstone) -> List[str]:
+    return [
+        "BEGIN:VEVENT",
+        f"UID:{_uid(tombstone.appointment_id)}",
+        f"DTSTAMP:{_utc(tombstone.deleted_at)}",
+        f"SEQUENCE:{tombstone.sync_version}",
+        f"DTSTART:{_utc(tombstone.meeting_time)}",
+        "STATUS:CANCELLED",
+        "END:VEVENT",
+    ]
+
+
+def render_calendar(events: Iterable, tombstones: Iterable = ()) -> str:
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "X-WR-CALNAME:Показы",
+    ]
+    for row in events:
+        lines.extend(_event_lines(row))
+    for tombstone in tombstones:
+        lines.extend(_tombstone_lines(tombstone))
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(_fold(line) for line in lines) + "\r\n"
+
+
+async def full_feed(user_id: int, version: int) -> str:
+    """Полная лента; версия входит в ключ кэша, поэтому сбрасывать его не нужно."""
+    cache_key = f"calendar:user:{user_id}:{version}"
+    cached = await cache_manager.get(cache_key)
+    if cached is not None:
+        return cached
+
+    now = datetime.now(timezone.utc)
+    await CalendarDAO.prune_tombstones(user_id, now - timedelta(days=TOMBSTONE_TTL_DAYS))
+    events = await CalendarDAO.find_events(user_id, since_time=now - timedelta(days=CALENDAR_HISTORY_DAYS))
+    body = render_calendar(events)
+
+    await cache_manager.set(cache_key, body, expire=FEED_CACHE_EXPIRE)
+    return body
+
+
+async def changes_feed(user_id: int, since_version: int) -> str:
+    """Только показы, изменённые после since_version, и удаления за тот же период."""
+    events = await CalendarDAO.find_events(user_id, since_version=since_version)
+    # id показов после удаления могут переиспользоваться — живая запись важнее удаления
+    live = {row.id for row in events}
+    tombstones = [
+        t for t in await CalendarDAO.find_tombstones(user_id, since_version)
+        if t.appointment_id not in live
+    ]
+    return render_calendar(events, tombstones)
+
+
+def sync_since(token: Optional[str], version: int) -> Optional[int]:
+    """Версия, от которой отдавать изменения; None — нужна полная лента."""
+    if token is None:
+        return None
+    since_version, issued_at = decode_sync_token(token)
+    if since_version > version:
+        return None
+    # Удаления старше TOMBSTONE_TTL_DAYS уже вычищены — по такому токену изменения не восстановить
+    if issued_at < datetime.now(timezone.utc) - timedelta(days=TOMBSTONE_TTL_DAYS):
+        return None
+    return since_version
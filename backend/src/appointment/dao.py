@@ -1,11 +1,33 @@
-from typing import Optional
-from sqlalchemy import Interval, and_, cast, literal, select, update
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+from sqlalchemy import delete, func, literal, or_, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 
 from src.dao.base import BaseDAO
-from src.model import AppointmentModel, AppointmentType
+from src.exceptions import BadRequestException
+from src.model import (
+    AppointmentModel,
+    AppointmentSeriesModel,
+    AppointmentTombstoneModel,
+    AppointmentType,
+    ClientModel,
+    PropertyModel,
+    UserModel,
+)
 from src.database import new_session
 
 
+def overlap_error(e: IntegrityError) -> Exception:
+    """Переводит нарушение exclusion-ограничения на период показа в понятную ошибку 400."""
+    error_msg = str(e.orig) if hasattr(e, 'orig') else str(e)
+    if "ex_appointments_user_period" in error_msg:
+        return BadRequestException("У вас уже запланирован показ на это время")
+    if "ex_appointments_property_period" in error_msg:
+        return BadRequestException("На это время объект уже забронирован для другого показа")
+    return e
+
+
 class AppointmentDAO(BaseDAO):
     model = AppointmentModel
 
@@ -13,22 +35,29 @@ class AppointmentDAO(BaseDAO):
     async def find_by_user(cls, user_id: int):
         return await cls.find_all(user_id=user_id)
 
+    @classmethod
+    async def add(cls, **values):
+        try:
+            return await super().add(**values)
+        except IntegrityError as e:
+            raise overlap_error(e)
+
+    @classmethod
+    async def update(cls, filter_by: dict, values: dict):
+        try:
+            return await super().update(filter_by, values)
+        except IntegrityError as e:
+            raise overlap_error(e)
+
     @classmethod
     async def find_overlapping(cls, user_id: int, start, end, exclude_id: Optional[int] = None):
         async with new_session() as s:
-            duration_interval = cast(
-                cls.model.duration_minutes.op("||")(literal(" minutes")),
-                Interval,
-            )
-
             q = (
                 select(cls.model)
                 .where(
-                    and_(
-                        cls.model.user_id == user_id,
-                        cls.model.meeting_time < end,
-                        (cls.model.meeting_time + duration_interval) > start,
-                    )
+                    cls.model.user_id == user_id,
+                    cls.model.type != AppointmentType.CANCELED,
+                    cls.model.period.op("&&")(func.tstzrange(start, end, '[)')),
                 )
             )
             
@@ -38,6 +67,60 @@ class AppointmentDAO(BaseDAO):
             res = await s.execute(q)
             return res.scalars().all()
 
+    @classmethod
+    async def find_busy(cls, user_id: int, start, end, property_ids: Iterable[int] = ()):
+        """Занятые периоды агента (и объектов) в окне — один запрос по GiST-индексам ограничений."""
+        async with new_session() as s:
+            owner = cls.model.user_id == user_id
+            property_ids = list(property_ids)
+            if property_ids:
+                owner = or_(owner, cls.model.property_id.in_(property_ids))
+            q = (
+                select(
+                    cls.model.user_id,
+                    cls.model.property_id,
+                    func.lower(cls.model.period).label("start"),
+                    func.upper(cls.model.period).label("end"),
+                )
+                .where(
+                    owner,
+                    cls.model.type != AppointmentType.CANCELED,
+                    cls.model.period.op("&&")(func.tstzrange(start, end, '[)')),
+                )
+            )
+            res = await s.execute(q)
+            return res.all()
+
+    @classmethod
+    async def find_existing_refs(cls, property_ids: Iterable[int], client_ids: Iterable[int]):
+        """Какие из переданных объектов и клиентов существуют — один запрос на весь пакет."""
+        async with new_session() as s:
+            q = union_all(
+                select(literal("property").label("kind"), PropertyModel.id).where(PropertyModel.id.in_(list(property_ids))),
+                select(literal("client").label("kind"), ClientModel.id).where(ClientModel.id.in_(list(client_ids))),
+            )
+            res = await s.execute(q)
+            rows = res.all()
+        return (
+            {row.id for row in rows if row.kind == "property"},
+            {row.id for row in rows if row.kind == "client"},
+        )
+
+    @classmethod
+    async def add_many(cls, rows: List[dict]):
+        """Один многострочный INSERT ... RETURNING в одной транзакции.
+
+        Строки, которые успел занять параллельный запрос, exclusion-ограничение
+        пропускает (ON CONFLICT DO NOTHING) — их нет в результате.
+        """
+        if not rows:
+            return []
+        async with new_session() as s:
+            async with s.begin():
+                q = insert(cls.model).values(rows).on_conflict_do_nothing().returning(cls.model)
+                res = await s.scalars(q)
+                return res.all()
+
     @classmethod
     async def update_status(cls, appointment_id: int, new_status: str):
         if isinstance(new_status, str):
@@ -49,13 +132,152 @@ class AppointmentDAO(BaseDAO):
                 except ValueError:
                     raise ValueError(f"Недопустимый статус: {new_status}")
 
+        try:
+            async with new_session() as s:
+                async with s.begin():
+                    query = (
+                        update(cls.model)
+                        .where(cls.model.id == appointment_id)
+                        .values(type=new_status)
+                        .execution_options(synchronize_session="fetch")
+                    )
+                    result = await s.execute(query)
+                    return result.rowcount
+        except IntegrityError as e:
+            raise overlap_error(e)
+
+    @classmethod
+    async def find_in_window(cls, user_id: int, start, end):
+        async with new_session() as s:
+            q = (
+                select(cls.model)
+                .where(
+                    cls.model.user_id == user_id,
+                    cls.model.period.op("&&")(func.tstzrange(start, end, '[)')),
+                )
+                .order_by(cls.model.meeting_time, cls.model.id)
+            )
+            res = await s.execute(q)
+            return res.scalars().all()
+
+    @classmethod
+    async def find_overridden(cls, series_ids: Iterable[int], start, end) -> set:
+        """Вхождения серий, уже сохранённые отдельными строками, — при развёртывании их пропускают."""
+        series_ids = list(series_ids)
+        if not series_ids:
+            return set()
+        async with new_session() as s:
+            q = select(cls.model.series_id, cls.model.series_original_time).where(
+                cls.model.series_id.in_(series_ids),
+                cls.model.series_original_time >= start - timedelta(days=1),
+                cls.model.series_original_time < end,
+            )
+            res = await s.execute(q)
+            return {(row.series_id, row.series_original_time) for row in res.all()}
+
+
+class AppointmentSeriesDAO(BaseDAO):
+    model = AppointmentSeriesModel
+
+    @classmethod
+    async def find_active(cls, user_id: int, start, end, property_ids: Iterable[int] = ()):
+        """Серии агента (и объектов), у которых могут быть вхождения в окне [start, end)."""
+        async with new_session() as s:
+            owner = cls.model.user_id == user_id
+            property_ids = list(property_ids)
+            if property_ids:
+                owner = or_(owner, cls.model.property_id.in_(property_ids))
+            q = (
+                select(cls.model)
+                .where(
+                    owner,
+                    cls.model.dtstart < end,
+                    or_(
+                        cls.model.until.is_(None),
+                        cls.model.until + func.make_interval(0, 0, 0, 0, 0, cls.model.duration_minutes) > start,
+                    ),
+                )
+                .order_by(cls.model.id)
+            )
+            res = await s.execute(q)
+            return res.scalars().all()
+
+
+class CalendarDAO(BaseDAO):
+    """Лента календаря агента: версия, изменённые показы и удаления."""
+    model = UserModel
+
+    @classmethod
+    async def find_owner(cls, token: str):
+        """id агента и текущая версия календаря — единственный запрос для неизменившейся ленты."""
+        async with new_session() as s:
+            q = select(cls.model.id, cls.model.calendar_version).where(
+                cls.model.calendar_token == token,
+                cls.model.is_active.is_(True),
+            )
+            res = await s.execute(q)
+            return res.one_or_none()
+
+    @classmethod
+    async def set_token(cls, user_id: int, token: Optional[str]) -> None:
+        async with new_session() as s:
+            async with s.begin():
+                await s.execute(update(cls.model).where(cls.model.id == user_id).values(calendar_token=token))
+
+    @classmethod
+    async def find_events(cls, user_id: int, since_version: Optional[int] = None, since_time: Optional[datetime] = None):
+        """Показы агента с адресом объекта и именем клиента одним запросом.
+
+        since_version — только изменённые после этой версии, since_time — полная лента от этой даты.
+        """
+        async with new_session() as s:
+            q = (
+                select(
+                    AppointmentModel.id,
+                    AppointmentModel.type,
+                    AppointmentModel.meeting_time,
+                    AppointmentModel.duration_minutes,
+                    AppointmentModel.notes,
+                    AppointmentModel.updated_at,
+                    AppointmentModel.sync_version,
+                    PropertyModel.address,
+                    ClientModel.last_name.label("client_last_name"),
+                    ClientModel.first_name.label("client_first_name"),
+                )
+                .join(PropertyModel, PropertyModel.id == AppointmentModel.property_id)
+                .join(ClientModel, ClientModel.id == AppointmentModel.client_id)
+                .where(AppointmentModel.user_id == user_id)
+                .order_by(AppointmentModel.meeting_time, AppointmentModel.id)
+            )
+            if since_version is not None:
+                q = q.where(AppointmentModel.sync_version > since_version)
+            if since_time is not None:
+                q = q.where(AppointmentModel.meeting_time >= since_time)
+            res = await s.execute(q)
+            return res.all()
+
+    @classmethod
+    async def find_tombstones(cls, user_id: int, since_version: int):
+        async with new_session() as s:
+            q = (
+                select(AppointmentTombstoneModel)
+                .where(
+                    AppointmentTombstoneModel.user_id == user_id,
+                    AppointmentTombstoneModel.sync_version > since_version,
+                )
+                .order_by(AppointmentTombstoneModel.sync_version)
+            )
+            res = await s.execute(q)
+            return res.scalars().all()
+
+    @classmethod
+    async def prune_tombstones(cls, user_id: int, before: datetime) -> int:
         async with new_session() as s:
             async with s.begin():
-                query = (
-                    update(cls.model)
-                    .where(cls.model.id == appointment_id)
-                    .values(type=new_status)
-                    .execution_options(synchronize_session="fetch")
-                )
-                result = await s.execute(query)
-                return result.rowcount
\ No newline at end of file
+                res = await s.execute(
+                    delete(AppointmentTombstoneModel).where(
+                        AppointmentTombstoneModel.user_id == user_id,
+                        AppointmentTombstoneModel.deleted_at < before,
+                    )
+                )
+                return res.rowcount
@@ -0,0 +1,85 @@
+from datetime import date, datetime, timedelta, tzinfo
+from itertools import islice
+from typing import Iterator, List, Optional, Sequence
+
+from src.my_types import RecurrenceFrequency
+
+# Предел вхождений за одно развёртывание: стоимость проверки серии не зависит от её длины
+MAX_OCCURRENCES = 1000
+
+
+def _dates(
+    frequency: RecurrenceFrequency,
+    interval: int,
+    weekdays: Sequence[int],
+    first: date,
+    window_start: date,
+) -> Iterator[date]:
+    """Даты вхождений начиная с недели/дня, содержащих window_start, без перебора прошлых периодов."""
+    if frequency == RecurrenceFrequency.DAILY:
+        skipped = max(0, (window_start - first).days)
+        step = -(-skipped // interval)
+        current = first + timedelta(days=step * interval)
+        while True:
+            yield current
+            current += timedelta(days=interval)
+
+    week0 = first - timedelta(days=first.weekday())
+    skipped = max(0, (window_start - week0).days // 7)
+    week = -(-skipped // interval) * interval
+    days = sorted(set(weekdays)) or [first.weekday()]
+    while True:
+        monday = week0 + timedelta(weeks=week)
+        for weekday in days:
+            current = monday + timedelta(days=weekday)
+            if current >= first:
+                yield current
+        week += interval
+
+
+def expand(
+    frequency: RecurrenceFrequency,
+    interval: int,
+    weekdays: Optional[Sequence[int]],
+    dtstart: datetime,
+    until: Optional[datetime],
+    duration_minutes: int,
+    start: datetime,
+    end: datetime,
+    tz: tzinfo,
+    limit: int = MAX_OCCURRENCES,
+) -> List[datetime]:
+    """Начала вхождений серии, пересекающихся с [start, end).
+
+    Время суток вхождений совпадает с dtstart по времени агентства (tz).
+    """
+    duration = timedelta(minutes=duration_minutes)
+    local_start = dtstart.astimezone(tz)
+    first, time_of_day = local_start.date(), local_start.timetz()
+    window_first = (start - duration).astimezone(tz).date()
+
+    result: List[datetime] = []
+    for day in _dates(frequency, max(interval, 1), weekdays or [], first, window_first):
+        occurrence = datetime.combine(day, time_of_day)
+        if occurrence >= end or (until is not None and occurrence > until):
+            break
+        if occurrence + duration > start:
+            result.append(occurrence)
+            if len(result) >= limit:
+                break
+    return result
+
+
+def last_occurrence(
+    frequency: RecurrenceFrequency,
+    interval: int,
+    weekdays: Optional[Sequence[int]],
+    dtstart: datetime,
+    count: int,
+    tz: tzinfo,
+) -> datetime:
+    """Начало count-го вхождения — серия с числом повторов хранится через until."""
+    local_start = dtstart.astimezone(tz)
+    first, time_of_day = local_start.date(), local_start.timetz()
+    day = next(islice(_dates(frequency, max(interval, 1), weekdays or [], first, first), count - 1, None))
+    return datetime.combine(day, time_of_day)
@@ -1,11 +1,51 @@
-from datetime import timedelta
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 
-from src.appointment.schema import AppointmentCreateSchema, AppointmentReadSchema, AppointmentUpdateSchema
-from src.appointment.dao import AppointmentDAO
+from src.appointment.schema import (
+    AppointmentBulkCreateSchema,
+    AppointmentBulkItemSchema,
+    AppointmentBulkResultSchema,
+    AppointmentCreateSchema,
+    AppointmentOccurrenceSchema,
+    AppointmentOverrideSchema,
+    AppointmentReadSchema,
+    AppointmentSeriesCreateSchema,
+    AppointmentSeriesReadSchema,
+    AppointmentUpdateSchema,
+    AvailabilitySchema,
+    CalendarTokenSchema,
+    TimeIntervalSchema,
+)
+from src.appointment.dao import AppointmentDAO, AppointmentSeriesDAO, CalendarDAO
+from src.appointment.calendar import (
+    InvalidSyncToken,
+    changes_feed,
+    encode_sync_token,
+    etag,
+    full_feed,
+    render_calendar,
+    sync_since,
+)
+from src.appointment.service import (
+    MAX_OCCURRENCE_WINDOW_DAYS,
+    MAX_WINDOW_DAYS,
+    appointment_period,
+    as_aware,
+    check_series_conflicts,
+    create_bulk,
+    create_series,
+    find_availability,
+    invalidate_busy,
+    invalidate_series_busy,
+    is_occurrence,
+    list_occurrences,
+    stored_time,
+)
 from src.users.auth import get_current_user
 from src.model import UserModel
+from src.my_types import AppointmentType
 from src.cache import cache_manager
 
 router = APIRouter(prefix="/appointments", tags=["Показы"])
@@ -16,21 +56,43 @@ async def create_appointment(payload: AppointmentCreateSchema, current_user: Use
     appointment_dict = payload.model_dump()
     appointment_dict["user_id"] = current_user.id
     
-    start = appointment_dict["meeting_time"]
-    duration = appointment_dict.get("duration_minutes", 60)
-    end = start + timedelta(minutes=duration)
-    
-    overlapping = await AppointmentDAO.find_overlapping(current_user.id, start, end)
-    if overlapping:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="У вас уже запланирован показ на это время")
-    
+    if payload.type != AppointmentType.CANCELED:
+        await check_series_conflicts(
+            current_user.id, payload.property_id, *appointment_period(payload.meeting_time, payload.duration_minutes)
+        )
+    # Пересечения с сохранёнными показами отсекает exclusion-ограничение при вставке
     new_appointment = await AppointmentDAO.add(**appointment_dict)
     
     await cache_manager.delete_pattern(f"appointments:user:{current_user.id}")
+    await invalidate_busy(
+        current_user.id,
+        new_appointment.property_id,
+        [appointment_period(new_appointment.meeting_time, new_appointment.duration_minutes)],
+    )
     
     return AppointmentReadSchema.model_validate(new_appointment)
 
 
+@router.post("/bulk", response_model=AppointmentBulkResultSchema)
+async def create_appointments_bulk(payload: AppointmentBulkCreateSchema, current_user: UserModel = Depends(get_current_user)):
+    """Пакет показов (например, день открытых дверей): ошибки не мешают создать остальные."""
+    results, busy_keys = await create_bulk(current_user.id, payload.items)
+
+    await cache_manager.delete_pattern(f"appointments:user:{current_user.id}")
+    await cache_manager.delete_many(sorted(busy_keys))
+
+    items = [
+        AppointmentBulkItemSchema(
+            index=i,
+            appointment=AppointmentReadSchema.model_validate(appointment) if appointment else None,
+            detail=detail,
+        )
+        for i, (appointment, detail) in enumerate(results)
+    ]
+    created = sum(1 for item in items if item.appointment)
+    return AppointmentBulkResultSchema(created=created, failed=len(items) - created, results=items)
+
+
 @router.get("/", response_model=List[AppointmentReadSchema])
 async def list_my_appointments(current_user: UserModel = Depends(get_current_user)):
     cache_key = f"appointments:user:{current_user.id}"
@@ -47,6 +109,164 @@ async def list_my_appointments(current_user: UserModel = Depends(get_current_use
     return result
 
 
+@router.get("/occurrences", response_model=List[AppointmentOccurrenceSchema])
+async def list_my_occurrences(
+    from_: datetime = Query(..., alias="from"),
+    to: datetime = Query(...),
+    current_user: UserModel = Depends(get_current_user),
+):
+    """Расписание агента за период вместе с вхождениями серий."""
+    start, end = as_aware(from_), as_aware(to)
+    if start >= end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Начало периода должно быть раньше конца")
+    if end - start > timedelta(days=MAX_OCCURRENCE_WINDOW_DAYS):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Период не может превышать {MAX_OCCURRENCE_WINDOW_DAYS} дней")
+
+    return [AppointmentOccurrenceSchema(**item) for item in await list_occurrences(current_user.id, start, end)]
+
+
+@router.post("/series", response_model=AppointmentSeriesReadSchema, status_code=status.HTTP_201_CREATED)
+async def create_appointment_series(payload: AppointmentSeriesCreateSchema, current_user: UserModel = Depends(get_current_user)):
+    series = await create_series(current_user.id, payload)
+    return AppointmentSeriesReadSchema.model_validate(series)
+
+
+@router.get("/series", response_model=List[AppointmentSeriesReadSchema])
+async def list_appointment_series(current_user: UserModel = Depends(get_current_user)):
+    series_list = await AppointmentSeriesDAO.find_all(user_id=current_user.id)
+    return [AppointmentSeriesReadSchema.model_validate(s) for s in series_list]
+
+
+@router.delete("/series/{series_id}", status_code=status.HTTP_200_OK)
+async def delete_appointment_series(series_id: int, current_user: UserModel = Depends(get_current_user)):
+    series = await AppointmentSeriesDAO.find_one_or_none(id=series_id, user_id=current_user.id)
+    if not series:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Серия показов не найдена")
+
+    # Переопределённые вхождения удаляются каскадом вместе с серией
+    await AppointmentSeriesDAO.delete(id=series_id)
+
+    await cache_manager.delete_pattern(f"appointments:user:{current_user.id}")
+    await invalidate_series_busy(series)
+
+    return {"message": "Серия показов удалена"}
+
+
+@router.post("/series/{series_id}/overrides", response_model=AppointmentReadSchema, status_code=status.HTTP_201_CREATED)
+async def override_series_occurrence(series_id: int, payload: AppointmentOverrideSchema, current_user: UserModel = Depends(get_current_user)):
+    """Сохраняет одно вхождение серии отдельным показом: перенесённым, изменённым или отменённым."""
+    series = await AppointmentSeriesDAO.find_one_or_none(id=series_id, user_id=current_user.id)
+    if not series:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Серия показов не найдена")
+
+    original_time = stored_time(payload.original_time)
+    if not is_occurrence(series, original_time):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="В серии нет показа в это время")
+
+    meeting_time = payload.meeting_time or original_time
+    duration_minutes = payload.duration_minutes or series.duration_minutes
+    if payload.type != AppointmentType.CANCELED:
+        await check_series_conflicts(
+            current_user.id,
+            series.property_id,
+            *appointment_period(meeting_time, duration_minutes),
+            exclude=(series.id, original_time),
+        )
+
+    appointment = await AppointmentDAO.add(
+        property_id=series.property_id,
+        client_id=series.client_id,
+        user_id=current_user.id,
+        type=payload.type,
+        meeting_time=meeting_time,
+        duration_minutes=duration_minutes,
+        notes=payload.notes if "notes" in payload.model_fields_set else series.notes,
+        series_id=series.id,
+        series_original_time=original_time,
+    )
+
+    await cache_manager.delete_pattern(f"appointments:user:{current_user.id}")
+    await invalidate_busy(
+        current_user.id,
+        series.property_id,
+        [appointment_period(original_time, series.duration_minutes), appointment_period(meeting_time, duration_minutes)],
+    )
+
+    return AppointmentReadSchema.model_validate(appointment)
+
+
+@router.get("/availability", response_model=AvailabilitySchema)
+async def get_availability(
+    from_: datetime = Query(..., alias="from"),
+    to: datetime = Query(...),
+    duration: int = Query(60, gt=0, le=24 * 60),
+    property_id: Optional[int] = None,
+    step: int = Query(30, ge=5, le=240),
+    current_user: UserModel = Depends(get_current_user),
+):
+    start, end = as_aware(from_), as_aware(to)
+    if start >= end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Начало периода должно быть раньше конца")
+    if end - start > timedelta(days=MAX_WINDOW_DAYS):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Период не может превышать {MAX_WINDOW_DAYS} дней")
+
+    free, slots = await find_availability(current_user.id, start, end, duration, step, property_id=property_id)
+    return AvailabilitySchema(
+        free=[TimeIntervalSchema(start=s, end=e) for s, e in free],
+        slots=[TimeIntervalSchema(start=s, end=e) for s, e in slots],
+    )
+
+
+@router.post("/calendar/token", response_model=CalendarTokenSchema)
+async def issue_calendar_token(request: Request, current_user: UserModel = Depends(get_current_user)):
+    """Новая ссылка на ленту календаря; прежняя перестаёт работать."""
+    token = secrets.token_urlsafe(32)
+    await CalendarDAO.set_token(current_user.id, token)
+    return CalendarTokenSchema(token=token, url=str(request.url_for("get_calendar_feed", token=token)))
+
+
+@router.delete("/calendar/token", status_code=status.HTTP_200_OK)
+async def revoke_calendar_token(current_user: UserModel = Depends(get_current_user)):
+    await CalendarDAO.set_token(current_user.id, None)
+    return {"message": "Ссылка на календарь отозвана"}
+
+
+def _etag_matches(header: Optional[str], tag: str) -> bool:
+    if not header:
+        return False
+    candidates = {c.strip().removeprefix("W/") for c in header.split(",")}
+    return "*" in candidates or tag.removeprefix("W/") in candidates
+
+
+@router.get("/calendar/{token}.ics", name="get_calendar_feed")
+async def get_calendar_feed(token: str, request: Request, sync: Optional[str] = None):
+    owner = await CalendarDAO.find_owner(token)
+    if owner is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Календарь не найден")
+
+    version = owner.calendar_version
+    try:
+        since_version = sync_since(sync, version)
+    except InvalidSyncToken:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Некорректный токен синхронизации")
+
+    headers = {
+        "ETag": etag(owner.id, version, since_version),
+        "Cache-Control": "private, no-cache",
+        "X-Sync-Token": encode_sync_token(version, datetime.now(timezone.utc)),
+    }
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if since_version is None:
+        body = await full_feed(owner.id, version)
+    elif since_version == version:
+        body = render_calendar([])
+    else:
+        body = await changes_feed(owner.id, since_version)
+    return Response(content=body, media_type="text/calendar; charset=utf-8", headers=headers)
+
+
 @router.get("/{id}", response_model=AppointmentReadSchema)
 async def get_appointment(id: int, current_user: UserModel = Depends(get_current_user)):
     cache_key = f"appointments:id:{id}"
@@ -73,14 +293,17 @@ async def update_appointment(appointment_id: int, payload: AppointmentUpdateSche
     
     update_data = payload.model_dump(exclude_unset=True)
     
-    if "meeting_time" in update_data or "duration_minutes" in update_data:
-        start = update_data.get("meeting_time", appointment.meeting_time)
-        duration = update_data.get("duration_minutes", appointment.duration_minutes)
-        end = start + timedelta(minutes=duration)
-        
-        overlapping = await AppointmentDAO.find_overlapping(current_user.id, start, end, exclude_id=appointment_id)
-        if overlapping:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="У вас уже запланирован показ на это время")
+    merged = {
+        "property_id": appointment.property_id,
+        "type": appointment.type,
+        "meeting_time": appointment.meeting_time,
+        "duration_minutes": appointment.duration_minutes,
+        **{k: v for k, v in update_data.items() if v is not None},
+    }
+    if update_data and merged["type"] != AppointmentType.CANCELED:
+        await check_series_conflicts(
+            current_user.id, merged["property_id"], *appointment_period(merged["meeting_time"], merged["duration_minutes"])
+        )
     
     if update_data:
         await AppointmentDAO.update(filter_by={"id": appointment_id}, values=update_data)
@@ -89,6 +312,17 @@ async def update_appointment(appointment_id: int, payload: AppointmentUpdateSche
     await cache_manager.delete_pattern(f"appointments:user:{current_user.id}")
     
     updated_appointment = await AppointmentDAO.find_one_or_none(id=appointment_id)
+    if update_data:
+        await invalidate_busy(
+            current_user.id,
+            appointment.property_id,
+            [appointment_period(appointment.meeting_time, appointment.duration_minutes)],
+        )
+        await invalidate_busy(
+            current_user.id,
+            updated_appointment.property_id,
+            [appointment_period(updated_appointment.meeting_time, updated_appointment.duration_minutes)],
+        )
     return AppointmentReadSchema.model_validate(updated_appointment)
 
 
@@ -102,5 +336,10 @@ async def delete_appointment(id: int, current_user: UserModel = Depends(get_curr
     
     await cache_manager.delete(f"appointments:id:{id}")
     await cache_manager.delete_pattern(f"appointments:user:{current_user.id}")
+    await invalidate_busy(
+        current_user.id,
+        appointment.property_id,
+        [appointment_period(appointment.meeting_time, appointment.duration_minutes)],
+    )
     
     return {"message": "Показ успешно удалён"}
\ No newline at end of file
@@ -1,25 +1,30 @@
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
-from src.my_types import AppointmentType
+from src.my_types import AppointmentType, RecurrenceFrequency
 
 class AppointmentCreateSchema(BaseModel):
     property_id: int
     client_id: int
     type: AppointmentType = AppointmentType.SCHEDULED
     meeting_time: datetime
-    duration_minutes: Optional[int] = 60
+    duration_minutes: int = Field(60, gt=0, le=24 * 60)
     notes: Optional[str] = None  
 
     model_config = ConfigDict(extra='forbid')
 
+class AppointmentBulkCreateSchema(BaseModel):
+    items: List[AppointmentCreateSchema] = Field(..., min_length=1, max_length=200)
+
+    model_config = ConfigDict(extra='forbid')
+
 class AppointmentUpdateSchema(BaseModel):
     property_id: Optional[int] = None
     client_id: Optional[int] = None
     type: Optional[AppointmentType] = None
     meeting_time: Optional[datetime] = None
-    duration_minutes: Optional[int] = None
+    duration_minutes: Optional[int] = Field(None, gt=0, le=24 * 60)
     notes: Optional[str] = None
 
     model_config = ConfigDict(extra='forbid')
@@ -38,5 +43,92 @@ class AppointmentReadSchema(BaseModel):
     duration_minutes: Optional[int] = None
     notes: Optional[str] = None  
     created_at: datetime
+    series_id: Optional[int] = None
+    series_original_time: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True, extra='forbid')
+
+class AppointmentOccurrenceSchema(BaseModel):
+    """Показ в окне расписания; id нет у вхождений серии, которые не переопределялись."""
+    id: Optional[int] = None
+    series_id: Optional[int] = None
+    series_original_time: Optional[datetime] = None
+    property_id: int
+    client_id: int
+    user_id: int
+    type: AppointmentType
+    meeting_time: datetime
+    duration_minutes: int
+    notes: Optional[str] = None
+
+class AppointmentSeriesCreateSchema(BaseModel):
+    property_id: int
+    client_id: int
+    frequency: RecurrenceFrequency = RecurrenceFrequency.WEEKLY
+    interval: int = Field(1, ge=1, le=52)
+    weekdays: Optional[List[int]] = Field(None, min_length=1, max_length=7)
+    dtstart: datetime
+    until: Optional[datetime] = None
+    count: Optional[int] = Field(None, ge=1, le=1000)
+    duration_minutes: int = Field(60, gt=0, le=24 * 60)
+    notes: Optional[str] = None
+
+    model_config = ConfigDict(extra='forbid')
+
+    @model_validator(mode="after")
+    def validate_rule(self):
+        if self.weekdays is not None:
+            if self.frequency != RecurrenceFrequency.WEEKLY:
+                raise ValueError("Дни недели задаются только для еженедельной серии")
+            if any(day < 0 or day > 6 for day in self.weekdays):
+                raise ValueError("Дни недели задаются числами от 0 (понедельник) до 6 (воскресенье)")
+        return self
+
+class AppointmentSeriesReadSchema(BaseModel):
+    id: int
+    property_id: int
+    client_id: int
+    user_id: int
+    frequency: RecurrenceFrequency
+    interval: int
+    weekdays: Optional[List[int]] = None
+    dtstart: datetime
+    until: Optional[datetime] = None
+    count: Optional[int] = None
+    duration_minutes: int
+    notes: Optional[str] = None
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True, extra='forbid')
+
+class AppointmentOverrideSchema(BaseModel):
+    """Изменение одного вхождения серии; type=ОТМЕНЕНО отменяет только его."""
+    original_time: datetime
+    type: AppointmentType = AppointmentType.SCHEDULED
+    meeting_time: Optional[datetime] = None
+    duration_minutes: Optional[int] = Field(None, gt=0, le=24 * 60)
+    notes: Optional[str] = None
+
+    model_config = ConfigDict(extra='forbid')
+
+class AppointmentBulkItemSchema(BaseModel):
+    index: int
+    appointment: Optional[AppointmentReadSchema] = None
+    detail: Optional[str] = None
+
+class AppointmentBulkResultSchema(BaseModel):
+    created: int
+    failed: int
+    results: List[AppointmentBulkItemSchema]
+
+class TimeIntervalSchema(BaseModel):
+    start: datetime
+    end: datetime
+
+class AvailabilitySchema(BaseModel):
+    free: List[TimeIntervalSchema]
+    slots: List[TimeIntervalSchema]
 
-    model_config = ConfigDict(from_attributes=True, extra='forbid')
\ No newline at end of file
+class CalendarTokenSchema(BaseModel):
+    token: str
+    url: str
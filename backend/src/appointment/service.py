@@ -0,0 +1,444 @@
+from bisect import bisect_right, insort
+from collections import defaultdict, namedtuple
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.appointment.dao import AppointmentDAO, AppointmentSeriesDAO
+from src.appointment.recurrence import expand, last_occurrence
+from src.appointment.schema import AppointmentCreateSchema, AppointmentSeriesCreateSchema
+from src.cache import cache_manager
+from src.config import settings
+from src.exceptions import BadRequestException
+from src.model import AppointmentModel, AppointmentSeriesModel
+from src.my_types import AppointmentType
+
+Interval = Tuple[datetime, datetime]
+BusyPeriod = namedtuple("BusyPeriod", "user_id property_id start end")
+
+BUSY_CACHE_EXPIRE = 300
+MAX_WINDOW_DAYS = 14
+MAX_SLOTS = 200
+MAX_OCCURRENCE_WINDOW_DAYS = 92
+# Насколько вперёд проверяются пересечения новой серии; дальше её охраняют проверки при создании показов
+SERIES_CHECK_HORIZON_DAYS = 366
+
+USER_OVERLAP = "У вас уже запланирован показ на это время"
+PROPERTY_OVERLAP = "На это время объект уже забронирован для другого показа"
+
+
+def working_tz() -> timezone:
+    return timezone(timedelta(hours=settings.WORKING_UTC_OFFSET_HOURS))
+
+
+def as_aware(value: datetime) -> datetime:
+    """Время без часового пояса считается временем агентства."""
+    return value.replace(tzinfo=working_tz()) if value.tzinfo is None else value
+
+
+def stored_time(value: datetime) -> datetime:
+    """Время без пояса asyncpg сохраняет в timestamptz как UTC."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def local_days(start: datetime, end: datetime) -> List[date]:
+    """Дни по времени агентства, которые задевает полуинтервал [start, end)."""
+    tz = working_tz()
+    first = start.astimezone(tz).date()
+    last = (end - timedelta(microseconds=1)).astimezone(tz).date()
+    return [first + timedelta(days=i) for i in range((last - first).days + 1)]
+
+
+def day_bounds(day: date) -> Interval:
+    start = datetime.combine(day, datetime.min.time(), tzinfo=working_tz())
+    return start, start + timedelta(days=1)
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Объединение занятых интервалов проходом по отсортированным границам.
+
+    Интервалы полуоткрытые: встреча, которая начинается ровно в момент окончания
+    другой, с ней не пересекается, поэтому на одном времени конец идёт раньше начала.
+    """
+    events = []
+    for start, end in intervals:
+        if start < end:
+            events.append((start, 1))
+            events.append((end, -1))
+    events.sort(key=lambda event: (event[0], event[1]))
+
+    merged: List[Interval] = []
+    depth = 0
+    opened: Optional[datetime] = None
+    for moment, delta in events:
+        if depth == 0 and delta == 1:
+            opened = moment
+        depth += delta
+        if depth == 0 and opened is not None:
+            if merged and merged[-1][1] == opened:
+                merged[-1] = (merged[-1][0], moment)
+            else:
+                merged.append((opened, moment))
+            opened = None
+    return merged
+
+
+def subtract_intervals(windows: List[Interval], busy: List[Interval]) -> List[Interval]:
+    """Свободные части окон: оба списка отсортированы, busy — уже объединён."""
+    free: List[Interval] = []
+    i = 0
+    for window_start, window_end in windows:
+        cursor = window_start
+        while i < len(busy) and busy[i][1] <= cursor:
+            i += 1
+        j = i
+        while j < len(busy) and busy[j][0] < window_end:
+            if busy[j][0] > cursor:
+                free.append((cursor, busy[j][0]))
+            cursor = max(cursor, busy[j][1])
+            j += 1
+        if cursor < window_end:
+            free.append((cursor, window_end))
+    return free
+
+
+def working_windows(start: datetime, end: datetime) -> List[Interval]:
+    windows = []
+    for day in local_days(start, end):
+        if day.weekday() not in settings.WORKING_WEEKDAYS:
+            continue
+        day_start = datetime.combine(day, settings.WORKING_DAY_START, tzinfo=working_tz())
+        day_end = datetime.combine(day, settings.WORKING_DAY_END, tzinfo=working_tz())
+        window = (max(day_start, start), min(day_end, end))
+        if window[0] < window[1]:
+            windows.append(window)
+    return windows
+
+
+def candidate_slots(free: List[Interval], duration: int, step: int) -> List[Interval]:
+    """Начала слотов выровнены по сетке `step` минут от полуночи по времени агентства."""
+    length = timedelta(minutes=duration)
+    step_delta = timedelta(minutes=step)
+    slots: List[Interval] = []
+    for free_start, free_end in free:
+        midnight = day_bounds(free_start.astimezone(working_tz()).date())[0]
+        offset = free_start - midnight
+        slot_start = midnight + step_delta * -(-offset // step_delta)
+        while slot_start + length <= free_end:
+            slots.append((slot_start, slot_start + length))
+            if len(slots) >= MAX_SLOTS:
+                return slots
+            slot_start += step_delta
+    return slots
+
+
+def _busy_key(kind: str, entity_id: int, day: date) -> str:
+    return f"appointments:busy:{kind}:{entity_id}:{day.isoformat()}"
+
+
+async def busy_intervals(user_id: int, start: datetime, end: datetime, property_id: Optional[int] = None) -> List[Interval]:
+    """Занятость агента и объекта в окне. Кэшируется по дням, в базу — один запрос на все недостающие дни."""
+    days = local_days(start, end)
+    entities = [("user", user_id)] + ([("property", property_id)] if property_id is not None else [])
+    keys = [_busy_key(kind, entity_id, day) for kind, entity_id in entities for day in days]
+
+    cached = await cache_manager.get_many(keys)
+    if all(entry is not None for entry in cached):
+        return [
+            (datetime.fromisoformat(s), datetime.fromisoformat(e))
+            for entry in cached
+            for s, e in entry
+        ]
+
+    window_start, window_end = day_bounds(days[0])[0], day_bounds(days[-1])[1]
+    rows = await load_busy(user_id, window_start, window_end, property_ids=[property_id] if property_id is not None else ())
+
+    buckets: Dict[str, List[Interval]] = defaultdict(list)
+    intervals: List[Interval] = []
+    for row in rows:
+        intervals.append((row.start, row.end))
+        for kind, entity_id in entities:
+            if getattr(row, f"{kind}_id") != entity_id:
+                continue
+            for day in local_days(row.start, row.end):
+                buckets[_busy_key(kind, entity_id, day)].append((row.start, row.end))
+
+    await cache_manager.set_many(
+        {key: [[s.isoformat(), e.isoformat()] for s, e in buckets.get(key, [])] for key in keys},
+        expire=BUSY_CACHE_EXPIRE,
+    )
+    return intervals
+
+
+def series_occurrences(
+    series: AppointmentSeriesModel, start: datetime, end: datetime, overridden: set = frozenset()
+) -> List[datetime]:
+    return [
+        occurrence
+        for occurrence in expand(
+            series.frequency, series.interval, series.weekdays, series.dtstart,
+            series.until, series.duration_minutes, start, end, working_tz(),
+        )
+        if (series.id, occurrence) not in overridden
+    ]
+
+
+async def series_busy(
+    user_id: int,
+    start: datetime,
+    end: datetime,
+    property_ids: Iterable[int] = (),
+    exclude: Optional[Tuple[int, datetime]] = None,
+) -> List[BusyPeriod]:
+    """Вхождения серий агента и объектов в окне; exclude — вхождение, которое сейчас переопределяется."""
+    series_list = await AppointmentSeriesDAO.find_active(user_id, start, end, property_ids=property_ids)
+    if not series_list:
+        return []
+    overridden = await AppointmentDAO.find_overridden([s.id for s in series_list], start, end)
+    if exclude is not None:
+        overridden.add(exclude)
+
+    periods = []
+    for series in series_list:
+        length = timedelta(minutes=series.duration_minutes)
+        for occurrence in series_occurrences(series, start, end, overridden):
+            periods.append(BusyPeriod(series.user_id, series.property_id, occurrence, occurrence + length))
+    return periods
+
+
+async def load_busy(user_id: int, start: datetime, end: datetime, property_ids: Iterable[int] = ()) -> list:
+    """Занятость из сохранённых показов и развёрнутых серий."""
+    property_ids = list(property_ids)
+    rows = await AppointmentDAO.find_busy(user_id, start, end, property_ids=property_ids)
+    return list(rows) + await series_busy(user_id, start, end, property_ids=property_ids)
+
+
+async def check_series_conflicts(
+    user_id: int,
+    property_id: int,
+    start: datetime,
+    end: datetime,
+    exclude: Optional[Tuple[int, datetime]] = None,
+) -> None:
+    """Сохранённые показы сверяет exclusion-ограничение, а вхождения серий — эта проверка."""
+    for period in await series_busy(user_id, start, end, property_ids=[property_id], exclude=exclude):
+        if period.start < end and start < period.end:
+            raise BadRequestException(USER_OVERLAP if period.user_id == user_id else PROPERTY_OVERLAP)
+
+
+def busy_keys(user_id: int, property_id: Optional[int], periods: Iterable[Interval]) -> set:
+    keys = set()
+    for start, end in periods:
+        for day in local_days(start, end):
+            keys.add(_busy_key("user", user_id, day))
+            if property_id is not None:
+                keys.add(_busy_key("property", property_id, day))
+    return keys
+
+
+async def invalidate_busy(user_id: int, property_id: Optional[int], periods: Iterable[Interval]) -> None:
+    await cache_manager.delete_many(sorted(busy_keys(user_id, property_id, periods)))
+
+
+def appointment_period(meeting_time: datetime, duration_minutes: int) -> Interval:
+    start = stored_time(meeting_time)
+    return start, start + timedelta(minutes=duration_minutes)
+
+
+async def find_availability(
+    user_id: int,
+    start: datetime,
+    end: datetime,
+    duration: int,
+    step: int,
+    property_id: Optional[int] = None,
+) -> Tuple[List[Interval], List[Interval]]:
+    """Свободные интервалы в рабочие часы и кандидаты на показ длительностью `duration` минут."""
+    tz = working_tz()
+    busy = merge_intervals(
+        (s.astimezone(tz), e.astimezone(tz))
+        for s, e in await busy_intervals(user_id, start, end, property_id=property_id)
+    )
+    free = subtract_intervals(working_windows(start, end), busy)
+    free = [(s, e) for s, e in free if e - s >= timedelta(minutes=duration)]
+    return free, candidate_slots(free, duration, step)
+
+
+class _Timeline:
+    """Непересекающиеся полуинтервалы, отсортированные по началу; проверка пересечения — бинарный поиск."""
+
+    def __init__(self, intervals: Iterable[Interval] = ()):
+        merged = merge_intervals(intervals)
+        self.starts = [s for s, _ in merged]
+        self.ends = [e for _, e in merged]
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        i = bisect_right(self.ends, start)
+        return i < len(self.starts) and self.starts[i] < end
+
+    def add(self, start: datetime, end: datetime) -> None:
+        insort(self.starts, start)
+        insort(self.ends, end)
+
+
+async def create_bulk(
+    user_id: int, items: List[AppointmentCreateSchema]
+) -> Tuple[List[Tuple[Optional[AppointmentModel], Optional[str]]], set]:
+    """Пакетное создание показов агента.
+
+    Пересечения внутри пакета и с существующими записями проверяются в памяти
+    по одной выборке занятости; принятые строки вставляются одним INSERT.
+    Возвращает (показ, ошибка) для каждого элемента в исходном порядке и ключи кэша занятости.
+    """
+    # Явный пояс нужен, чтобы сопоставить строки из RETURNING с элементами пакета
+    times = [stored_time(item.meeting_time) for item in items]
+    periods = [(t, t + timedelta(minutes=item.duration_minutes)) for t, item in zip(times, items)]
+    active = [item.type != AppointmentType.CANCELED for item in items]
+
+    property_ids = {item.property_id for item in items}
+    existing_properties, existing_clients = await AppointmentDAO.find_existing_refs(
+        property_ids, {item.client_id for item in items}
+    )
+
+    user_busy, property_busy = _Timeline(), defaultdict(_Timeline)
+    if any(active):
+        window = (
+            min(p[0] for p, a in zip(periods, active) if a),
+            max(p[1] for p, a in zip(periods, active) if a),
+        )
+        rows = await load_busy(user_id, *window, property_ids=property_ids)
+        user_busy = _Timeline((r.start, r.end) for r in rows if r.user_id == user_id)
+        by_property = defaultdict(list)
+        for r in rows:
+            by_property[r.property_id].append((r.start, r.end))
+        property_busy.update({pid: _Timeline(intervals) for pid, intervals in by_property.items()})
+
+    errors: List[Optional[str]] = [None] * len(items)
+    batch = _Timeline()
+    for i, item in enumerate(items):
+        if item.property_id not in existing_properties:
+            errors[i] = "Объект не найден"
+        elif item.client_id not in existing_clients:
+            errors[i] = "Клиент не найден"
+        elif not active[i]:
+            continue
+        elif user_busy.overlaps(*periods[i]):
+            errors[i] = USER_OVERLAP
+        elif property_busy[item.property_id].overlaps(*periods[i]):
+            errors[i] = PROPERTY_OVERLAP
+        elif batch.overlaps(*periods[i]):
+            errors[i] = "Пересекается с другим показом из этого пакета"
+        else:
+            batch.add(*periods[i])
+
+    accepted = [i for i in range(len(items)) if errors[i] is None]
+    created = await AppointmentDAO.add_many([
+        {**items[i].model_dump(), "meeting_time": times[i], "user_id": user_id} for i in accepted
+    ])
+
+    by_key = defaultdict(list)
+    for appointment in created:
+        by_key[(appointment.meeting_time, appointment.property_id, appointment.client_id, appointment.type)].append(appointment)
+
+    results: List[Tuple[Optional[AppointmentModel], Optional[str]]] = [(None, error) for error in errors]
+    keys = set()
+    for i in accepted:
+        item = items[i]
+        matches = by_key.get((times[i], item.property_id, item.client_id, item.type))
+        if matches:
+            results[i] = (matches.pop(0), None)
+            keys |= busy_keys(user_id, item.property_id, [periods[i]])
+        else:
+            # Время заняли параллельным запросом между проверкой и вставкой
+            results[i] = (None, "Время пересекается с существующей записью")
+    return results, keys
+
+
+async def invalidate_series_busy(series: AppointmentSeriesModel) -> None:
+    await cache_manager.delete_pattern(f"appointments:busy:user:{series.user_id}:*")
+    await cache_manager.delete_pattern(f"appointments:busy:property:{series.property_id}:*")
+
+
+async def create_series(user_id: int, payload: AppointmentSeriesCreateSchema) -> AppointmentSeriesModel:
+    """Серия сохраняется одной строкой; пересечения проверяются на горизонте SERIES_CHECK_HORIZON_DAYS."""
+    values = payload.model_dump()
+    dtstart = stored_time(payload.dtstart)
+    values["dtstart"] = dtstart
+    if payload.until is not None:
+        values["until"] = stored_time(payload.until)
+        if values["until"] < dtstart:
+            raise BadRequestException("Окончание серии раньше её начала")
+    if payload.count is not None:
+        last = last_occurrence(payload.frequency, payload.interval, payload.weekdays, dtstart, payload.count, working_tz())
+        values["until"] = min(last, values["until"]) if values.get("until") else last
+
+    candidate = AppointmentSeriesModel(id=None, user_id=user_id, **values)
+    horizon_end = dtstart + timedelta(days=SERIES_CHECK_HORIZON_DAYS)
+    if candidate.until is not None:
+        horizon_end = min(horizon_end, candidate.until + timedelta(minutes=payload.duration_minutes))
+    occurrences = series_occurrences(candidate, dtstart, horizon_end)
+    if not occurrences:
+        raise BadRequestException("По этому правилу нет ни одного показа")
+
+    length = timedelta(minutes=payload.duration_minutes)
+    rows = await load_busy(user_id, occurrences[0], occurrences[-1] + length, property_ids=[payload.property_id])
+    user_busy = _Timeline((r.start, r.end) for r in rows if r.user_id == user_id)
+    property_busy = _Timeline((r.start, r.end) for r in rows if r.property_id == payload.property_id)
+    for occurrence in occurrences:
+        if user_busy.overlaps(occurrence, occurrence + length):
+            raise BadRequestException(f"{USER_OVERLAP}: {occurrence.isoformat()}")
+        if property_busy.overlaps(occurrence, occurrence + length):
+            raise BadRequestException(f"{PROPERTY_OVERLAP}: {occurrence.isoformat()}")
+
+    series = await AppointmentSeriesDAO.add(user_id=user_id, **values)
+    await invalidate_series_busy(series)
+    return series
+
+
+def occurrence_view(series: AppointmentSeriesModel, occurrence: datetime) -> dict:
+    occurrence = occurrence.astimezone(timezone.utc)
+    return {
+        "id": None,
+        "series_id": series.id,
+        "series_original_time": occurrence,
+        "property_id": series.property_id,
+        "client_id": series.client_id,
+        "user_id": series.user_id,
+        "type": AppointmentType.SCHEDULED,
+        "meeting_time": occurrence,
+        "duration_minutes": series.duration_minutes,
+        "notes": series.notes,
+    }
+
+
+async def list_occurrences(user_id: int, start: datetime, end: datetime) -> List[dict]:
+    """Показы агента в окне: сохранённые строки и вхождения серий, развёрнутые на лету."""
+    rows = await AppointmentDAO.find_in_window(user_id, start, end)
+    series_list = await AppointmentSeriesDAO.find_active(user_id, start, end)
+    overridden = await AppointmentDAO.find_overridden([s.id for s in series_list], start, end)
+
+    items = [
+        {
+            "id": row.id,
+            "series_id": row.series_id,
+            "series_original_time": row.series_original_time,
+            "property_id": row.property_id,
+            "client_id": row.client_id,
+            "user_id": row.user_id,
+            "type": row.type,
+            "meeting_time": row.meeting_time,
+            "duration_minutes": row.duration_minutes,
+            "notes": row.notes,
+        }
+        for row in rows
+    ]
+    for series in series_list:
+        if series.user_id != user_id:
+            continue
+        items.extend(occurrence_view(series, o) for o in series_occurrences(series, start, end, overridden))
+    items.sort(key=lambda item: item["meeting_time"])
+    return items
+
+
+def is_occurrence(series: AppointmentSeriesModel, original_time: datetime) -> bool:
+    occurrences = series_occurrences(series, original_time, original_time + timedelta(microseconds=1))
+    return original_time in occurrences
@@ -1,44 +1,103 @@
 import json
-from typing import Optional, Any
+import logging
+import time
+from typing import Dict, List, Optional, Any
 import redis.asyncio as aioredis
 from src.config import settings
+from src.monitoring.metrics import CACHE_ERRORS, CACHE_PAYLOAD, cache_namespace, count_cache_reads
+from src.monitoring.timing import timed_async
+from src.monitoring.tracing import traced_cache
+
+logger = logging.getLogger(__name__)
 
 class CacheManager:
     def __init__(self):
         self.redis: Optional[aioredis.Redis] = None
+        self._failed = False
+        self._retry_delay = 0.0
+        self._retry_at = 0.0
     
-    async def connect(self):
+    async def connect(self) -> bool:
+        # Клиент становится доступен запросам только после успешного ping
+        redis = None
         try:
-            self.redis = await aioredis.from_url(
+            redis = aioredis.from_url(
                 settings.REDIS_URL,
                 encoding="utf-8",
                 decode_responses=True
             )
-            self.redis.ping()
-            print("Redis успешно подключен")
+            await redis.ping()
         except Exception as e:
-            print(f"Ошибка подключения к Redis: {e}")
-            print("Приложение будет работать без кэширования")
+            if redis is not None:
+                await redis.aclose()
+            # Предупреждение пишется один раз при потере Redis, повторные неудачи — только в debug
+            logger.log(
+                logging.DEBUG if self._failed else logging.WARNING,
+                "Ошибка подключения к Redis, приложение будет работать без кэширования: %s", e,
+            )
+            self._failed = True
             self.redis = None
+            return False
+        self.redis = redis
+        self._failed = False
+        self._retry_delay = 0.0
+        logger.info("Redis успешно подключен")
+        return True
+    
+    async def reconnect(self) -> bool:
+        """Повторное подключение с паузой, растущей до REDIS_RECONNECT_MAX_SECONDS."""
+        if self.redis is not None:
+            return True
+        if time.monotonic() < self._retry_at:
+            return False
+        if await self.connect():
+            return True
+        self._retry_delay = min(max(self._retry_delay * 2, 1.0), settings.REDIS_RECONNECT_MAX_SECONDS)
+        self._retry_at = time.monotonic() + self._retry_delay
+        return False
     
     async def close(self):
         if self.redis:
             await self.redis.close()
-            print("Соединение с Redis закрыто")
+            logger.info("Соединение с Redis закрыто")
     
+    @timed_async("cache")
+    @traced_cache("cache.get")
     async def get(self, key: str) -> Optional[Any]:
         if not self.redis:
             return None
         
+        namespace = cache_namespace(key)
         try:
             value = await self.redis.get(key)
+            count_cache_reads([key], [value])
             if value:
+                CACHE_PAYLOAD.labels(namespace, "get").observe(len(value.encode()))
                 return json.loads(value)
         except Exception as e:
-            print(f"Ошибка получения из кэша: {e}")
+            CACHE_ERRORS.labels(namespace, "get").inc()
+            logger.warning("Ошибка получения из кэша: %s", e)
         
         return None
     
+    @timed_async("cache")
+    @traced_cache("cache.get")
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        if not self.redis or not keys:
+            return [None] * len(keys)
+        
+        try:
+            values = await self.redis.mget(keys)
+            count_cache_reads(keys, values)
+            return [json.loads(value) if value else None for value in values]
+        except Exception as e:
+            CACHE_ERRORS.labels(cache_namespace(keys[0]), "get_many").inc()
+            logger.warning("Ошибка получения из кэша: %s", e)
+        
+        return [None] * len(keys)
+    
+    @timed_async("cache")
+    @traced_cache("cache.put")
     async def set(
         self, 
         key: str, 
@@ -48,14 +107,42 @@ class CacheManager:
         if not self.redis:
             return False
         
+        namespace = cache_namespace(key)
         try:
             serialized = json.dumps(value, ensure_ascii=False, default=str)
             await self.redis.setex(key, expire, serialized)
+            CACHE_PAYLOAD.labels(namespace, "set").observe(len(serialized.encode()))
+            return True
+        except Exception as e:
+            CACHE_ERRORS.labels(namespace, "set").inc()
+            logger.warning("Ошибка записи в кэш: %s", e)
+            return False
+    
+    @timed_async("cache")
+    @traced_cache("cache.put")
+    async def set_many(
+        self,
+        values: Dict[str, Any],
+        expire: int = 300
+    ) -> bool:
+        if not self.redis or not values:
+            return False
+        
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, value in values.items():
+                    serialized = json.dumps(value, ensure_ascii=False, default=str)
+                    CACHE_PAYLOAD.labels(cache_namespace(key), "set").observe(len(serialized.encode()))
+                    pipe.setex(key, expire, serialized)
+                await pipe.execute()
             return True
         except Exception as e:
-            print(f"Ошибка записи в кэш: {e}")
+            CACHE_ERRORS.labels(cache_namespace(next(iter(values))), "set_many").inc()
+            logger.warning("Ошибка записи в кэш: %s", e)
             return False
     
+    @timed_async("cache")
+    @traced_cache("cache.remove")
     async def delete(self, key: str) -> bool:
         if not self.redis:
             return False
@@ -64,9 +151,26 @@ class CacheManager:
             await self.redis.delete(key)
             return True
         except Exception as e:
-            print(f"Ошибка удаления из кэша: {e}")
+            CACHE_ERRORS.labels(cache_namespace(key), "delete").inc()
+            logger.warning("Ошибка удаления из кэша: %s", e)
+            return False
+    
+    @timed_async("cache")
+    @traced_cache("cache.remove")
+    async def delete_many(self, keys: List[str]) -> bool:
+        if not self.redis or not keys:
+            return False
+        
+        try:
+            await self.redis.delete(*keys)
+            return True
+        except Exception as e:
+            CACHE_ERRORS.labels(cache_namespace(keys[0]), "delete_many").inc()
+            logger.warning("Ошибка удаления из кэша: %s", e)
             return False
     
+    @timed_async("cache")
+    @traced_cache("cache.remove")
     async def delete_pattern(self, pattern: str) -> bool:
         if not self.redis:
             return False
@@ -80,7 +184,8 @@ class CacheManager:
                 await self.redis.delete(*keys)
             return True
         except Exception as e:
-            print(f"Ошибка удаления по шаблону: {e}")
+            CACHE_ERRORS.labels(cache_namespace(pattern), "delete_pattern").inc()
+            logger.warning("Ошибка удаления по шаблону: %s", e)
             return False
 
 cache_manager = CacheManager()
\ No newline at end of file
@@ -1,6 +1,10 @@
 import os
+from datetime import time
+from typing import Dict, List, Literal, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
 class Settings(BaseSettings):
     DB_HOST: str
     DB_PORT: str
@@ -10,9 +14,59 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     REDIS_URL: str = "redis://localhost:6379"  
+    STORAGE_DIR: str = os.path.join(BASE_DIR, "storage")
+    # Каталог фото объектов до перехода на блобы; нужен только миграции 763fd48c70e4
+    LEGACY_PROPERTY_PHOTOS_DIR: str = os.path.join(os.path.dirname(BASE_DIR), "property_photos")
+    # "s3" требует пакет aiobotocore
+    STORAGE_BACKEND: Literal["local", "s3"] = "local"
+    S3_ENDPOINT_URL: Optional[str] = None
+    S3_BUCKET: str = "vkr-uploads"
+    S3_ACCESS_KEY: Optional[str] = None
+    S3_SECRET_KEY: Optional[str] = None
+    S3_REGION: str = "us-east-1"
+    PRESIGNED_URL_EXPIRE: int = 300
+    STORAGE_IO_WORKERS: int = 8
+    BLOB_REAPER_INTERVAL: int = 60
+    UPLOAD_MAX_FILE_SIZE: int = 2 * 1024 * 1024 * 1024
+    UPLOAD_MAX_CHUNK_SIZE: int = 16 * 1024 * 1024
+    UPLOAD_SESSION_TTL: int = 24 * 60 * 60
+    UPLOAD_SESSIONS_PER_USER: int = 3
+    UPLOAD_GC_INTERVAL: int = 10 * 60
+    SEARCH_INDEX_WORKERS: int = 2
+    SEARCH_INDEX_INTERVAL: int = 60
+    SEARCH_INDEX_MAX_FILE_SIZE: int = 50 * 1024 * 1024
+    WORKING_DAY_START: time = time(9, 0)
+    WORKING_DAY_END: time = time(20, 0)
+    WORKING_WEEKDAYS: List[int] = [0, 1, 2, 3, 4, 5]
+    WORKING_UTC_OFFSET_HOURS: int = 3
+    SLOW_QUERY_MS: int = 500
+    EXPLAIN_SLOW_QUERIES: bool = True
+    QUERY_BUDGET: int = 30
+    N_PLUS_ONE_REPEATS: int = 5
+    SERVER_TIMING_ENABLED: bool = False
+    SENTRY_DSN: Optional[str] = None
+    SENTRY_ENVIRONMENT: str = "development"
+    SENTRY_RELEASE: Optional[str] = None
+    SENTRY_TRACES_SAMPLE_RATE: float = 0.0
+    SENTRY_TRACES_SAMPLE_RATES: Dict[str, float] = {}
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: Literal["json", "text"] = "json"
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0
+    ACCESS_LOG_SLOW_MS: int = 1000
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: Optional[int] = None
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEPALIVE: int = 75
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    HEALTH_CACHE_SECONDS: float = 2.0
+    HEALTH_CHECK_TIMEOUT: float = 2.0
+    HEALTH_POOL_SATURATION: float = 0.9
+    # Пауза между попытками переподключения к Redis из проверки готовности удваивается до этого предела
+    REDIS_RECONNECT_MAX_SECONDS: float = 60.0
 
     model_config = SettingsConfigDict(
-        env_file=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".env"))
+        env_file=os.path.join(BASE_DIR, ".env"))
     
 settings = Settings() # type: ignore
 
@@ -2,8 +2,10 @@ from sqlalchemy import select, update, delete
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from src.database import new_session, reset_sequence
 from src.exceptions import ConflictException
+from src.monitoring.metrics import instrument_dao
 
 
+@instrument_dao
 class BaseDAO:
     model = None  
     
@@ -12,6 +14,10 @@ class BaseDAO:
             raise ValueError(f'В {cls.__name__} model не должен быть None')
         return super().__new__(cls)
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        instrument_dao(cls)
+
     @classmethod
     async def _find(cls, **filter_by):
         async with new_session() as s:
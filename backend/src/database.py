@@ -1,3 +1,4 @@
+from contextlib import AsyncExitStack
 from datetime import datetime
 from typing import Annotated
 from sqlalchemy import DateTime, func, text
@@ -5,12 +6,24 @@ from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, Asyn
 from sqlalchemy.orm import DeclarativeBase, mapped_column
 
 from src.config import get_db_url
+from src.monitoring.metrics import InstrumentedPool, instrument_engine
+from src.monitoring.queries import instrument_queries
 
 DATABASE_URL = get_db_url()
 
-engine = create_async_engine(DATABASE_URL)
+engine = create_async_engine(DATABASE_URL, poolclass=InstrumentedPool)
+instrument_engine(engine)
+instrument_queries(engine)
 new_session = async_sessionmaker(engine, expire_on_commit=False)
 
+
+async def warm_up_pool() -> None:
+    """Открывает все соединения пула заранее, чтобы первые запросы не ждали подключения к Postgres."""
+    async with AsyncExitStack() as stack:
+        for _ in range(engine.pool.size()):
+            conn = await stack.enter_async_context(engine.connect())
+            await conn.execute(text("SELECT 1"))
+
 int_pk = Annotated[int, mapped_column(primary_key=True)]
 int_base = Annotated[int, mapped_column(nullable=False)]
 str_uniq = Annotated[str, mapped_column(unique=True, nullable=False)]
@@ -11,7 +11,9 @@ from src.deals.schema import (
     DealUpdateSchema,
     AgentCommissionItem,
     TopAgentItem,
-    AgencyRevenueSummary
+    AgencyRevenueSummary,
+    DealRerateSchema,
+    DealRerateResult,
 )
 from src.users.auth import get_current_user
 from src.cache import cache_manager
@@ -55,6 +57,30 @@ async def create_deal(payload: DealCreateSchema, current_user: UserModel = Depen
     return DealReadSchema.model_validate(new_deal)
 
 
+@router.post("/rerate", response_model=DealRerateResult)
+async def rerate_deals(payload: DealRerateSchema, current_user: UserModel = Depends(get_current_user)):
+    """Массовая смена ставок комиссии по фильтру; по умолчанию только показывает итоговую разницу."""
+    if not current_user.is_admin:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Доступно только администратору")
+    
+    result = await deals_service.rerate_commissions(
+        payload.agency_commission_rate,
+        payload.agent_commission_rate,
+        user_id=payload.user_id,
+        start_date=payload.start_date,
+        end_date=payload.end_date,
+        deal_type=payload.type,
+        operation_type=payload.operation_type,
+        dry_run=payload.dry_run,
+    )
+    
+    if not payload.dry_run and result["changed"]:
+        await cache_manager.delete_pattern("deals:*")
+        await cache_manager.delete_pattern("analytics:*")
+    
+    return result
+
+
 @router.get("/", response_model=List[DealReadSchema])
 async def list_deals(current_user: UserModel = Depends(get_current_user)):
     cache_key = f"deals:user:{current_user.id}"
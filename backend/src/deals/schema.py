@@ -1,6 +1,6 @@
 from datetime import date, datetime
 from typing import Optional
-from pydantic import BaseModel, ConfigDict, field_validator, model_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
 from src.my_types import DealOperationType, DealType
 
@@ -125,4 +125,37 @@ class AgencyRevenueSummary(BaseModel):
     agent_commission_total: float
     net_profit: float
     total_deals: int
-    total_volume: float
\ No newline at end of file
+    total_volume: float
+
+
+class DealRerateSchema(BaseModel):
+    user_id: Optional[int] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    type: Optional[DealType] = None
+    operation_type: Optional[DealOperationType] = None
+    agency_commission_rate: Optional[int] = Field(None, ge=0, le=100)
+    agent_commission_rate: Optional[int] = Field(None, ge=0, le=100)
+    dry_run: bool = True
+
+    model_config = ConfigDict(extra="forbid")
+
+    @model_validator(mode='after')
+    def validate_rates(self):
+        if self.agency_commission_rate is None and self.agent_commission_rate is None:
+            raise ValueError("Укажите новую ставку агентства или агента")
+        return self
+
+
+class CommissionTotals(BaseModel):
+    agency_commission_total: float
+    agent_commission_total: float
+
+
+class DealRerateResult(BaseModel):
+    dry_run: bool
+    matched: int
+    changed: int
+    before: CommissionTotals
+    after: CommissionTotals
+    diff: CommissionTotals
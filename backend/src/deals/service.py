@@ -1,11 +1,13 @@
 from datetime import date
 from typing import List, Dict, Any, Optional
 
-from sqlalchemy import select, func, desc
+from sqlalchemy import Numeric, select, func, desc, or_, update
+from sqlalchemy.orm import aliased
 from sqlalchemy.sql import label
 
 from src.database import new_session
 from src.model import DealModel, UserModel
+from src.my_types import DealOperationType, DealType
 
 
 async def commissions_by_agent(
@@ -145,4 +147,127 @@ async def agency_revenue_summary(
             "net_profit": agency_revenue - agent_total,
             "total_deals": int(row.total_deals) if row else 0,
             "total_volume": float(row.total_volume) if row else 0.0,
-        }
\ No newline at end of file
+        }
+
+
+# round в SQL (numeric, половина от нуля) и round по float в calculate_commissions расходятся
+# на копейку для сумм, оканчивающихся ровно на .xx5, — такое расхождение изменением не считается
+ROUNDING_TOLERANCE = 0.01
+
+
+def _rounded(value):
+    return func.round(func.cast(value, Numeric), 2)
+
+
+def _differs(new, old):
+    return func.abs(new - func.cast(old, Numeric)) > ROUNDING_TOLERANCE
+
+
+async def rerate_commissions(
+    agency_commission_rate: Optional[int],
+    agent_commission_rate: Optional[int],
+    user_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    deal_type: Optional[DealType] = None,
+    operation_type: Optional[DealOperationType] = None,
+    dry_run: bool = True,
+) -> Dict[str, Any]:
+    """Пересчёт комиссий по фильтру одним UPDATE; в режиме dry_run — та же выборка без записи.
+
+    Формулы совпадают с calculate_commissions в deals/router.py; суммы при неизменных ставках
+    считаются изменёнными, только если отличаются больше чем на ROUNDING_TOLERANCE.
+    """
+    old = aliased(DealModel, name="old")
+
+    def rates(model):
+        agency_rate = agency_commission_rate if agency_commission_rate is not None else model.agency_commission_rate
+        agent_rate = agent_commission_rate if agent_commission_rate is not None else model.agent_commission_rate
+        agency = _rounded(model.deal_amount * agency_rate / 100.0)
+        agent = _rounded((model.deal_amount * agency_rate / 100.0 + model.fixed_payment) * agent_rate / 100.0)
+        return agency_rate, agent_rate, agency, agent
+
+    def filters(model):
+        conditions = []
+        if user_id is not None:
+            conditions.append(model.user_id == user_id)
+        if start_date is not None:
+            conditions.append(model.deal_date >= start_date)
+        if end_date is not None:
+            conditions.append(model.deal_date <= end_date)
+        if deal_type is not None:
+            conditions.append(model.type == deal_type)
+        if operation_type is not None:
+            conditions.append(model.operation_type == operation_type)
+        return conditions
+
+    async with new_session() as s:
+        async with s.begin():
+            matched = await s.scalar(select(func.count(DealModel.id)).where(*filters(DealModel)))
+
+            agency_rate, agent_rate, new_agency, new_agent = rates(old)
+            changed = or_(
+                _differs(new_agency, old.agency_commission_amount),
+                _differs(new_agent, old.agent_commission_amount),
+                old.agency_commission_rate != agency_rate,
+                old.agent_commission_rate != agent_rate,
+            )
+            if dry_run:
+                rows = (
+                    select(
+                        old.agency_commission_amount.label("old_agency"),
+                        old.agent_commission_amount.label("old_agent"),
+                        new_agency.label("new_agency"),
+                        new_agent.label("new_agent"),
+                    )
+                    .where(*filters(old), changed)
+                    .cte("rerated")
+                )
+            else:
+                # Самосоединение со снимком строки даёт в RETURNING значения до изменения
+                rows = (
+                    update(DealModel)
+                    .where(DealModel.id == old.id, *filters(old), changed)
+                    .values(
+                        agency_commission_rate=agency_rate,
+                        agent_commission_rate=agent_rate,
+                        agency_commission_amount=new_agency,
+                        agent_commission_amount=new_agent,
+                    )
+                    .returning(
+                        old.agency_commission_amount.label("old_agency"),
+                        old.agent_commission_amount.label("old_agent"),
+                        DealModel.agency_commission_amount.label("new_agency"),
+                        DealModel.agent_commission_amount.label("new_agent"),
+                    )
+                    .cte("rerated")
+                )
+
+            totals = (
+                await s.execute(
+                    select(
+                        func.count().label("changed"),
+                        func.coalesce(func.sum(rows.c.old_agency), 0).label("old_agency"),
+                        func.coalesce(func.sum(rows.c.old_agent), 0).label("old_agent"),
+                        func.coalesce(func.sum(rows.c.new_agency), 0).label("new_agency"),
+                        func.coalesce(func.sum(rows.c.new_agent), 0).label("new_agent"),
+                    )
+                )
+            ).one()
+
+    before = {
+        "agency_commission_total": float(totals.old_agency),
+        "agent_commission_total": float(totals.old_agent),
+    }
+    after = {
+        "agency_commission_total": float(totals.new_agency),
+        "agent_commission_total": float(totals.new_agent),
+    }
+    return {
+        "dry_run": dry_run,
+        "matched": int(matched),
+        "changed": int(totals.changed),
+        "before": before,
+        "after": after,
+        "diff": {key: round(after[key] - before[key], 2) for key in before},
+    }
@@ -0,0 +1,112 @@
+import io
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import AsyncIterator, Iterable, Set
+
+from src.model import DocumentModel
+from src.monitoring.tracing import span
+from src.storage.base import CHUNK_SIZE
+from src.storage.blobs import blob_store
+from src.storage.executor import run_io
+
+# Уже сжатые форматы кладутся в архив без повторного сжатия
+STORED_EXTENSIONS = {
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp',
+    '.zip', '.rar', '.docx', '.xlsx',
+}
+
+
+class _ZipSink(io.RawIOBase):
+    """Несмещаемый приёмник для zipfile: накапливает байты до очередного drain()."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        data = bytes(b)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def _read_legacy(path: Path) -> AsyncIterator[bytes]:
+    """Документ без sha256 читается по старому file_path, как в download_document."""
+    f = await run_io(open, path, 'rb')
+    try:
+        while chunk := await run_io(f.read, CHUNK_SIZE):
+            yield chunk
+    finally:
+        await run_io(f.close)
+
+
+def _archive_name(document: DocumentModel, used: Set[str]) -> str:
+    filename = PurePosixPath(document.original_filename.replace("\\", "/")).name or document.filename
+    folder = (document.folder or "").strip("/")
+    name = f"{folder}/{filename}" if folder else filename
+
+    candidate, counter = name, 2
+    while candidate in used:
+        path = PurePosixPath(name)
+        candidate = str(path.with_name(f"{path.stem} ({counter}){path.suffix}"))
+        counter += 1
+    used.add(candidate)
+    return candidate
+
+
+async def stream_bundle(documents: Iterable[DocumentModel]) -> AsyncIterator[bytes]:
+    """ZIP-архив, собираемый на лету: в памяти держится не больше одного блока файла."""
+    sink = _ZipSink()
+    used: Set[str] = set()
+
+    # span на всю отправку архива: чтение блобов и сжатие идут по мере выдачи ответа
+    with span("file.serve", "documents.bundle"):
+        with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+            for document in documents:
+                if document.sha256:
+                    chunks = blob_store.stream(document.sha256)
+                else:
+                    chunks = _read_legacy(Path(document.file_path))
+
+                try:
+                    first = await anext(chunks)
+                except StopAsyncIteration:
+                    first = b""
+                except FileNotFoundError:
+                    continue
+
+                zinfo = zipfile.ZipInfo(
+                    _archive_name(document, used),
+                    date_time=document.created_at.timetuple()[:6],
+                )
+                zinfo.file_size = document.file_size
+                zinfo.compress_type = (
+                    zipfile.ZIP_STORED
+                    if PurePosixPath(document.original_filename).suffix.lower() in STORED_EXTENSIONS
+                    else zipfile.ZIP_DEFLATED
+                )
+
+                with zf.open(zinfo, mode='w') as entry:
+                    entry.write(first)
+                    if data := sink.drain():
+                        yield data
+                    async for chunk in chunks:
+                        entry.write(chunk)
+                        if data := sink.drain():
+                            yield data
+                if data := sink.drain():
+                    yield data
+
+        if data := sink.drain():
+            yield data
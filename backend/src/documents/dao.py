@@ -1,42 +1,347 @@
-from typing import Optional
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
 from src.dao.base import BaseDAO
-from src.model import DocumentModel
-from sqlalchemy import select, func
-from src.database import new_session
+from src.documents.folders import folder_ancestors, normalize_folder, parent_folder
+from src.exceptions import ConflictException
+from src.model import DocumentFolderModel, DocumentModel, UploadSessionModel
+from sqlalchemy import delete, select, func, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from src.database import new_session, reset_sequence
+
+# (папка, изменение числа документов, изменение объёма в байтах)
+FolderChange = Tuple[Optional[str], int, int]
+
+
+class DocumentFolderDAO(BaseDAO):
+    model = DocumentFolderModel
+
+    @classmethod
+    async def apply(cls, s, user_id: int, changes: Iterable[FolderChange]) -> None:
+        """Применяет изменения счётчиков к папкам и всем их предкам в транзакции сессии `s`."""
+        deltas: Dict[str, List[int]] = defaultdict(lambda: [0, 0, 0, 0])
+        for folder, count, size in changes:
+            folder = normalize_folder(folder)
+            if not folder:
+                continue
+            for path in folder_ancestors(folder):
+                delta = deltas[path]
+                if path == folder:
+                    delta[0] += count
+                    delta[1] += size
+                delta[2] += count
+                delta[3] += size
+
+        rows = [
+            {
+                "user_id": user_id,
+                "path": path,
+                "parent_path": parent_folder(path),
+                "depth": path.count("/"),
+                "document_count": delta[0],
+                "total_bytes": delta[1],
+                "tree_document_count": delta[2],
+                "tree_total_bytes": delta[3],
+            }
+            # Строки блокируются в порядке путей, чтобы встречные переносы не взаимоблокировались
+            for path, delta in sorted(deltas.items())
+            if any(delta)
+        ]
+        if not rows:
+            return
+
+        query = insert(cls.model).values(rows)
+        query = query.on_conflict_do_update(
+            constraint="uq_document_folders_user_path",
+            set_={
+                column: getattr(cls.model, column) + getattr(query.excluded, column)
+                for column in ("document_count", "total_bytes", "tree_document_count", "tree_total_bytes")
+            },
+        )
+        await s.execute(query)
+        await s.execute(
+            delete(cls.model).where(
+                cls.model.user_id == user_id,
+                cls.model.path.in_([row["path"] for row in rows]),
+                cls.model.tree_document_count <= 0,
+            )
+        )
+
+    @classmethod
+    async def find_folders(cls, user_id: Optional[int] = None, parent: Optional[str] = None, children_only: bool = False):
+        """Дерево папок пользователя; без user_id — сводка по всем пользователям."""
+        async with new_session() as s:
+            if user_id is not None:
+                query = select(
+                    cls.model.path,
+                    cls.model.parent_path,
+                    cls.model.depth,
+                    cls.model.document_count,
+                    cls.model.total_bytes,
+                    cls.model.tree_document_count,
+                    cls.model.tree_total_bytes,
+                ).where(cls.model.user_id == user_id)
+            else:
+                query = select(
+                    cls.model.path,
+                    cls.model.parent_path,
+                    cls.model.depth,
+                    func.sum(cls.model.document_count).label("document_count"),
+                    func.sum(cls.model.total_bytes).label("total_bytes"),
+                    func.sum(cls.model.tree_document_count).label("tree_document_count"),
+                    func.sum(cls.model.tree_total_bytes).label("tree_total_bytes"),
+                ).group_by(cls.model.path, cls.model.parent_path, cls.model.depth)
+
+            if children_only:
+                parent = normalize_folder(parent)
+                query = query.where(
+                    cls.model.parent_path == parent if parent else cls.model.parent_path.is_(None)
+                )
+            query = query.order_by(cls.model.path)
+            result = await s.execute(query)
+            return result.mappings().all()
 
 
 class DocumentDAO(BaseDAO):
     model = DocumentModel
 
     @classmethod
-    async def get_folders(cls):
+    async def add(cls, **values):
+        values["folder"] = normalize_folder(values.get("folder"))
         async with new_session() as s:
-            query = (
-                select(
-                    cls.model.folder,
-                    func.count(cls.model.id).label('count')
+            obj = cls.model(**values)
+            try:
+                async with s.begin():
+                    s.add(obj)
+                    await s.flush()
+                    await DocumentFolderDAO.apply(s, obj.uploaded_by, [(obj.folder, 1, obj.file_size)])
+            except IntegrityError as e:
+                error_msg = str(e.orig) if hasattr(e, 'orig') else str(e)
+                
+                if "unique constraint" in error_msg.lower():
+                    raise ConflictException("Запись с такими данными уже существует")
+                elif "foreign key constraint" in error_msg.lower():
+                    raise ConflictException("Связанная запись не найдена")
+                raise
+            await s.refresh(obj)
+            return obj
+
+    @classmethod
+    async def update(cls, filter_by: dict, values: dict):
+        if "folder" in values:
+            values["folder"] = normalize_folder(values["folder"])
+        
+        async with new_session() as s:
+            try:
+                async with s.begin():
+                    query = (
+                        select(cls.model.id, cls.model.uploaded_by, cls.model.folder, cls.model.file_size)
+                        .filter_by(**filter_by)
+                        .with_for_update()
+                    )
+                    documents = (await s.execute(query)).all()
+                    if not documents:
+                        return 0
+
+                    await s.execute(
+                        update(cls.model)
+                        .where(cls.model.id.in_([d.id for d in documents]))
+                        .values(**values)
+                    )
+
+                    if "folder" in values:
+                        changes: Dict[int, List[FolderChange]] = defaultdict(list)
+                        for d in documents:
+                            if d.folder != values["folder"]:
+                                changes[d.uploaded_by] += [(d.folder, -1, -d.file_size), (values["folder"], 1, d.file_size)]
+                        for user_id, user_changes in sorted(changes.items()):
+                            await DocumentFolderDAO.apply(s, user_id, user_changes)
+                    return len(documents)
+            except IntegrityError as e:
+                error_msg = str(e.orig) if hasattr(e, 'orig') else str(e)
+                
+                if "unique constraint" in error_msg.lower():
+                    raise ConflictException("Запись с такими данными уже существует")
+                elif "foreign key constraint" in error_msg.lower():
+                    raise ConflictException("Связанная запись не найдена")
+                raise
+
+    @classmethod
+    async def delete(cls, **filter_by):
+        async with new_session() as s:
+            try:
+                async with s.begin():
+                    query = (
+                        delete(cls.model)
+                        .filter_by(**filter_by)
+                        .returning(cls.model.uploaded_by, cls.model.folder, cls.model.file_size)
+                    )
+                    documents = (await s.execute(query)).all()
+
+                    changes: Dict[int, List[FolderChange]] = defaultdict(list)
+                    for d in documents:
+                        changes[d.uploaded_by].append((d.folder, -1, -d.file_size))
+                    for user_id, user_changes in sorted(changes.items()):
+                        await DocumentFolderDAO.apply(s, user_id, user_changes)
+            except IntegrityError:
+                raise ConflictException("Невозможно удалить: существуют связанные записи")
+
+        if documents:
+            await reset_sequence(cls.model.__tablename__)
+        return len(documents)
+
+    @classmethod
+    async def find_page(
+        cls,
+        limit: int,
+        cursor: Optional[Tuple[datetime, int]] = None,
+        uploaded_by: Optional[int] = None,
+        folder: Optional[str] = None,
+        client_id: Optional[int] = None,
+        property_id: Optional[int] = None,
+        deal_id: Optional[int] = None,
+    ):
+        """Страница документов от новых к старым; курсор — (created_at, id) последней строки."""
+        async with new_session() as s:
+            query = select(cls.model).order_by(cls.model.created_at.desc(), cls.model.id.desc()).limit(limit)
+            if uploaded_by is not None:
+                query = query.where(cls.model.uploaded_by == uploaded_by)
+            if folder:
+                query = query.where(cls.model.folder == normalize_folder(folder))
+            if client_id:
+                query = query.where(cls.model.client_id == client_id)
+            if property_id:
+                query = query.where(cls.model.property_id == property_id)
+            if deal_id:
+                query = query.where(cls.model.deal_id == deal_id)
+            if cursor:
+                query = query.where(tuple_(cls.model.created_at, cls.model.id) < tuple_(*cursor))
+            result = await s.execute(query)
+            return result.scalars().all()
+
+    @classmethod
+    async def find_for_bundle(
+        cls,
+        folder: Optional[str] = None,
+        deal_id: Optional[int] = None,
+        client_id: Optional[int] = None,
+        uploaded_by: Optional[int] = None,
+    ):
+        async with new_session() as s:
+            query = select(cls.model).order_by(cls.model.folder, cls.model.created_at, cls.model.id)
+            folder = normalize_folder(folder)
+            if folder:
+                query = query.where(
+                    (cls.model.folder == folder) | cls.model.folder.startswith(f"{folder}/", autoescape=True)
                 )
-                .filter(cls.model.folder.isnot(None))
-                .group_by(cls.model.folder)
+            if deal_id:
+                query = query.where(cls.model.deal_id == deal_id)
+            if client_id:
+                query = query.where(cls.model.client_id == client_id)
+            if uploaded_by is not None:
+                query = query.where(cls.model.uploaded_by == uploaded_by)
+            result = await s.execute(query)
+            return result.scalars().all()
+
+    @classmethod
+    async def search(
+        cls,
+        q: str,
+        limit: int,
+        offset: int = 0,
+        uploaded_by: Optional[int] = None,
+    ):
+        """Полнотекстовый поиск по GIN-индексу search_vector, отсортированный по релевантности."""
+        async with new_session() as s:
+            tsquery = func.websearch_to_tsquery('russian', q)
+            rank = func.ts_rank_cd(cls.model.search_vector, tsquery).label('rank')
+            query = (
+                select(cls.model, rank)
+                .where(cls.model.search_vector.op('@@')(tsquery))
+                .order_by(rank.desc(), cls.model.id.desc())
+                .limit(limit)
+                .offset(offset)
             )
+            if uploaded_by is not None:
+                query = query.where(cls.model.uploaded_by == uploaded_by)
             result = await s.execute(query)
             return result.all()
 
     @classmethod
-    async def find_by_folder(cls, folder: str):
+    async def find_not_indexed(cls, limit: int) -> List[int]:
         async with new_session() as s:
-            query = select(cls.model).filter_by(folder=folder)
+            query = (
+                select(cls.model.id)
+                .where(cls.model.indexed_at.is_(None))
+                .order_by(cls.model.id)
+                .limit(limit)
+            )
             result = await s.execute(query)
-            return result.scalars().all()
+            return list(result.scalars().all())
 
     @classmethod
-    async def find_by_entity(cls, client_id: Optional[int] = None, property_id: Optional[int] = None, deal_id: Optional[int] = None):
-        filters = {}
-        if client_id:
-            filters['client_id'] = client_id
-        if property_id:
-            filters['property_id'] = property_id
-        if deal_id:
-            filters['deal_id'] = deal_id
-        
-        return await cls.find_all(**filters)
\ No newline at end of file
+    async def find_indexed_content(cls, sha256: str) -> Optional[str]:
+        """Уже извлечённый текст того же содержимого, загруженного другим документом."""
+        async with new_session() as s:
+            query = (
+                select(cls.model.content_text)
+                .where(
+                    cls.model.sha256 == sha256,
+                    cls.model.indexed_at.isnot(None),
+                    cls.model.content_text.isnot(None),
+                )
+                .limit(1)
+            )
+            result = await s.execute(query)
+            return result.scalar_one_or_none()
+
+    @classmethod
+    async def set_content(cls, document_id: int, content_text: Optional[str]) -> None:
+        async with new_session() as s:
+            query = (
+                update(cls.model)
+                .where(cls.model.id == document_id)
+                .values(content_text=content_text, indexed_at=func.now())
+            )
+            await s.execute(query)
+            await s.commit()
+
+
+class UploadSessionDAO(BaseDAO):
+    model = UploadSessionModel
+
+    # Пространство имён advisory-блокировок для лимита сессий на пользователя
+    LOCK_NAMESPACE = 28
+
+    @classmethod
+    async def add_limited(cls, limit: int, **values) -> Optional[UploadSessionModel]:
+        """Создаёт сессию, если у пользователя меньше `limit` активных сессий."""
+        async with new_session() as s:
+            async with s.begin():
+                await s.execute(select(func.pg_advisory_xact_lock(cls.LOCK_NAMESPACE, values["user_id"])))
+                active = await s.execute(
+                    select(func.count(cls.model.id)).where(
+                        cls.model.user_id == values["user_id"],
+                        cls.model.expires_at > func.now(),
+                    )
+                )
+                if (active.scalar() or 0) >= limit:
+                    return None
+
+                obj = cls.model(**values)
+                s.add(obj)
+            return obj
+
+    @classmethod
+    async def delete_expired(cls) -> List[uuid.UUID]:
+        async with new_session() as s:
+            query = (
+                delete(cls.model)
+                .where(cls.model.expires_at <= func.now())
+                .returning(cls.model.id)
+            )
+            result = await s.execute(query)
+            await s.commit()
+            return list(result.scalars().all())
@@ -0,0 +1,89 @@
+import zipfile
+from pathlib import PurePosixPath
+from typing import BinaryIO, Iterator, Optional
+from xml.etree.ElementTree import iterparse
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # pragma: no cover - pypdf необязателен (pip install pypdf), без него PDF индексируются только по метаданным
+    PdfReader = None
+
+# Ограничение на объём извлекаемого текста: tsvector не может превышать 1 МБ
+MAX_TEXT_LENGTH = 200_000
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+S_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+def _limited(parts: Iterator[str]) -> str:
+    collected, length = [], 0
+    for part in parts:
+        if not part:
+            continue
+        collected.append(part)
+        length += len(part) + 1
+        if length >= MAX_TEXT_LENGTH:
+            break
+    return " ".join(collected)[:MAX_TEXT_LENGTH]
+
+
+def _iter_xml_text(zf: zipfile.ZipFile, member: str, tags: set[str]) -> Iterator[str]:
+    with zf.open(member) as f:
+        for _, elem in iterparse(f, events=("end",)):
+            if elem.tag in tags and elem.text:
+                yield elem.text
+            elem.clear()
+
+
+def _extract_txt(f: BinaryIO) -> str:
+    data = f.read(MAX_TEXT_LENGTH * 4)
+    for encoding in ("utf-8", "cp1251"):
+        try:
+            return data.decode(encoding)[:MAX_TEXT_LENGTH]
+        except UnicodeDecodeError:
+            continue
+    return data.decode("utf-8", errors="ignore")[:MAX_TEXT_LENGTH]
+
+
+def _extract_docx(f: BinaryIO) -> str:
+    with zipfile.ZipFile(f) as zf:
+        return _limited(_iter_xml_text(zf, "word/document.xml", {f"{W_NS}t"}))
+
+
+def _extract_xlsx(f: BinaryIO) -> str:
+    with zipfile.ZipFile(f) as zf:
+        def parts() -> Iterator[str]:
+            names = set(zf.namelist())
+            if "xl/sharedStrings.xml" in names:
+                yield from _iter_xml_text(zf, "xl/sharedStrings.xml", {f"{S_NS}t"})
+            for name in sorted(n for n in names if n.startswith("xl/worksheets/") and n.endswith(".xml")):
+                yield from _iter_xml_text(zf, name, {f"{S_NS}t", f"{S_NS}v"})
+
+        return _limited(parts())
+
+
+def _extract_pdf(f: BinaryIO) -> Optional[str]:
+    reader = PdfReader(f)
+    return _limited(page.extract_text() or "" for page in reader.pages)
+
+
+EXTRACTORS = {
+    ".txt": _extract_txt,
+    ".docx": _extract_docx,
+    ".xlsx": _extract_xlsx,
+}
+if PdfReader is not None:
+    EXTRACTORS[".pdf"] = _extract_pdf
+
+
+def can_extract(filename: str) -> bool:
+    return PurePosixPath(filename).suffix.lower() in EXTRACTORS
+
+
+def extract_text(filename: str, f: BinaryIO) -> Optional[str]:
+    """Текст документа для полнотекстового индекса; None, если формат не поддерживается."""
+    extractor = EXTRACTORS.get(PurePosixPath(filename).suffix.lower())
+    if extractor is None:
+        return None
+    text = extractor(f)
+    return text.replace("\x00", " ") if text else text
@@ -0,0 +1,20 @@
+from typing import List, Optional
+
+
+def normalize_folder(folder: Optional[str]) -> Optional[str]:
+    """Приводит путь папки к виду `a/b/c`: без пустых сегментов, `.` и `..`."""
+    if folder is None:
+        return None
+    parts = [part.strip() for part in folder.replace("\\", "/").split("/")]
+    path = "/".join(part for part in parts if part and part not in (".", ".."))
+    return path or None
+
+
+def parent_folder(path: str) -> Optional[str]:
+    return path.rsplit("/", 1)[0] if "/" in path else None
+
+
+def folder_ancestors(path: str) -> List[str]:
+    """Путь и все его предки: `a/b/c` -> [`a`, `a/b`, `a/b/c`]."""
+    parts = path.split("/")
+    return ["/".join(parts[:i]) for i in range(1, len(parts) + 1)]
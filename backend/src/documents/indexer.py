@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import tempfile
+from contextlib import suppress
+from typing import List, Optional, Set
+
+from src.config import settings
+from src.documents.dao import DocumentDAO
+from src.documents.extract import PdfReader, can_extract, extract_text
+from src.model import DocumentModel
+from src.storage.blobs import blob_store
+from src.storage.executor import run_io
+
+logger = logging.getLogger(__name__)
+
+# Файлы меньше этого порога при извлечении текста держатся в памяти
+SPOOL_SIZE = 8 * 1024 * 1024
+
+
+class DocumentIndexer:
+    """Фоновое извлечение текста документов для полнотекстового поиска.
+
+    Новые документы ставятся в очередь сразу после загрузки; периодический обход
+    подбирает всё, что не успело проиндексироваться (перезапуск, другой воркер).
+    """
+
+    def __init__(self, workers: int, interval: int):
+        self.workers = workers
+        self.interval = interval
+        self._queue: asyncio.Queue[int] = asyncio.Queue()
+        self._queued: Set[int] = set()
+        self._tasks: List[asyncio.Task] = []
+
+    def enqueue(self, document_id: int) -> None:
+        if document_id not in self._queued:
+            self._queued.add(document_id)
+            self._queue.put_nowait(document_id)
+
+    async def _read_text(self, document: DocumentModel) -> Optional[str]:
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as f:
+            # После SPOOL_SIZE запись уходит на диск, поэтому не в цикле событий
+            async for chunk in blob_store.stream(document.sha256):
+                await run_io(f.write, chunk)
+            await run_io(f.seek, 0)
+            return await asyncio.to_thread(extract_text, document.original_filename, f)
+
+    async def index_document(self, document_id: int) -> None:
+        document = await DocumentDAO.find_one_or_none(id=document_id)
+        if not document or document.indexed_at is not None:
+            return
+
+        content_text = None
+        if (
+            document.sha256
+            and document.file_size <= settings.SEARCH_INDEX_MAX_FILE_SIZE
+            and can_extract(document.original_filename)
+        ):
+            content_text = await DocumentDAO.find_indexed_content(document.sha256)
+            if content_text is None:
+                try:
+                    content_text = await self._read_text(document)
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    # Повреждённый файл индексируется только по метаданным, без повторных попыток
+                    logger.warning("Ошибка извлечения текста документа %s: %s", document_id, e)
+
+        await DocumentDAO.set_content(document_id, content_text)
+
+    async def _work(self) -> None:
+        while True:
+            document_id = await self._queue.get()
+            try:
+                await self.index_document(document_id)
+            except Exception:
+                logger.exception("Ошибка индексации документа %s", document_id)
+            finally:
+                self._queued.discard(document_id)
+                self._queue.task_done()
+
+    async def _sweep(self) -> None:
+        batch_size = self.workers * 50
+        while True:
+            pending: List[int] = []
+            try:
+                pending = await DocumentDAO.find_not_indexed(batch_size)
+                for document_id in pending:
+                    self.enqueue(document_id)
+                await self._queue.join()
+            except Exception:
+                logger.exception("Ошибка обхода неиндексированных документов")
+                pending = []
+            # Накопившийся хвост (например, после миграции) разбирается без пауз
+            if len(pending) < batch_size:
+                await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if PdfReader is None:
+            logger.warning("pypdf не установлен: текст PDF не индексируется, поиск по ним только по метаданным")
+        self._tasks = [asyncio.create_task(self._sweep())]
+        self._tasks += [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+
+
+document_indexer = DocumentIndexer(settings.SEARCH_INDEX_WORKERS, settings.SEARCH_INDEX_INTERVAL)
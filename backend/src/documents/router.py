@@ -1,23 +1,36 @@
-import os
-import shutil
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from fastapi.responses import FileResponse
-import aiofiles
-from pathlib import Path
+import base64
 import uuid
+from datetime import datetime
+from typing import List, Optional, Tuple
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status, UploadFile, File, Form
+from fastapi.responses import FileResponse, StreamingResponse
+from pathlib import Path
 
 from src.model import UserModel
-from src.documents.dao import DocumentDAO
-from src.documents.schema import DocumentReadSchema, DocumentUpdateSchema, FolderSchema
+from src.documents.dao import DocumentDAO, DocumentFolderDAO
+from src.documents.schema import (
+    DocumentPageSchema,
+    DocumentReadSchema,
+    DocumentSearchPageSchema,
+    DocumentSearchResultSchema,
+    DocumentUpdateSchema,
+    DownloadUrlSchema,
+    FolderSchema,
+    UploadSessionCreateSchema,
+    UploadSessionReadSchema,
+)
+from src.documents.uploads import upload_manager
+from src.documents.bundle import stream_bundle
+from src.documents.indexer import document_indexer
+from src.config import settings
+from src.storage.blobs import blob_store, blob_filename
+from src.storage.executor import run_io
 from src.users.auth import get_current_user
-from src.exceptions import NotFoundException
+from src.exceptions import AppException, NotFoundException
 
 router = APIRouter(prefix="/documents", tags=["Документы"])
 
-UPLOAD_DIR = Path(r"C:\Users\Georgy\PycharmProjects\pythonProject\VKR\documents_uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
-
 ALLOWED_EXTENSIONS = {
     '.pdf', '.doc', '.docx', '.xls', '.xlsx', 
     '.jpg', '.jpeg', '.png', '.txt', '.zip', '.rar'
@@ -34,11 +47,6 @@ def is_allowed_file(filename: str) -> bool:
     return get_file_extension(filename) in ALLOWED_EXTENSIONS
 
 
-def generate_unique_filename(original_filename: str) -> str:
-    ext = get_file_extension(original_filename)
-    return f"{uuid.uuid4()}{ext}"
-
-
 @router.post("/upload", response_model=DocumentReadSchema, status_code=status.HTTP_201_CREATED)
 async def upload_document(
     file: UploadFile = File(...),
@@ -62,46 +70,23 @@ async def upload_document(
             detail=f"Недопустимый тип файла. Разрешены: {', '.join(ALLOWED_EXTENSIONS)}"
         )
 
-    unique_filename = generate_unique_filename(file.filename)
-    
-
-    if folder:
-        folder_path = UPLOAD_DIR / folder
-        folder_path.mkdir(exist_ok=True)
-        file_path = folder_path / unique_filename
-    else:
-        file_path = UPLOAD_DIR / unique_filename
-    
-    file_size = 0
     try:
-        async with aiofiles.open(file_path, 'wb') as f:
-            while chunk := await file.read(8192):
-                file_size += len(chunk)
-                
-                # Проверка размера
-                if file_size > MAX_FILE_SIZE:
-                    await f.close()
-                    os.remove(file_path)
-                    raise HTTPException(
-                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                        detail=f"Файл слишком большой. Максимальный размер: {MAX_FILE_SIZE / (1024*1024)} МБ"
-                    )
-                
-                await f.write(chunk)
+        blob = await blob_store.save(file, MAX_FILE_SIZE)
+    except AppException:
+        raise
     except Exception as e:
-        if os.path.exists(file_path):
-            os.remove(file_path)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка при сохранении файла: {str(e)}"
         )
     
     document_data = {
-        "filename": unique_filename,
+        "filename": blob_filename(blob.sha256, file.filename),
         "original_filename": file.filename,
-        "file_path": str(file_path),
-        "file_size": file_size,
+        "file_path": blob.key,
+        "file_size": blob.size,
         "mime_type": file.content_type or "application/octet-stream",
+        "sha256": blob.sha256,
         "folder": folder,
         "description": description,
         "client_id": client_id,
@@ -110,40 +95,218 @@ async def upload_document(
         "uploaded_by": current_user.id
     }
     
-    document = await DocumentDAO.add(**document_data)
+    try:
+        document = await DocumentDAO.add(**document_data)
+    except Exception:
+        await blob_store.release(blob.sha256)
+        raise
+    document_indexer.enqueue(document.id)
     return DocumentReadSchema.model_validate(document)
 
 
-@router.get("/", response_model=List[DocumentReadSchema])
+def encode_cursor(document) -> str:
+    raw = f"{document.created_at.isoformat()}|{document.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, document_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(document_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор"
+        )
+
+
+@router.get("/", response_model=DocumentPageSchema)
 async def get_all_documents(
     folder: Optional[str] = None,
     client_id: Optional[int] = None,
     property_id: Optional[int] = None,
     deal_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
     current_user: UserModel = Depends(get_current_user)
 ):
+    documents = await DocumentDAO.find_page(
+        limit=limit + 1,
+        cursor=decode_cursor(cursor) if cursor else None,
+        uploaded_by=None if current_user.is_admin else current_user.id,
+        folder=folder,
+        client_id=client_id,
+        property_id=property_id,
+        deal_id=deal_id
+    )
     
-    if folder:
-        documents = await DocumentDAO.find_by_folder(folder)
-    elif client_id or property_id or deal_id:
-        documents = await DocumentDAO.find_by_entity(
-            client_id=client_id,
-            property_id=property_id,
-            deal_id=deal_id
+    next_cursor = encode_cursor(documents[limit - 1]) if len(documents) > limit else None
+    return DocumentPageSchema(
+        items=[DocumentReadSchema.model_validate(doc) for doc in documents[:limit]],
+        next_cursor=next_cursor
+    )
+
+
+@router.get("/folders", response_model=List[FolderSchema])
+async def get_folders(
+    parent: Optional[str] = None,
+    current_user: UserModel = Depends(get_current_user)
+):
+    # Без parent — всё дерево, с parent (пустая строка — корень) — только вложенные папки
+    folders = await DocumentFolderDAO.find_folders(
+        user_id=None if current_user.is_admin else current_user.id,
+        parent=parent,
+        children_only=parent is not None
+    )
+    return [
+        FolderSchema(
+            name=folder["path"],
+            parent=folder["parent_path"],
+            depth=folder["depth"],
+            count=folder["document_count"],
+            total_bytes=folder["total_bytes"],
+            tree_count=folder["tree_document_count"],
+            tree_total_bytes=folder["tree_total_bytes"],
         )
+        for folder in folders
+    ]
+
+
+@router.get("/search", response_model=DocumentSearchPageSchema)
+async def search_documents(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    current_user: UserModel = Depends(get_current_user)
+):
+    rows = await DocumentDAO.search(
+        q,
+        limit=limit + 1,
+        offset=offset,
+        uploaded_by=None if current_user.is_admin else current_user.id
+    )
+    items = [
+        DocumentSearchResultSchema(**DocumentReadSchema.model_validate(document).model_dump(), rank=rank)
+        for document, rank in rows[:limit]
+    ]
+    return DocumentSearchPageSchema(items=items, limit=limit, offset=offset, has_more=len(rows) > limit)
+
+
+@router.get("/bundle")
+async def download_bundle(
+    folder: Optional[str] = None,
+    deal_id: Optional[int] = None,
+    client_id: Optional[int] = None,
+    current_user: UserModel = Depends(get_current_user)
+):
+    if not (folder or deal_id or client_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Укажите папку, сделку или клиента"
+        )
+    
+    documents = await DocumentDAO.find_for_bundle(
+        folder=folder,
+        deal_id=deal_id,
+        client_id=client_id,
+        uploaded_by=None if current_user.is_admin else current_user.id
+    )
+    if not documents:
+        raise NotFoundException("Документы не найдены")
+    
+    if deal_id:
+        archive_name = f"deal-{deal_id}.zip"
+    elif client_id:
+        archive_name = f"client-{client_id}.zip"
     else:
-        if current_user.is_admin:
-            documents = await DocumentDAO.find_all()
-        else:
-            documents = await DocumentDAO.find_all(uploaded_by=current_user.id)
+        archive_name = f"{folder.strip('/').replace('/', '-') or 'documents'}.zip"
     
-    return [DocumentReadSchema.model_validate(doc) for doc in documents]
+    return StreamingResponse(
+        stream_bundle(documents),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename*=utf-8''{quote(archive_name)}"}
+    )
 
 
-@router.get("/folders", response_model=List[FolderSchema])
-async def get_folders(current_user: UserModel = Depends(get_current_user)):
-    folders = await DocumentDAO.get_folders()
-    return [FolderSchema(name=folder, count=count) for folder, count in folders]
+def upload_session_response(upload) -> UploadSessionReadSchema:
+    return UploadSessionReadSchema(
+        id=upload.id,
+        original_filename=upload.original_filename,
+        total_size=upload.total_size,
+        offset=upload.offset,
+        expires_at=upload.expires_at,
+        max_chunk_size=settings.UPLOAD_MAX_CHUNK_SIZE,
+    )
+
+
+@router.post("/uploads", response_model=UploadSessionReadSchema, status_code=status.HTTP_201_CREATED)
+async def create_upload_session(
+    payload: UploadSessionCreateSchema,
+    current_user: UserModel = Depends(get_current_user)
+):
+    if not is_allowed_file(payload.filename):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Недопустимый тип файла. Разрешены: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+    
+    upload = await upload_manager.create(current_user.id, payload)
+    return upload_session_response(upload)
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionReadSchema)
+async def get_upload_session(
+    upload_id: uuid.UUID,
+    current_user: UserModel = Depends(get_current_user)
+):
+    upload = await upload_manager.get(upload_id, current_user.id)
+    return upload_session_response(upload)
+
+
+@router.head("/uploads/{upload_id}")
+async def get_upload_offset(
+    upload_id: uuid.UUID,
+    current_user: UserModel = Depends(get_current_user)
+):
+    upload = await upload_manager.get(upload_id, current_user.id)
+    return Response(
+        status_code=status.HTTP_200_OK,
+        headers={
+            "Upload-Offset": str(upload.offset),
+            "Upload-Length": str(upload.total_size),
+            "Cache-Control": "no-store",
+        }
+    )
+
+
+@router.patch("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def upload_chunk(
+    upload_id: uuid.UUID,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    current_user: UserModel = Depends(get_current_user)
+):
+    offset = await upload_manager.append(upload_id, current_user.id, upload_offset, request.stream())
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers={"Upload-Offset": str(offset)})
+
+
+@router.post("/uploads/{upload_id}/finalize", response_model=DocumentReadSchema, status_code=status.HTTP_201_CREATED)
+async def finalize_upload(
+    upload_id: uuid.UUID,
+    current_user: UserModel = Depends(get_current_user)
+):
+    document = await upload_manager.finalize(upload_id, current_user.id)
+    document_indexer.enqueue(document.id)
+    return DocumentReadSchema.model_validate(document)
+
+
+@router.delete("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload(
+    upload_id: uuid.UUID,
+    current_user: UserModel = Depends(get_current_user)
+):
+    await upload_manager.abort(upload_id, current_user.id)
 
 
 @router.get("/{document_id}", response_model=DocumentReadSchema)
@@ -181,15 +344,54 @@ async def download_document(
             detail="Нет прав на скачивание документа"
         )
     
-    file_path = Path(document.file_path)
-    if not file_path.exists():
-        raise NotFoundException("Файл не найден на диске")
+    if not document.sha256:
+        # Документы, которые миграция не смогла перенести в хранилище блобов, отдаются по старому пути
+        file_path = Path(document.file_path)
+        if not await run_io(file_path.is_file):
+            raise NotFoundException("Файл не найден на диске")
+        return FileResponse(
+            path=file_path,
+            filename=document.original_filename,
+            media_type=document.mime_type
+        )
     
-    return FileResponse(
-        path=file_path,
-        filename=document.original_filename,
-        media_type=document.mime_type
-    )
+    try:
+        return await blob_store.response(
+            document.sha256,
+            filename=document.original_filename,
+            media_type=document.mime_type
+        )
+    except FileNotFoundError:
+        raise NotFoundException("Файл не найден в хранилище")
+
+
+@router.get("/{document_id}/download-url", response_model=DownloadUrlSchema)
+async def get_download_url(
+    document_id: int,
+    current_user: UserModel = Depends(get_current_user)
+):
+    document = await DocumentDAO.find_one_or_none(id=document_id)
+    
+    if not document:
+        raise NotFoundException("Документ не найден")
+    
+    if not current_user.is_admin and document.uploaded_by != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Нет прав на скачивание документа"
+        )
+    
+    url = None
+    if document.sha256:
+        url = await blob_store.presigned_url(
+            document.sha256,
+            filename=document.original_filename,
+            media_type=document.mime_type
+        )
+    
+    if url is None:
+        return DownloadUrlSchema(url=f"/documents/{document_id}/download", direct=False)
+    return DownloadUrlSchema(url=url, direct=True, expires_in=settings.PRESIGNED_URL_EXPIRE)
 
 
 @router.patch("/{document_id}", response_model=DocumentReadSchema)
@@ -211,25 +413,6 @@ async def update_document(
     
     update_data = payload.model_dump(exclude_unset=True)
     
-    if 'folder' in update_data and update_data['folder'] != document.folder:
-        old_path = Path(document.file_path)
-        
-        if update_data['folder']:
-            new_folder = UPLOAD_DIR / update_data['folder']
-            new_folder.mkdir(exist_ok=True)
-            new_path = new_folder / document.filename
-        else:
-            new_path = UPLOAD_DIR / document.filename
-        
-        try:
-            shutil.move(str(old_path), str(new_path))
-            update_data['file_path'] = str(new_path)
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Ошибка при перемещении файла: {str(e)}"
-            )
-    
     await DocumentDAO.update(filter_by={"id": document_id}, values=update_data)
     
     updated_document = await DocumentDAO.find_one_or_none(id=document_id)
@@ -252,19 +435,7 @@ async def delete_document(
             detail="Нет прав на удаление документа"
         )
     
-    file_path = Path(document.file_path)
-    if file_path.exists():
-        try:
-            os.remove(file_path)
-            
-            if document.folder:
-                folder_path = file_path.parent
-                if folder_path.exists() and not any(folder_path.iterdir()):
-                    folder_path.rmdir()
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Ошибка при удалении файла: {str(e)}"
-            )
+    await DocumentDAO.delete(id=document_id)
     
-    await DocumentDAO.delete(id=document_id)
\ No newline at end of file
+    if document.sha256:
+        await blob_store.release(document.sha256)
\ No newline at end of file
@@ -1,6 +1,7 @@
-from typing import Optional
+import uuid
+from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class DocumentUploadSchema(BaseModel):
@@ -20,6 +21,7 @@ class DocumentReadSchema(BaseModel):
     file_path: str
     file_size: int
     mime_type: str
+    sha256: Optional[str] = None
     client_id: Optional[int] = None
     property_id: Optional[int] = None
     deal_id: Optional[int] = None
@@ -31,6 +33,22 @@ class DocumentReadSchema(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class DocumentPageSchema(BaseModel):
+    items: List[DocumentReadSchema]
+    next_cursor: Optional[str] = None
+
+
+class DocumentSearchResultSchema(DocumentReadSchema):
+    rank: float
+
+
+class DocumentSearchPageSchema(BaseModel):
+    items: List[DocumentSearchResultSchema]
+    limit: int
+    offset: int
+    has_more: bool
+
+
 class DocumentUpdateSchema(BaseModel):
     folder: Optional[str] = None
     description: Optional[str] = None
@@ -43,4 +61,39 @@ class DocumentUpdateSchema(BaseModel):
 
 class FolderSchema(BaseModel):
     name: str
-    count: int
\ No newline at end of file
+    parent: Optional[str] = None
+    depth: int = 0
+    count: int
+    total_bytes: int = 0
+    tree_count: int = 0
+    tree_total_bytes: int = 0
+
+
+class DownloadUrlSchema(BaseModel):
+    url: str
+    direct: bool
+    expires_in: Optional[int] = None
+
+
+class UploadSessionCreateSchema(BaseModel):
+    filename: str = Field(min_length=1, max_length=255)
+    size: int = Field(gt=0)
+    mime_type: Optional[str] = None
+    client_id: Optional[int] = None
+    property_id: Optional[int] = None
+    deal_id: Optional[int] = None
+    folder: Optional[str] = None
+    description: Optional[str] = None
+
+    model_config = ConfigDict(extra='forbid')
+
+
+class UploadSessionReadSchema(BaseModel):
+    id: uuid.UUID
+    original_filename: str
+    total_size: int
+    offset: int
+    expires_at: datetime
+    max_chunk_size: int
+
+    model_config = ConfigDict(from_attributes=True)
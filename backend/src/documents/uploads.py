@@ -0,0 +1,272 @@
+import asyncio
+import hashlib
+import logging
+import shutil
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Tuple
+
+import aiofiles
+from sqlalchemy import select
+
+from src.config import settings
+from src.database import new_session
+from src.documents.dao import DocumentFolderDAO, UploadSessionDAO
+from src.documents.folders import normalize_folder
+from src.documents.schema import UploadSessionCreateSchema
+from src.exceptions import (
+    ConflictException,
+    NotFoundException,
+    PayloadTooLargeException,
+    TooManyRequestsException,
+)
+from src.model import DocumentModel, UploadSessionModel
+from src.monitoring.tracing import traced
+from src.storage.base import CHUNK_SIZE
+from src.storage.blobs import blob_filename, blob_store
+from src.storage.executor import io_executor, run_io
+
+logger = logging.getLogger(__name__)
+
+
+def _hash_prefix(path: Path, length: int) -> Any:
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            hasher.update(chunk)
+            remaining -= len(chunk)
+    return hasher
+
+
+def _append_part(staging_path: Path, part_path: Path, offset: int) -> None:
+    with open(staging_path, 'r+b') as dst, open(part_path, 'rb') as src:
+        # Хвост от оборванной ранее части отбрасывается
+        dst.seek(offset)
+        dst.truncate()
+        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+
+def _remove_stale_parts(staging_dir: Path, max_age: float) -> None:
+    deadline = time.time() - max_age
+    for path in staging_dir.glob("*.chunk"):
+        try:
+            if path.stat().st_mtime < deadline:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class UploadManager:
+    """Возобновляемые загрузки: части дописываются в staging-файл по смещению.
+
+    Состояние хеша держится в памяти воркера. Если часть пришла на другой воркер
+    (или после перезапуска), хеш восстанавливается по уже записанному префиксу файла.
+
+    Блокировка строки сессии берётся только на короткие проверки и фиксацию смещения:
+    медленный клиент не держит соединение из пула, пока передаёт тело запроса.
+    """
+
+    def __init__(self, staging_dir: Path):
+        self.staging_dir = staging_dir
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        self._hashers: Dict[uuid.UUID, Tuple[int, Any]] = {}
+
+    def staging_path(self, upload_id: uuid.UUID) -> Path:
+        return self.staging_dir / f"{upload_id.hex}.part"
+
+    def part_path(self, upload_id: uuid.UUID) -> Path:
+        return self.staging_dir / f"{upload_id.hex}.{uuid.uuid4().hex}.chunk"
+
+    def _expires_at(self) -> datetime:
+        return datetime.now(timezone.utc) + timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+
+    async def _hasher(self, upload_id: uuid.UUID, offset: int) -> Any:
+        cached = self._hashers.pop(upload_id, None)
+        if cached and cached[0] == offset:
+            return cached[1]
+        try:
+            return await run_io(_hash_prefix, self.staging_path(upload_id), offset)
+        except FileNotFoundError:
+            raise NotFoundException("Данные сессии загрузки не найдены")
+
+    async def _lock(self, s, upload_id: uuid.UUID, user_id: int) -> UploadSessionModel:
+        query = (
+            select(UploadSessionModel)
+            .where(UploadSessionModel.id == upload_id, UploadSessionModel.user_id == user_id)
+            .with_for_update()
+        )
+        upload = (await s.execute(query)).scalar_one_or_none()
+        if not upload or upload.expires_at <= datetime.now(timezone.utc):
+            raise NotFoundException("Сессия загрузки не найдена")
+        return upload
+
+    async def create(self, user_id: int, payload: UploadSessionCreateSchema) -> UploadSessionModel:
+        if payload.size > settings.UPLOAD_MAX_FILE_SIZE:
+            raise PayloadTooLargeException(
+                f"Файл слишком большой. Максимальный размер: {settings.UPLOAD_MAX_FILE_SIZE / (1024*1024)} МБ"
+            )
+
+        upload = await UploadSessionDAO.add_limited(
+            settings.UPLOAD_SESSIONS_PER_USER,
+            id=uuid.uuid4(),
+            user_id=user_id,
+            original_filename=payload.filename,
+            mime_type=payload.mime_type or "application/octet-stream",
+            total_size=payload.size,
+            offset=0,
+            client_id=payload.client_id,
+            property_id=payload.property_id,
+            deal_id=payload.deal_id,
+            folder=payload.folder,
+            description=payload.description,
+            expires_at=self._expires_at(),
+        )
+        if upload is None:
+            raise TooManyRequestsException(
+                f"Нельзя вести больше {settings.UPLOAD_SESSIONS_PER_USER} загрузок одновременно"
+            )
+
+        await run_io(self.staging_path(upload.id).touch)
+        self._hashers[upload.id] = (0, hashlib.sha256())
+        return upload
+
+    async def get(self, upload_id: uuid.UUID, user_id: int) -> UploadSessionModel:
+        upload = await UploadSessionDAO.find_one_or_none(id=upload_id, user_id=user_id)
+        if not upload or upload.expires_at <= datetime.now(timezone.utc):
+            raise NotFoundException("Сессия загрузки не найдена")
+        return upload
+
+    @traced("file.write", "upload.append")
+    async def append(
+        self,
+        upload_id: uuid.UUID,
+        user_id: int,
+        offset: int,
+        chunks: AsyncIterator[bytes],
+    ) -> int:
+        async with new_session() as s:
+            async with s.begin():
+                upload = await self._lock(s, upload_id, user_id)
+                if offset != upload.offset:
+                    raise ConflictException(f"Неверное смещение: ожидается {upload.offset}")
+                total_size = upload.total_size
+
+        # Часть пишется в отдельный файл без транзакции; staging-файл меняется только при фиксации
+        hasher = await self._hasher(upload_id, offset)
+        part_path = self.part_path(upload_id)
+        written = 0
+        try:
+            async with aiofiles.open(part_path, 'wb', executor=io_executor) as f:
+                async for chunk in chunks:
+                    written += len(chunk)
+                    if written > settings.UPLOAD_MAX_CHUNK_SIZE:
+                        raise PayloadTooLargeException(
+                            f"Часть слишком большая. Максимальный размер: {settings.UPLOAD_MAX_CHUNK_SIZE} байт"
+                        )
+                    if offset + written > total_size:
+                        raise PayloadTooLargeException("Данные превышают заявленный размер файла")
+                    hasher.update(chunk)
+                    await f.write(chunk)
+
+            async with new_session() as s:
+                async with s.begin():
+                    upload = await self._lock(s, upload_id, user_id)
+                    # Параллельная часть с тем же смещением успела зафиксироваться первой
+                    if upload.offset != offset:
+                        raise ConflictException(f"Неверное смещение: ожидается {upload.offset}")
+                    try:
+                        await run_io(_append_part, self.staging_path(upload_id), part_path, offset)
+                    except FileNotFoundError:
+                        raise NotFoundException("Данные сессии загрузки не найдены")
+                    upload.offset = offset + written
+                    upload.expires_at = self._expires_at()
+                    new_offset = upload.offset
+        finally:
+            await run_io(part_path.unlink, missing_ok=True)
+
+        self._hashers[upload_id] = (new_offset, hasher)
+        return new_offset
+
+    @traced("file.write", "upload.finalize")
+    async def finalize(self, upload_id: uuid.UUID, user_id: int) -> DocumentModel:
+        upload = await self.get(upload_id, user_id)
+        if upload.offset != upload.total_size:
+            raise ConflictException(
+                f"Файл загружен не полностью: {upload.offset} из {upload.total_size} байт"
+            )
+
+        # Перенос в хранилище (для S3 — выгрузка) идёт до транзакции, без блокировки строки сессии
+        staging_path = self.staging_path(upload_id)
+        hasher = await self._hasher(upload_id, upload.offset)
+        blob = await blob_store.commit_staged(staging_path, hasher.hexdigest(), upload.total_size)
+        try:
+            async with new_session() as s:
+                async with s.begin():
+                    upload = await self._lock(s, upload_id, user_id)
+                    document = DocumentModel(
+                        filename=blob_filename(blob.sha256, upload.original_filename),
+                        original_filename=upload.original_filename,
+                        file_path=blob.key,
+                        file_size=blob.size,
+                        mime_type=upload.mime_type,
+                        sha256=blob.sha256,
+                        folder=normalize_folder(upload.folder),
+                        description=upload.description,
+                        client_id=upload.client_id,
+                        property_id=upload.property_id,
+                        deal_id=upload.deal_id,
+                        uploaded_by=user_id,
+                    )
+                    s.add(document)
+                    await s.delete(upload)
+                    await s.flush()
+                    await DocumentFolderDAO.apply(s, user_id, [(document.folder, 1, document.file_size)])
+                    await s.refresh(document)
+        except BaseException:
+            # Сессия осталась — staging-файл возвращается из хранилища, чтобы finalize можно было повторить
+            if await UploadSessionDAO.find_one_or_none(id=upload_id):
+                try:
+                    await blob_store.restore(blob.sha256, staging_path)
+                    self._hashers[upload_id] = (upload.total_size, hasher)
+                except Exception:
+                    logger.exception("Не удалось вернуть staging-файл сессии загрузки %s", upload_id)
+            await blob_store.release(blob.sha256)
+            raise
+
+        self._hashers.pop(upload_id, None)
+        return document
+
+    async def abort(self, upload_id: uuid.UUID, user_id: int) -> None:
+        async with new_session() as s:
+            async with s.begin():
+                upload = await self._lock(s, upload_id, user_id)
+                await s.delete(upload)
+
+        self._hashers.pop(upload_id, None)
+        await run_io(self.staging_path(upload_id).unlink, missing_ok=True)
+
+    async def collect_expired(self) -> int:
+        expired = await UploadSessionDAO.delete_expired()
+        for upload_id in expired:
+            self._hashers.pop(upload_id, None)
+            await run_io(self.staging_path(upload_id).unlink, missing_ok=True)
+        # Части, брошенные при падении воркера посреди запроса
+        await run_io(_remove_stale_parts, self.staging_dir, settings.UPLOAD_SESSION_TTL)
+        return len(expired)
+
+    async def run_gc(self) -> None:
+        while True:
+            try:
+                await self.collect_expired()
+            except Exception:
+                logger.exception("Ошибка очистки сессий загрузки")
+            await asyncio.sleep(settings.UPLOAD_GC_INTERVAL)
+
+
+upload_manager = UploadManager(Path(settings.STORAGE_DIR) / "uploads")
@@ -11,6 +11,11 @@ class AppException(Exception):
         super().__init__(message)
 
 
+class BadRequestException(AppException):
+    def __init__(self, message: str = "Некорректный запрос"):
+        super().__init__(message, status.HTTP_400_BAD_REQUEST)
+
+
 class NotFoundException(AppException):
     def __init__(self, message: str = "Ресурс не найден"):
         super().__init__(message, status.HTTP_404_NOT_FOUND)
@@ -26,6 +31,21 @@ class ValidationException(AppException):
         super().__init__(message, status.HTTP_422_UNPROCESSABLE_ENTITY)
 
 
+class PayloadTooLargeException(AppException):
+    def __init__(self, message: str = "Файл слишком большой"):
+        super().__init__(message, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+
+class TooManyRequestsException(AppException):
+    def __init__(self, message: str = "Слишком много запросов"):
+        super().__init__(message, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+class ServiceUnavailableException(AppException):
+    def __init__(self, message: str = "Сервис временно недоступен"):
+        super().__init__(message, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
 class UnauthorizedException(AppException):
     def __init__(self, message: str = "Требуется авторизация"):
         super().__init__(message, status.HTTP_401_UNAUTHORIZED)
@@ -71,6 +91,11 @@ async def sqlalchemy_exception_handler(request: Request, exc: Exception) -> JSON
                 status_code=status.HTTP_409_CONFLICT,
                 content={"detail": "Невозможно выполнить операцию: связанные данные"},
             )
+        if "exclusion constraint" in error_msg:
+            return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={"detail": "Время пересекается с существующей записью"},
+            )
         if "not null constraint" in error_msg:
             return JSONResponse(
                 status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
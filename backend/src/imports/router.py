@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, HTTPException, Response, UploadFile, File, status
+
+from src.imports.service import ImportReport, import_clients, import_properties
+from src.model import UserModel
+from src.users.auth import get_current_user
+from src.cache import cache_manager
+
+router = APIRouter(prefix="/imports", tags=["Импорт"])
+
+
+def _check_csv(file: UploadFile) -> None:
+    if not (file.filename or "").lower().endswith(".csv"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Ожидается файл CSV")
+
+
+def _report_response(report: ImportReport, name: str) -> Response:
+    """Ответ — CSV с отклонёнными строками и причиной; итоги в заголовках."""
+    return Response(
+        content=report.errors_csv().encode("utf-8-sig"),
+        media_type="text/csv; charset=utf-8",
+        headers={
+            "Content-Disposition": f'attachment; filename="{name}-errors.csv"',
+            "X-Import-Total": str(report.total),
+            "X-Import-Created": str(report.created),
+            "X-Import-Failed": str(report.failed),
+        },
+    )
+
+
+@router.post("/clients")
+async def import_clients_csv(file: UploadFile = File(...), current_user: UserModel = Depends(get_current_user)):
+    _check_csv(file)
+    try:
+        report = await import_clients(file.file, current_user.id)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Файл должен быть в кодировке UTF-8")
+
+    if report.created:
+        await cache_manager.delete_pattern(f"clients:user:{current_user.id}")
+        await cache_manager.delete_pattern(f"search:user:{current_user.id}:*")
+
+    return _report_response(report, "clients")
+
+
+@router.post("/properties")
+async def import_properties_csv(file: UploadFile = File(...), current_user: UserModel = Depends(get_current_user)):
+    _check_csv(file)
+    try:
+        report = await import_properties(file.file, current_user.id)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Файл должен быть в кодировке UTF-8")
+
+    if report.created:
+        await cache_manager.delete_pattern(f"properties:user:{current_user.id}")
+        await cache_manager.delete_pattern(f"search:user:{current_user.id}:*")
+
+    return _report_response(report, "properties")
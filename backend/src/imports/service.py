@@ -0,0 +1,243 @@
+import asyncio
+import csv
+import io
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import text
+
+from src.clients.schema import ClientCreateSchema
+from src.database import new_session
+from src.properties.schema import PropertyCreateSchema
+
+BATCH_SIZE = 1000
+ERROR_COLUMN = "error"
+
+
+@dataclass
+class ImportReport:
+    total: int = 0
+    created: int = 0
+    fieldnames: List[str] = field(default_factory=list)
+    # (номер строки в файле, исходная строка, текст ошибки)
+    errors: List[Tuple[int, Dict[str, str], str]] = field(default_factory=list)
+
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+    def errors_csv(self) -> str:
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=["line", *self.fieldnames, ERROR_COLUMN], extrasaction="ignore")
+        writer.writeheader()
+        for line, row, error in sorted(self.errors, key=lambda e: e[0]):
+            writer.writerow({"line": line, **row, ERROR_COLUMN: error})
+        return out.getvalue()
+
+
+def _open_reader(f: BinaryIO) -> csv.DictReader:
+    """CSV в UTF-8 (с BOM или без); разделитель — запятая, точка с запятой или табуляция."""
+    stream = io.TextIOWrapper(f, encoding="utf-8-sig", newline="")
+    sample = stream.read(64 * 1024)
+    stream.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    return csv.DictReader(stream, dialect=dialect)
+
+
+def _read_batch(reader: csv.DictReader, size: int) -> List[Tuple[int, Dict[str, str]]]:
+    batch = []
+    for row in reader:
+        batch.append((reader.line_num, row))
+        if len(batch) >= size:
+            break
+    return batch
+
+
+def _format_error(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}" for err in e.errors()
+    )
+
+
+def _validate(
+    schema: Type[BaseModel], batch: List[Tuple[int, Dict[str, str]]], extra: Tuple[str, ...] = ()
+) -> Tuple[List[Tuple[int, BaseModel, Dict[str, Any]]], List[Tuple[int, Dict[str, str], str]]]:
+    """Пустые ячейки считаются отсутствующими, чтобы сработали значения по умолчанию схемы."""
+    valid, errors = [], []
+    for line, row in batch:
+        if None in row:
+            errors.append((line, row, "Лишние значения в строке"))
+            continue
+        values = {k.strip(): v.strip() for k, v in row.items() if k and v is not None and v.strip() != ""}
+        extras = {name: values.pop(name) for name in extra if name in values}
+        try:
+            valid.append((line, schema.model_validate(values), extras))
+        except ValidationError as e:
+            errors.append((line, row, _format_error(e)))
+    return valid, errors
+
+
+async def _copy(session, table: str, columns: List[str], records: List[tuple]) -> None:
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(table, records=records, columns=columns)
+
+
+CLIENT_STAGING = """
+CREATE TEMP TABLE import_clients (
+    line integer NOT NULL,
+    first_name text NOT NULL,
+    last_name text NOT NULL,
+    phone_number text NOT NULL,
+    email text NOT NULL,
+    notes text,
+    type text NOT NULL
+) ON COMMIT DROP
+"""
+
+# Строки, конфликтующие с базой или с более ранней строкой файла, не вставляются и попадают в отчёт
+CLIENT_CONFLICTS = """
+SELECT line,
+       CASE WHEN phone_taken OR phone_rank > 1 THEN 'phone_number' ELSE 'email' END AS field
+FROM (
+    SELECT s.line,
+           EXISTS (SELECT 1 FROM clients c WHERE c.phone_number = s.phone_number) AS phone_taken,
+           EXISTS (SELECT 1 FROM clients c WHERE c.email = s.email) AS email_taken,
+           row_number() OVER (PARTITION BY s.phone_number ORDER BY s.line) AS phone_rank,
+           row_number() OVER (PARTITION BY s.email ORDER BY s.line) AS email_rank
+    FROM import_clients s
+) checked
+WHERE phone_taken OR email_taken OR phone_rank > 1 OR email_rank > 1
+"""
+
+CLIENT_MERGE = """
+INSERT INTO clients (first_name, last_name, phone_number, email, notes, type, user_id)
+SELECT first_name, last_name, phone_number, email, notes, type::clienttype, :user_id
+FROM import_clients
+WHERE line <> ALL(:skipped)
+ORDER BY line
+ON CONFLICT DO NOTHING
+RETURNING phone_number
+"""
+
+CONFLICT_MESSAGES = {
+    "phone_number": "Клиент с таким номером телефона уже существует",
+    "email": "Клиент с таким email уже существует",
+}
+
+
+async def _merge_clients(user_id: int, rows: List[Tuple[int, ClientCreateSchema, Dict[str, Any]]]) -> Tuple[int, Dict[int, str]]:
+    records = [
+        (line, c.first_name, c.last_name, c.phone_number, c.email, c.notes, c.type.value)
+        for line, c, _ in rows
+    ]
+    async with new_session() as s:
+        async with s.begin():
+            await s.execute(text(CLIENT_STAGING))
+            await _copy(s, "import_clients", ["line", "first_name", "last_name", "phone_number", "email", "notes", "type"], records)
+            conflicts = {row.line: CONFLICT_MESSAGES[row.field] for row in await s.execute(text(CLIENT_CONFLICTS))}
+            inserted = {
+                row.phone_number
+                for row in await s.execute(text(CLIENT_MERGE), {"user_id": user_id, "skipped": list(conflicts)})
+            }
+
+    # Строки, которые успел занять параллельный запрос между проверкой и вставкой
+    for line, client, _ in rows:
+        if line not in conflicts and client.phone_number not in inserted:
+            conflicts[line] = "Клиент с такими данными уже существует"
+    return len(inserted), conflicts
+
+
+PROPERTY_STAGING = """
+CREATE TEMP TABLE import_properties (
+    line integer NOT NULL,
+    description text,
+    type text NOT NULL,
+    address text NOT NULL,
+    price double precision NOT NULL,
+    area double precision NOT NULL,
+    rooms integer NOT NULL,
+    owner_id integer,
+    owner_phone text,
+    is_active boolean NOT NULL,
+    is_for_viewing boolean NOT NULL
+) ON COMMIT DROP
+"""
+
+# Владелец ищется только среди клиентов агента — по id или по номеру телефона
+PROPERTY_OWNERS = """
+UPDATE import_properties s
+SET owner_id = c.id
+FROM clients c
+WHERE c.user_id = :user_id
+  AND ((s.owner_id IS NOT NULL AND c.id = s.owner_id)
+       OR (s.owner_id IS NULL AND c.phone_number = s.owner_phone))
+RETURNING s.line
+"""
+
+PROPERTY_MERGE = """
+INSERT INTO properties (description, type, address, price, area, rooms, owner_id, is_active, is_for_viewing)
+SELECT coalesce(description, ''), type::propertytype, address, price, area, rooms, owner_id, is_active, is_for_viewing
+FROM import_properties
+WHERE line = ANY(:resolved)
+ORDER BY line
+"""
+
+
+async def _merge_properties(user_id: int, rows: List[Tuple[int, PropertyCreateSchema, Dict[str, Any]]]) -> Tuple[int, Dict[int, str]]:
+    records = [
+        (
+            line, p.description, p.type.value, p.address, p.price, p.area, p.rooms,
+            None if "owner_phone" in extras else p.owner_id, extras.get("owner_phone"),
+            p.is_active, p.is_for_viewing,
+        )
+        for line, p, extras in rows
+    ]
+    columns = ["line", "description", "type", "address", "price", "area", "rooms", "owner_id", "owner_phone", "is_active", "is_for_viewing"]
+    async with new_session() as s:
+        async with s.begin():
+            await s.execute(text(PROPERTY_STAGING))
+            await _copy(s, "import_properties", columns, records)
+            resolved = [row.line for row in await s.execute(text(PROPERTY_OWNERS), {"user_id": user_id})]
+            result = await s.execute(text(PROPERTY_MERGE), {"resolved": resolved})
+
+    resolved_set = set(resolved)
+    errors = {line: "Владелец не найден среди ваших клиентов" for line, _, _ in rows if line not in resolved_set}
+    return result.rowcount, errors
+
+
+async def _run_import(f: BinaryIO, user_id: int, schema: Type[BaseModel], merge, extra: Tuple[str, ...] = ()) -> ImportReport:
+    """Файл читается и проверяется пачками по BATCH_SIZE строк; каждая пачка — своя транзакция."""
+    report = ImportReport()
+    reader = await asyncio.to_thread(_open_reader, f)
+    report.fieldnames = list(reader.fieldnames or [])
+
+    while batch := await asyncio.to_thread(_read_batch, reader, BATCH_SIZE):
+        report.total += len(batch)
+        valid, errors = await asyncio.to_thread(_validate, schema, batch, extra)
+        report.errors.extend(errors)
+        if not valid:
+            continue
+
+        created, conflicts = await merge(user_id, valid)
+        report.created += created
+        originals = dict(batch)
+        report.errors.extend((line, originals[line], message) for line, message in conflicts.items())
+    return report
+
+
+async def import_clients(f: BinaryIO, user_id: int) -> ImportReport:
+    return await _run_import(f, user_id, ClientCreateSchema, _merge_clients)
+
+
+class _PropertyImportSchema(PropertyCreateSchema):
+    # Вместо owner_id можно указать owner_phone — при переносе базы id клиентов заранее неизвестны
+    owner_id: Optional[int] = None
+
+
+async def import_properties(f: BinaryIO, user_id: int) -> ImportReport:
+    return await _run_import(f, user_id, _PropertyImportSchema, _merge_properties, extra=("owner_phone",))
@@ -1,3 +1,7 @@
+import asyncio
+import logging
+import time
+from contextlib import suppress
 from typing import AsyncIterator
 from fastapi import FastAPI
 from fastapi.concurrency import asynccontextmanager
@@ -12,8 +16,24 @@ from src.properties.router import router as property_router
 from src.appointment.router import router as appointment_router
 from src.documents.router import router as documents_router
 from src.deals.router import router as deals_router
+from src.search.router import router as search_router
+from src.imports.router import router as imports_router
+from src.monitoring.router import router as monitoring_router
+from src.monitoring.metrics import APP_STARTUP, METRICS_ENABLED, MetricsMiddleware
+from src.monitoring.queries import QueryStatsMiddleware
+from src.monitoring.profiler import ProfilerMiddleware
+from src.monitoring import timing
+from src.monitoring.tracing import init_tracing
+from src.monitoring.logs import AccessLogMiddleware, setup_logging
+from src.config import settings
 from fastapi_pagination import add_pagination
 from src.cache import cache_manager
+from src.database import engine, warm_up_pool
+from src.storage.factory import storage
+from src.storage.blobs import blob_store
+from src.storage.executor import shutdown_io
+from src.documents.uploads import upload_manager
+from src.documents.indexer import document_indexer
 
 from src.exceptions import (
     AppException,
@@ -25,11 +45,39 @@ from src.exceptions import (
 )
 from fastapi.exceptions import HTTPException
 
+logger = logging.getLogger(__name__)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # uvicorn начинает принимать соединения только после завершения этого блока
+    started = time.perf_counter()
+    if not METRICS_ENABLED:
+        logger.warning("prometheus_client не установлен: метрики не собираются, /metrics отвечает 503")
+    await warm_up_pool()
     await cache_manager.connect()
+    await storage.connect()
+    background = [
+        asyncio.create_task(upload_manager.run_gc()),
+        asyncio.create_task(blob_store.run_reaper()),
+    ]
+    document_indexer.start()
+    startup = time.perf_counter() - started
+    APP_STARTUP.set(startup)
+    logger.info("Воркер готов к приёму запросов за %.0f мс", startup * 1000)
     yield
+    await document_indexer.stop()
+    for task in background:
+        task.cancel()
+    for task in background:
+        with suppress(asyncio.CancelledError):
+            await task
+    await storage.close()
+    await shutdown_io()
     await cache_manager.close()
+    await engine.dispose()
+
+setup_logging()
+init_tracing()
 
 app = FastAPI(title="Real Estate Agency API", lifespan=lifespan)
 
@@ -40,6 +88,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
+if settings.SERVER_TIMING_ENABLED:
+    timing.install()
+    app.add_middleware(timing.ServerTimingMiddleware)
+app.add_middleware(AccessLogMiddleware)
 
 app.add_exception_handler(AppException, app_exception_handler)
 app.add_exception_handler(HTTPException, http_exception_handler)
@@ -53,8 +108,11 @@ app.include_router(router=property_router)
 app.include_router(router=appointment_router)
 app.include_router(router=documents_router)
 app.include_router(router=deals_router)
+app.include_router(router=search_router)
+app.include_router(router=imports_router)
+app.include_router(router=monitoring_router)
 
 add_pagination(app)
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", reload=True)
\ No newline at end of file
+    uvicorn.run("src.main:app", reload=True)
\ No newline at end of file
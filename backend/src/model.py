@@ -1,9 +1,11 @@
+import uuid
 from datetime import datetime
-from sqlalchemy import JSON, DateTime, Enum, ForeignKey, String, Text, text
+from sqlalchemy import DDL, JSON, BigInteger, Computed, DateTime, Enum, ForeignKey, Index, String, Text, UniqueConstraint, event, text
+from sqlalchemy.dialects.postgresql import TSTZRANGE, TSVECTOR, ExcludeConstraint, Range
 from src.database import Base, str_uniq, float_base, int_base, int_pk, str_base, bool_d_t, bool_d_f, datetime_base, createtime_base, updatetime_base
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from src.my_types import ClientType, PropertyType, AppointmentType, DealType, DealOperationType
+from src.my_types import ClientType, PropertyType, AppointmentType, DealType, DealOperationType, RecurrenceFrequency
 
 
 class UserModel(Base):
@@ -20,6 +22,10 @@ class UserModel(Base):
     is_user: Mapped[bool_d_t]
     is_admin: Mapped[bool_d_f]
 
+    # Доступ к ленте календаря без cookie; версия растёт с каждым изменением показов агента
+    calendar_token: Mapped[str | None] = mapped_column(String(64), unique=True, nullable=True)
+    calendar_version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default=text('0'))
+
     created_at: Mapped[createtime_base]
 
     clients_assigned = relationship("ClientModel", back_populates="agent", foreign_keys="ClientModel.user_id")
@@ -49,7 +55,7 @@ class ClientModel(Base):
     type: Mapped[ClientType] = mapped_column(Enum(ClientType, values_callable=lambda x: [e.value for e in x]), nullable=False, server_default=ClientType.SELLER)
     created_at: Mapped[createtime_base]
     updated_at: Mapped[updatetime_base]
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
 
     agent = relationship("UserModel", back_populates="clients_assigned", foreign_keys=[user_id])
     properties = relationship("PropertyModel", back_populates="owner")
@@ -78,7 +84,7 @@ class PropertyModel(Base):
     price: Mapped[float_base]
     area: Mapped[float]
     rooms: Mapped[int_base]
-    owner_id: Mapped[int] = mapped_column(ForeignKey("clients.id"), nullable=False)
+    owner_id: Mapped[int] = mapped_column(ForeignKey("clients.id"), nullable=False, index=True)
     photos: Mapped[list[str] | None] = mapped_column(JSON)
     created_at: Mapped[createtime_base]
     updated_at: Mapped[updatetime_base]
@@ -106,17 +112,193 @@ class AppointmentModel(Base):
     duration_minutes: Mapped[int_base]
     notes: Mapped[str| None] 
     created_at: Mapped[createtime_base]
+    updated_at: Mapped[updatetime_base]
+    sync_version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default=text('0'))
+    # Вхождение серии, сохранённое отдельной строкой: перенесённое, изменённое или отменённое
+    series_id: Mapped[int | None] = mapped_column(ForeignKey("appointment_series.id", ondelete="CASCADE"), nullable=True)
+    series_original_time: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    period: Mapped[Range[datetime]] = mapped_column(
+        TSTZRANGE,
+        Computed("appointment_period(meeting_time, duration_minutes)", persisted=True),
+    )
+
+    # Отменённые показы время не занимают
+    __table_args__ = (
+        ExcludeConstraint(
+            ("user_id", "="), ("period", "&&"),
+            name="ex_appointments_user_period",
+            using="gist",
+            where=text("type <> 'ОТМЕНЕНО'"),
+        ),
+        ExcludeConstraint(
+            ("property_id", "="), ("period", "&&"),
+            name="ex_appointments_property_period",
+            using="gist",
+            where=text("type <> 'ОТМЕНЕНО'"),
+        ),
+        Index("ix_appointments_user_sync_version", "user_id", "sync_version"),
+        UniqueConstraint("series_id", "series_original_time", name="uq_appointments_series_occurrence"),
+    )
 
     property_obj = relationship("PropertyModel", back_populates="appointments", foreign_keys=[property_id])
     client = relationship("ClientModel", back_populates="appointments", foreign_keys=[client_id])
     agent = relationship("UserModel", back_populates="appointments", foreign_keys=[user_id])
+    series = relationship("AppointmentSeriesModel", back_populates="overrides", foreign_keys=[series_id])
 
     def __str__(self):
         return f"{self.__class__.__name__}(id={self.id})"
     
     def __repr__(self):
         return str(self)
-    
+
+
+class AppointmentSeriesModel(Base):
+    """Повторяющийся показ. Вхождения не хранятся, а разворачиваются для запрошенного окна.
+
+    dtstart задаёт и первое вхождение, и время суток остальных (по времени агентства);
+    until — последнее допустимое начало (включительно), None — без окончания.
+    """
+    __tablename__ = "appointment_series"
+
+    id: Mapped[int_pk]
+    property_id: Mapped[int] = mapped_column(ForeignKey("properties.id", ondelete="CASCADE"), nullable=False, index=True)
+    client_id: Mapped[int] = mapped_column(ForeignKey("clients.id", ondelete="CASCADE"), nullable=False)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
+    frequency: Mapped[RecurrenceFrequency] = mapped_column(Enum(RecurrenceFrequency, values_callable=lambda x: [e.value for e in x]), nullable=False)
+    interval: Mapped[int] = mapped_column(nullable=False, default=1, server_default=text('1'))
+    weekdays: Mapped[list[int] | None] = mapped_column(JSON)
+    dtstart: Mapped[datetime_base]
+    until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    count: Mapped[int | None]
+    duration_minutes: Mapped[int_base]
+    notes: Mapped[str | None]
+    created_at: Mapped[createtime_base]
+    updated_at: Mapped[updatetime_base]
+
+    overrides = relationship("AppointmentModel", back_populates="series", foreign_keys="AppointmentModel.series_id")
+
+    def __str__(self):
+        return f"{self.__class__.__name__}(id={self.id})"
+
+    def __repr__(self):
+        return str(self)
+
+
+# timestamptz + interval только STABLE, но сдвиг на минуты от часового пояса не зависит
+APPOINTMENT_PERIOD_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION appointment_period(start timestamptz, minutes integer)
+RETURNS tstzrange
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$ SELECT tstzrange(start, start + make_interval(mins => minutes), '[)') $$
+""")
+
+# Любое изменение показа (в том числе каскадное удаление) увеличивает calendar_version агента.
+# Блокировка строки пользователя упорядочивает версии в порядке коммитов, поэтому
+# клиент, запомнивший версию, не пропустит изменения параллельных транзакций.
+APPOINTMENT_SYNC_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION appointment_sync_version()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    version bigint;
+BEGIN
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.user_id <> NEW.user_id) THEN
+        UPDATE users SET calendar_version = calendar_version + 1
+        WHERE id = OLD.user_id
+        RETURNING calendar_version INTO version;
+        IF FOUND THEN
+            INSERT INTO appointment_tombstones (appointment_id, user_id, meeting_time, sync_version, deleted_at)
+            VALUES (OLD.id, OLD.user_id, OLD.meeting_time, version, now());
+        END IF;
+        IF TG_OP = 'DELETE' THEN
+            RETURN OLD;
+        END IF;
+    END IF;
+    UPDATE users SET calendar_version = calendar_version + 1
+    WHERE id = NEW.user_id
+    RETURNING calendar_version INTO NEW.sync_version;
+    RETURN NEW;
+END
+$$
+""")
+
+APPOINTMENT_SYNC_TRIGGERS = (
+    DDL("""
+    CREATE TRIGGER appointments_sync_version
+    BEFORE INSERT OR UPDATE ON appointments
+    FOR EACH ROW EXECUTE FUNCTION appointment_sync_version()
+    """),
+    DDL("""
+    CREATE TRIGGER appointments_sync_tombstone
+    AFTER DELETE ON appointments
+    FOR EACH ROW EXECUTE FUNCTION appointment_sync_version()
+    """),
+)
+
+event.listen(AppointmentModel.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+event.listen(AppointmentModel.__table__, "before_create", APPOINTMENT_PERIOD_FUNCTION)
+event.listen(AppointmentModel.__table__, "before_create", APPOINTMENT_SYNC_FUNCTION)
+for trigger in APPOINTMENT_SYNC_TRIGGERS:
+    event.listen(AppointmentModel.__table__, "after_create", trigger)
+
+
+class AppointmentTombstoneModel(Base):
+    """Удалённый показ: нужен, чтобы инкрементальная синхронизация календаря увидела удаление."""
+    __tablename__ = "appointment_tombstones"
+
+    id: Mapped[int_pk]
+    appointment_id: Mapped[int_base]
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    meeting_time: Mapped[datetime_base]
+    sync_version: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    deleted_at: Mapped[createtime_base]
+
+    __table_args__ = (
+        Index("ix_appointment_tombstones_user_sync_version", "user_id", "sync_version"),
+    )
+
+    def __str__(self):
+        return f"{self.__class__.__name__}(appointment_id={self.appointment_id})"
+
+    def __repr__(self):
+        return str(self)
+
+
+class BlobModel(Base):
+    __tablename__ = "blobs"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    ref_count: Mapped[int] = mapped_column(nullable=False, default=0, server_default=text('0'))
+    created_at: Mapped[createtime_base]
+
+    documents = relationship("DocumentModel", back_populates="blob")
+
+    __table_args__ = (
+        Index("ix_blobs_unreferenced", "sha256", postgresql_where=text("ref_count = 0")),
+    )
+
+    def __str__(self):
+        return f"{self.__class__.__name__}(sha256={self.sha256}, refs={self.ref_count})"
+
+    def __repr__(self):
+        return str(self)
+
+
+class LegacyFileModel(Base):
+    """Файл, скопированный миграцией в хранилище блобов; оригинал удаляет python -m src.storage.legacy."""
+    __tablename__ = "legacy_files"
+
+    path: Mapped[str] = mapped_column(Text, primary_key=True)
+    sha256: Mapped[str] = mapped_column(String(64), nullable=False)
+
+    def __str__(self):
+        return f"{self.__class__.__name__}(path={self.path})"
+
+    def __repr__(self):
+        return str(self)
+
 
 class DocumentModel(Base):
     __tablename__ = "documents"
@@ -125,8 +307,9 @@ class DocumentModel(Base):
     filename: Mapped[str] = mapped_column(String(255), nullable=False)
     original_filename: Mapped[str] = mapped_column(String(255), nullable=False)
     file_path: Mapped[str] = mapped_column(String(500), nullable=False)
-    file_size: Mapped[int_base]
+    file_size: Mapped[int] = mapped_column(BigInteger, nullable=False)
     mime_type: Mapped[str] = mapped_column(String(100), nullable=False)
+    sha256: Mapped[str | None] = mapped_column(ForeignKey("blobs.sha256"), nullable=True, index=True)
     client_id: Mapped[int | None] = mapped_column(ForeignKey("clients.id", ondelete="SET NULL"), nullable=True)
     property_id: Mapped[int | None] = mapped_column(ForeignKey("properties.id", ondelete="SET NULL"), nullable=True)
     deal_id: Mapped[int | None] = mapped_column(ForeignKey("deals.id", ondelete="SET NULL"), nullable=True)
@@ -134,11 +317,34 @@ class DocumentModel(Base):
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
     uploaded_by: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     created_at: Mapped[createtime_base]
+    content_text: Mapped[str | None] = mapped_column(Text, nullable=True, deferred=True)
+    indexed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('russian', regexp_replace(coalesce(original_filename, ''), '[._-]+', ' ', 'g')), 'A') || "
+            "setweight(to_tsvector('russian', coalesce(description, '')), 'B') || "
+            "setweight(to_tsvector('russian', coalesce(content_text, '')), 'C')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
+
+    __table_args__ = (
+        Index("ix_documents_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_documents_not_indexed", "id", postgresql_where=text("indexed_at IS NULL")),
+        Index("ix_documents_uploaded_by_created_at", "uploaded_by", "created_at", "id"),
+        Index("ix_documents_uploaded_by_folder_created_at", "uploaded_by", "folder", "created_at", "id"),
+        Index("ix_documents_client_id_created_at", "client_id", "created_at", "id"),
+        Index("ix_documents_property_id_created_at", "property_id", "created_at", "id"),
+        Index("ix_documents_deal_id_created_at", "deal_id", "created_at", "id"),
+    )
 
     uploader = relationship("UserModel", back_populates="documents_uploaded", foreign_keys=[uploaded_by])
     client = relationship("ClientModel", back_populates="documents", foreign_keys=[client_id])
     property_obj = relationship("PropertyModel", back_populates="documents", foreign_keys=[property_id])
     deal = relationship("DealModel", back_populates="documents", foreign_keys=[deal_id])
+    blob = relationship("BlobModel", back_populates="documents", foreign_keys=[sha256])
     
     def __str__(self):
         return f"{self.__class__.__name__}(id={self.id}, filename={self.original_filename})"
@@ -146,6 +352,60 @@ class DocumentModel(Base):
     def __repr__(self):
         return str(self)
 
+class UploadSessionModel(Base):
+    __tablename__ = "upload_sessions"
+
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    original_filename: Mapped[str] = mapped_column(String(255), nullable=False)
+    mime_type: Mapped[str] = mapped_column(String(100), nullable=False)
+    total_size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    offset: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default=text('0'))
+    client_id: Mapped[int | None] = mapped_column(ForeignKey("clients.id", ondelete="SET NULL"), nullable=True)
+    property_id: Mapped[int | None] = mapped_column(ForeignKey("properties.id", ondelete="SET NULL"), nullable=True)
+    deal_id: Mapped[int | None] = mapped_column(ForeignKey("deals.id", ondelete="SET NULL"), nullable=True)
+    folder: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    description: Mapped[str | None] = mapped_column(Text, nullable=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    created_at: Mapped[createtime_base]
+
+    def __str__(self):
+        return f"{self.__class__.__name__}(id={self.id}, offset={self.offset}/{self.total_size})"
+
+    def __repr__(self):
+        return str(self)
+
+
+class DocumentFolderModel(Base):
+    """Папка документов пользователя со счётчиками, обновляемыми вместе с документами.
+
+    document_count/total_bytes — документы непосредственно в папке,
+    tree_document_count/tree_total_bytes — вместе со всеми вложенными папками.
+    """
+    __tablename__ = "document_folders"
+
+    id: Mapped[int_pk]
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    path: Mapped[str] = mapped_column(String(255), nullable=False)
+    parent_path: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    depth: Mapped[int_base]
+    document_count: Mapped[int] = mapped_column(nullable=False, default=0, server_default=text('0'))
+    total_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default=text('0'))
+    tree_document_count: Mapped[int] = mapped_column(nullable=False, default=0, server_default=text('0'))
+    tree_total_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default=text('0'))
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "path", name="uq_document_folders_user_path"),
+        Index("ix_document_folders_user_parent", "user_id", "parent_path"),
+    )
+
+    def __str__(self):
+        return f"{self.__class__.__name__}(id={self.id}, path={self.path})"
+
+    def __repr__(self):
+        return str(self)
+
+
 class DealModel(Base):
     __tablename__ = "deals"
     
@@ -166,7 +426,7 @@ class DealModel(Base):
     agency_commission_amount: Mapped[float_base]
     agent_commission_rate: Mapped[int_base]
     agent_commission_amount: Mapped[float_base]
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False) 
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
     deal_date: Mapped[datetime] = mapped_column(DateTime(timezone=False), nullable=False)
     type: Mapped[DealType] = mapped_column(
         Enum(DealType, values_callable=lambda x: [e.value for e in x]),
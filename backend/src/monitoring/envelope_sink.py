@@ -0,0 +1,122 @@
+"""Локальный приёмник конвертов Sentry для проверки трассировки без внешнего сервиса.
+
+    python -m src.monitoring.envelope_sink --port 8999 --output envelopes.jsonl
+    SENTRY_DSN=http://local@127.0.0.1:8999/1 SENTRY_TRACES_SAMPLE_RATE=1.0 uvicorn src.main:app
+
+Каждая транзакция печатается водопадом span-ов и дописывается в output строкой JSON.
+"""
+import argparse
+import gzip
+import json
+import threading
+import zlib
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List, Optional, Tuple
+
+
+def parse_envelope(body: bytes) -> Iterator[Tuple[dict, bytes]]:
+    """Элементы конверта: заголовок элемента и полезная нагрузка (длина — из length или до перевода строки)."""
+    _, _, rest = body.partition(b"\n")
+    while rest.strip():
+        header_line, _, rest = rest.partition(b"\n")
+        header = json.loads(header_line)
+        length = header.get("length")
+        if length is None:
+            payload, _, rest = rest.partition(b"\n")
+        else:
+            payload, rest = rest[:length], rest[length + 1:]
+        yield header, payload
+
+
+def _ts(value) -> float:
+    """SDK пишет время то числом секунд, то строкой ISO 8601."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def waterfall(transaction: dict) -> str:
+    start = _ts(transaction["start_timestamp"])
+    total = (_ts(transaction["timestamp"]) - start) * 1000
+    lines = [f"{transaction.get('transaction')}  {total:.1f} мс"]
+    children = {}
+    for span in transaction.get("spans", []):
+        children.setdefault(span.get("parent_span_id"), []).append(span)
+
+    def walk(parent_id: str, depth: int) -> None:
+        for span in sorted(children.get(parent_id, []), key=lambda s: _ts(s["start_timestamp"])):
+            offset = (_ts(span["start_timestamp"]) - start) * 1000
+            duration = (_ts(span["timestamp"]) - _ts(span["start_timestamp"])) * 1000
+            name = span.get("description") or span.get("name") or ""
+            lines.append(f"{offset:8.1f} +{duration:7.1f} мс {'  ' * depth}{span.get('op')}: {name[:100]}")
+            walk(span["span_id"], depth + 1)
+
+    walk(transaction["contexts"]["trace"]["span_id"], 1)
+    return "\n".join(lines)
+
+
+class EnvelopeSink:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8999, output: Optional[str] = None, quiet: bool = False):
+        self.output = output
+        self.quiet = quiet
+        self.transactions: List[dict] = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+
+    def _handler(self):
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                encoding = self.headers.get("Content-Encoding", "")
+                if encoding == "gzip":
+                    body = gzip.decompress(body)
+                elif encoding == "deflate":
+                    body = zlib.decompress(body)
+                elif encoding == "br":
+                    import brotli
+                    body = brotli.decompress(body)
+                for header, payload in parse_envelope(body):
+                    if header.get("type") == "transaction":
+                        sink.add(json.loads(payload))
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def add(self, transaction: dict) -> None:
+        with self._lock:
+            self.transactions.append(transaction)
+            if self.output:
+                with open(self.output, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(transaction, ensure_ascii=False) + "\n")
+        if not self.quiet:
+            print(waterfall(transaction), flush=True)
+
+    def start(self) -> "EnvelopeSink":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Приёмник конвертов Sentry")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8999)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+    sink = EnvelopeSink(args.host, args.port, args.output)
+    print(f"Приём конвертов на http://{args.host}:{args.port}, DSN: http://local@{args.host}:{args.port}/1")
+    try:
+        sink.server.serve_forever()
+    except KeyboardInterrupt:
+        sink.server.server_close()
@@ -0,0 +1,132 @@
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+from src.cache import cache_manager
+from src.config import settings
+from src.database import engine
+from src.documents.uploads import upload_manager
+from src.storage.blobs import blob_store
+from src.storage.executor import run_io
+from src.storage.factory import storage
+
+OK, DEGRADED, FAIL = "ok", "degraded", "fail"
+
+
+def _probe_write(directory: Path) -> None:
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=".health-") as f:
+        f.write(b"ok")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _storage_dirs() -> List[Path]:
+    dirs = [blob_store.staging_dir, upload_manager.staging_dir]
+    root = getattr(storage, "root", None)
+    if root is not None:
+        dirs.append(root)
+    return dirs
+
+
+async def check_database() -> None:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def check_redis() -> None:
+    # Без Redis приложение работает без кэша; проверка заодно восстанавливает подключение
+    if not await cache_manager.reconnect():
+        raise ConnectionError("Redis недоступен")
+    await cache_manager.redis.ping()
+
+
+async def check_storage() -> None:
+    for directory in _storage_dirs():
+        await run_io(_probe_write, directory)
+
+
+async def _timed(check: Callable[[], Awaitable[None]]) -> dict:
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(check(), settings.HEALTH_CHECK_TIMEOUT)
+        result = {"status": OK}
+    except asyncio.TimeoutError:
+        result = {"status": FAIL, "error": f"нет ответа за {settings.HEALTH_CHECK_TIMEOUT} с"}
+    except Exception as e:
+        result = {"status": FAIL, "error": f"{type(e).__name__}: {e}"}
+    result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+def pool_state() -> dict:
+    """Загрузка пула считается на каждый запрос — это дёшево и не трогает Postgres."""
+    pool = engine.pool
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    checked_out = pool.checkedout()
+    return {
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_out": checked_out,
+        "overflow": max(pool.overflow(), 0),
+        "saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+    }
+
+
+class ReadinessProbe:
+    """Проверки зависимостей с кэшированием на HEALTH_CACHE_SECONDS.
+
+    Одновременные пробы ждут одну проверку, поэтому шквал запросов балансировщика
+    даёт не больше одного SELECT 1 за период кэширования.
+    """
+
+    CHECKS: Dict[str, Callable[[], Awaitable[None]]] = {
+        "database": check_database,
+        "redis": check_redis,
+        "storage": check_storage,
+    }
+    # Без Redis сервис работает медленнее, но корректно — трафик с воркера не снимается
+    OPTIONAL = ("redis",)
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._checks: Optional[Dict[str, dict]] = None
+        self._checked_at = 0.0
+        self._checked_at_iso = ""
+
+    async def checks(self) -> Dict[str, dict]:
+        async with self._lock:
+            if self._checks is None or time.monotonic() - self._checked_at >= settings.HEALTH_CACHE_SECONDS:
+                results = await asyncio.gather(*(_timed(check) for check in self.CHECKS.values()))
+                self._checks = dict(zip(self.CHECKS, results))
+                self._checked_at = time.monotonic()
+                self._checked_at_iso = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        return self._checks
+
+    async def report(self) -> dict:
+        checks = await self.checks()
+        pool = pool_state()
+        failed = [name for name, result in checks.items() if result["status"] != OK]
+        saturated = pool["saturation"] >= settings.HEALTH_POOL_SATURATION
+        if saturated or any(name not in self.OPTIONAL for name in failed):
+            status = FAIL
+        elif failed:
+            status = DEGRADED
+        else:
+            status = OK
+        pool["status"] = FAIL if saturated else OK
+        return {
+            "status": status,
+            "pid": os.getpid(),
+            "checked_at": self._checked_at_iso,
+            "checks": checks,
+            "pool": pool,
+        }
+
+
+readiness = ReadinessProbe()
@@ -0,0 +1,212 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from src.config import settings
+
+REQUEST_ID_HEADER = b"x-request-id"
+# Входящий X-Request-ID принимается только в безопасном виде, иначе генерируется свой
+_REQUEST_ID = re.compile(r"[\w.:-]{1,128}")
+# Пробы балансировщика и сбор метрик попадают в лог только при ошибках и медленных ответах
+QUIET_PATHS = ("/health", "/metrics")
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+
+# Стандартные атрибуты LogRecord; всё остальное пришло через extra и попадает в JSON
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "color_message"}
+
+access_logger = logging.getLogger("src.access")
+
+
+@dataclass
+class RequestContext:
+    request_id: str
+    user_id: Optional[int] = None
+    db_time: float = 0.0
+    db_statements: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+
+    @property
+    def cache_outcome(self) -> Optional[str]:
+        if not self.cache_hits and not self.cache_misses:
+            return None
+        if not self.cache_misses:
+            return "hit"
+        if not self.cache_hits:
+            return "miss"
+        return "partial"
+
+
+current_request: ContextVar[Optional[RequestContext]] = ContextVar("current_request", default=None)
+
+
+def bind_user(user_id: int) -> None:
+    ctx = current_request.get()
+    if ctx is not None:
+        ctx.user_id = user_id
+
+
+def count_cache(hits: int, misses: int) -> None:
+    ctx = current_request.get()
+    if ctx is not None:
+        ctx.cache_hits += hits
+        ctx.cache_misses += misses
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", "-") != "-":
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ContextQueueHandler(QueueHandler):
+    """Запись кладётся в очередь, а вывод делает поток QueueListener — вызывающий код не ждёт stdout.
+
+    Контекст запроса и трассировка исключения снимаются здесь, в момент вызова логгера.
+    """
+
+    _exc_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        ctx = current_request.get()
+        record = copy.copy(record)
+        record.request_id = ctx.request_id if ctx else "-"
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging() -> None:
+    global _listener
+    if _listener is not None:
+        return
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, output)
+
+    root = logging.getLogger()
+    root.handlers = [ContextQueueHandler(log_queue)]
+    root.setLevel(settings.LOG_LEVEL)
+    # uvicorn настраивает свои логгеры до импорта приложения — переводим их в общий конвейер;
+    # строки доступа пишет AccessLogMiddleware
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+    logging.getLogger("uvicorn.access").disabled = True
+
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def _incoming_request_id(scope) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == REQUEST_ID_HEADER:
+            request_id = value.decode("latin-1")
+            return request_id if _REQUEST_ID.fullmatch(request_id) else None
+    return None
+
+
+class AccessLogMiddleware:
+    """Идентификатор запроса для всех логов и ответа, строка доступа с задержкой, пользователем, БД и кэшем.
+
+    Успешные быстрые ответы пишутся с частотой ACCESS_LOG_SAMPLE_RATE (пробы и /metrics — никогда),
+    ошибки и медленные — всегда.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        ctx = RequestContext(request_id=_incoming_request_id(scope) or uuid.uuid4().hex)
+        token = current_request.set(ctx)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", []), (REQUEST_ID_HEADER, ctx.request_id.encode())],
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.log(scope, ctx, status, time.perf_counter() - started)
+            current_request.reset(token)
+
+    @staticmethod
+    def log(scope, ctx: RequestContext, status: int, elapsed: float) -> None:
+        duration_ms = elapsed * 1000
+        slow = duration_ms >= settings.ACCESS_LOG_SLOW_MS
+        sample_rate = 1.0
+        if status < 400 and not slow:
+            if scope["path"].startswith(QUIET_PATHS):
+                return
+            sample_rate = settings.ACCESS_LOG_SAMPLE_RATE
+            if random.random() >= sample_rate:
+                return
+
+        if status >= 500:
+            level = logging.ERROR
+        elif slow:
+            level = logging.WARNING
+        else:
+            level = logging.INFO
+        access_logger.log(
+            level,
+            "%s %s %s %.1f мс", scope["method"], scope["path"], status, duration_ms,
+            extra={
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(scope.get("route"), "path", None),
+                "status": status,
+                "duration_ms": round(duration_ms, 2),
+                "user_id": ctx.user_id,
+                "db_ms": round(ctx.db_time * 1000, 2),
+                "db_statements": ctx.db_statements,
+                "cache": ctx.cache_outcome,
+                "sample_rate": sample_rate,
+            },
+        )
@@ -0,0 +1,219 @@
+import functools
+import inspect
+import logging
+import os
+import time
+from collections import Counter as Tally
+from typing import Iterable
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.exceptions import ServiceUnavailableException
+from src.monitoring.logs import count_cache
+from src.monitoring.tracing import span
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+    )
+except ImportError:  # pragma: no cover - prometheus_client необязателен (pip install prometheus-client), без него /metrics отвечает 503
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+    REGISTRY = None
+
+    class _NoopMetric:
+        """Заглушка Counter/Gauge/Histogram: значения принимаются и отбрасываются."""
+
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def labels(self, *args, **kwargs):
+            return self
+
+        def inc(self, amount=1):
+            pass
+
+        def dec(self, amount=1):
+            pass
+
+        def set(self, value):
+            pass
+
+        def observe(self, amount):
+            pass
+
+    Counter = Gauge = Histogram = _NoopMetric
+
+METRICS_ENABLED = REGISTRY is not None
+
+# Границы под запросы API и SQL: от миллисекунды до десятков секунд
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PAYLOAD_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Время обработки запроса",
+    ["method", "route"], buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "Запросы по маршрутам и кодам ответа",
+    ["method", "route", "status"],
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Запросы в обработке",
+    ["method"], multiprocess_mode="livesum",
+)
+
+DB_POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Выдачи соединений из пула")
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Ожидание соединения из пула, включая открытие нового",
+    buckets=LATENCY_BUCKETS,
+)
+DB_STATEMENTS_PER_REQUEST = Histogram(
+    "db_statements_per_request", "SQL-запросов на один HTTP-запрос",
+    ["route"], buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Соединения, выданные из пула", multiprocess_mode="livesum")
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Соединения сверх pool_size", multiprocess_mode="livesum")
+
+APP_STARTUP = Gauge(
+    "app_startup_seconds", "Время запуска воркера до приёма запросов", multiprocess_mode="max",
+)
+
+DAO_DURATION = Histogram(
+    "dao_query_duration_seconds", "Время методов DAO",
+    ["dao", "method"], buckets=LATENCY_BUCKETS,
+)
+DAO_ERRORS = Counter("dao_query_errors_total", "Исключения в методах DAO", ["dao", "method"])
+
+CACHE_REQUESTS = Counter("cache_requests_total", "Чтения из кэша", ["namespace", "result"])
+CACHE_ERRORS = Counter("cache_errors_total", "Ошибки Redis", ["namespace", "operation"])
+CACHE_PAYLOAD = Histogram(
+    "cache_payload_bytes", "Размер значения в кэше",
+    ["namespace", "operation"], buckets=PAYLOAD_BUCKETS,
+)
+
+
+def cache_namespace(key: str) -> str:
+    """Первый сегмент ключа: deals:user:1 -> deals. Число меток ограничено числом префиксов в коде."""
+    return key.split(":", 1)[0]
+
+
+def count_cache_reads(keys: Iterable[str], values: Iterable) -> None:
+    hits, misses = Tally(), Tally()
+    for key, value in zip(keys, values):
+        (hits if value else misses)[cache_namespace(key)] += 1
+    for namespace, n in hits.items():
+        CACHE_REQUESTS.labels(namespace, "hit").inc(n)
+    for namespace, n in misses.items():
+        CACHE_REQUESTS.labels(namespace, "miss").inc(n)
+    count_cache(sum(hits.values()), sum(misses.values()))
+
+
+def _timed(func, dao: str = None):
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        # Для унаследованных classmethod метка — класс, через который вызван метод
+        label = dao or args[0].__name__
+        started = time.perf_counter()
+        try:
+            with span("db.dao", f"{label}.{name}"):
+                return await func(*args, **kwargs)
+        except Exception:
+            DAO_ERRORS.labels(label, name).inc()
+            raise
+        finally:
+            DAO_DURATION.labels(label, name).observe(time.perf_counter() - started)
+
+    return wrapper
+
+
+def instrument_dao(cls):
+    """Оборачивает асинхронные classmethod/staticmethod класса замером длительности."""
+    for attr, value in list(vars(cls).items()):
+        if isinstance(value, classmethod) and inspect.iscoroutinefunction(value.__func__):
+            setattr(cls, attr, classmethod(_timed(value.__func__)))
+        elif isinstance(value, staticmethod) and inspect.iscoroutinefunction(value.__func__):
+            setattr(cls, attr, staticmethod(_timed(value.__func__, dao=cls.__name__)))
+    return cls
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Пул с замером ожидания свободного соединения."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - started)
+
+
+# SQLAlchemy называет логгер пула по модулю класса, и он не попадает под уровень WARN логгера "sqlalchemy"
+logging.getLogger(f"{__name__}.{InstrumentedPool.__name__}").setLevel(logging.WARNING)
+
+
+def instrument_engine(engine) -> None:
+    """Счётчики выдач и загрузка пула; события движка переживают пересоздание пула при dispose()."""
+    sync_engine = engine.sync_engine
+
+    def update_gauges() -> None:
+        pool = sync_engine.pool
+        DB_POOL_CHECKED_OUT.set(pool.checkedout())
+        DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+    @event.listens_for(sync_engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKOUTS.inc()
+        update_gauges()
+
+    @event.listens_for(sync_engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        update_gauges()
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: длительность и коды ответов по шаблону маршрута, а не по пути."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.labels(method).inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_PROGRESS.labels(method).dec()
+            route = scope.get("route")
+            path = getattr(route, "path", UNMATCHED_ROUTE)
+            HTTP_REQUEST_DURATION.labels(method, path).observe(elapsed)
+            HTTP_REQUESTS.labels(method, path, str(status)).inc()
+
+
+def render() -> bytes:
+    if not METRICS_ENABLED:
+        raise ServiceUnavailableException("Метрики недоступны: не установлен пакет prometheus_client")
+    # При нескольких воркерах метрики собираются из файлов PROMETHEUS_MULTIPROC_DIR
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
@@ -0,0 +1,231 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+from src.config import BASE_DIR
+from src.exceptions import AppException, BadRequestException, ConflictException, app_exception_handler
+from src.users.auth import get_current_admin_user, get_current_user, get_token
+
+DEFAULT_INTERVAL = 0.005
+MAX_SECONDS = 60
+MAX_DEPTH = 128
+FORMATS = ("speedscope", "collapsed")
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY = "__profile"
+
+Frame = Tuple[str, str, int]
+Stack = Tuple[Frame, ...]
+
+# Одновременно работает только один сэмплер: профилирование не должно само стать нагрузкой
+_busy = threading.Lock()
+
+
+def _frame(code, line: int) -> Frame:
+    filename = code.co_filename
+    if filename.startswith(BASE_DIR):
+        filename = os.path.relpath(filename, BASE_DIR)
+    return getattr(code, "co_qualname", code.co_name), filename, line
+
+
+def _thread_stack(frame, stop=None) -> List[Frame]:
+    """Стек потока от корня к листу; stop — фрейм, выше которого не поднимаемся."""
+    stack = []
+    while frame is not None and len(stack) < MAX_DEPTH:
+        stack.append(_frame(frame.f_code, frame.f_lineno))
+        if frame is stop:
+            break
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _await_stack(coro) -> List[Frame]:
+    """Цепочка await приостановленной корутины — где именно запрос ждёт."""
+    stack = []
+    while coro is not None and len(stack) < MAX_DEPTH:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+        if frame is None:
+            stack.append((f"<ожидание {type(coro).__name__}>", "", 0))
+            break
+        stack.append(_frame(frame.f_code, frame.f_lineno))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+    return stack
+
+
+class Sampler:
+    """Сэмплирующий профилировщик на отдельном потоке через sys._current_frames().
+
+    С task снимает стек одного запроса: пока корутина выполняется — стек потока,
+    пока ждёт ввода-вывода — цепочку await. Без task — стеки всех потоков воркера.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, task: Optional[asyncio.Task] = None):
+        self.interval = interval
+        self.task = task
+        self.loop_thread_id = threading.get_ident()
+        self.samples: Counter = Counter()
+        self.started = self.finished = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> None:
+        if not _busy.acquire(blocking=False):
+            raise ConflictException("Профилирование уже выполняется")
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.finished = time.perf_counter()
+        _busy.release()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if self.task is not None:
+                stack = self._task_stack(frames.get(self.loop_thread_id))
+                if stack:
+                    self.samples[stack] += 1
+                continue
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in frames.items():
+                if thread_id == own:
+                    continue
+                root = (f"поток {names.get(thread_id, thread_id)}", "", 0)
+                self.samples[(root, *_thread_stack(frame))] += 1
+
+    def _task_stack(self, loop_frame) -> Stack:
+        coro = self.task.get_coro()
+        if coro is None or self.task.done():
+            return ()
+        if coro.cr_running and loop_frame is not None:
+            return tuple(_thread_stack(loop_frame, stop=coro.cr_frame))
+        return tuple(_await_stack(coro))
+
+    @property
+    def duration(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+
+def collapsed(sampler: Sampler) -> str:
+    """Формат collapsed stacks для flamegraph.pl / speedscope / inferno."""
+    lines = []
+    for stack, count in sampler.samples.most_common():
+        names = ";".join(f"{name} ({file}:{line})" if file else name for name, file, line in stack)
+        lines.append(f"{names} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def speedscope(sampler: Sampler, name: str) -> dict:
+    frames: List[dict] = []
+    index: Dict[Frame, int] = {}
+    samples, weights = [], []
+    for stack, count in sampler.samples.items():
+        indexes = []
+        for frame in stack:
+            if frame not in index:
+                index[frame] = len(frames)
+                func, file, line = frame
+                frames.append({"name": func, "file": file, "line": line} if file else {"name": func})
+            indexes.append(index[frame])
+        samples.append(indexes)
+        weights.append(count * sampler.interval)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "vkr-sampler",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": round(sampler.duration, 6),
+            "samples": samples,
+            "weights": weights,
+        }],
+    }
+
+
+def profile_response(sampler: Sampler, fmt: str, name: str, headers: Optional[dict] = None) -> Response:
+    headers = {"X-Profile-Samples": str(sum(sampler.samples.values())), **(headers or {})}
+    if fmt == "collapsed":
+        return PlainTextResponse(collapsed(sampler), headers=headers)
+    return JSONResponse(speedscope(sampler, name), headers=headers)
+
+
+def _requested_format(scope) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == PROFILE_HEADER:
+            return value.decode("latin-1").strip().lower() or "speedscope"
+    if PROFILE_QUERY.encode() in scope.get("query_string", b""):
+        return Request(scope).query_params.get(PROFILE_QUERY) or "speedscope"
+    return None
+
+
+class ProfilerMiddleware:
+    """Профиль одного запроса по заголовку X-Profile или параметру __profile.
+
+    Вместо ответа обработчика возвращается профиль; код исходного ответа — в X-Profile-Status.
+    Запросы без флага проходят без сэмплера и без дополнительных await.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        fmt = _requested_format(scope) if scope["type"] == "http" else None
+        if fmt is None:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        try:
+            if fmt not in FORMATS:
+                raise BadRequestException(f"Формат профиля: {', '.join(FORMATS)}")
+            await get_current_admin_user(await get_current_user(get_token(request)))
+            sampler = Sampler(task=asyncio.current_task())
+            sampler.start()
+        except AppException as e:
+            response = await app_exception_handler(request, e)
+            await response(scope, receive, send)
+            return
+
+        status = 500
+
+        async def discard(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            sampler.stop()
+
+        route = getattr(scope.get("route"), "path", scope["path"])
+        response = profile_response(
+            sampler, fmt, f"{scope['method']} {route}",
+            headers={"X-Profile-Status": str(status), "X-Profile-Duration": f"{sampler.duration:.6f}"},
+        )
+        await response(scope, receive, send)
+
+
+async def sample_worker(seconds: float, interval: float = DEFAULT_INTERVAL) -> Sampler:
+    sampler = Sampler(interval=interval)
+    sampler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        sampler.stop()
+    return sampler
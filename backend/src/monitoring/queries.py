@@ -0,0 +1,179 @@
+import asyncio
+import heapq
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import Context, ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+
+from src.config import settings
+from src.monitoring.logs import current_request
+from src.monitoring.metrics import DB_STATEMENTS_PER_REQUEST, UNMATCHED_ROUTE
+from src.monitoring.timing import record as record_timing
+
+logger = logging.getLogger(__name__)
+
+SLOWEST_KEPT = 5
+# Одну и ту же форму запроса EXPLAIN-им не чаще раза в EXPLAIN_COOLDOWN секунд
+EXPLAIN_COOLDOWN = 10 * 60
+EXPLAIN_CACHE_SIZE = 1000
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+_NUMBERED_PARAMS = re.compile(r"\$\d+(?:\s*::\s*[\w\[\]]+)?(?:\s*,\s*\$\d+(?:\s*::\s*[\w\[\]]+)?)*")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+# Строки условий плана (Filter:, Index Cond: ...) содержат значения параметров запроса
+_PLAN_CONDITION = re.compile(r"^(\s*(?:->\s*)?[\w -]*(?:Filter|Cond)\s*:)(.*)$", re.MULTILINE)
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(statement: str) -> str:
+    """Форма запроса без значений: списки IN ($1, $2, ...) разной длины сводятся к одной."""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _NUMBERED_PARAMS.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+def redact_plan(plan: str) -> str:
+    """План без значений: строки заменяются везде, числа — в условиях, чтобы не трогать cost и rows."""
+    plan = _STRING_LITERAL.sub("'?'", plan)
+    return _PLAN_CONDITION.sub(lambda m: m.group(1) + _NUMBER_LITERAL.sub("?", m.group(2)), plan)
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_time: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+    slowest: List[Tuple[float, str]] = field(default_factory=list)
+
+    def record(self, statement: str, elapsed: float) -> None:
+        shape = normalize_sql(statement)
+        self.count += 1
+        self.total_time += elapsed
+        self.shapes[shape] += 1
+        if len(self.slowest) < SLOWEST_KEPT:
+            heapq.heappush(self.slowest, (elapsed, shape))
+        elif elapsed > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (elapsed, shape))
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+_explained: Dict[str, float] = {}
+# Цикл событий хранит только слабые ссылки на задачи — без этого EXPLAIN может быть собран сборщиком мусора
+_explain_tasks: Set[asyncio.Task] = set()
+
+
+async def _explain(statement: str, parameters) -> None:
+    from src.database import engine
+
+    try:
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(skip_query_stats=True)
+            result = await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+            plan = redact_plan("\n".join(row[0] for row in result))
+        logger.warning("План медленного запроса:\n%s\n%s", normalize_sql(statement), plan)
+    except Exception as e:
+        logger.warning("Не удалось получить план запроса: %s", e)
+
+
+def _schedule_explain(statement: str, parameters) -> None:
+    if not statement.lstrip().upper().startswith(EXPLAINABLE):
+        return
+    shape = normalize_sql(statement)
+    now = time.monotonic()
+    if now - _explained.get(shape, -EXPLAIN_COOLDOWN) < EXPLAIN_COOLDOWN:
+        return
+    if len(_explained) >= EXPLAIN_CACHE_SIZE:
+        _explained.clear()
+    _explained[shape] = now
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    # План снимается отдельным соединением вне контекста запроса и не попадает в его счётчики
+    task = loop.create_task(_explain(statement, parameters), context=Context())
+    _explain_tasks.add(task)
+    task.add_done_callback(_explain_tasks.discard)
+
+
+def instrument_queries(engine) -> None:
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        if context is not None and context.execution_options.get("skip_query_stats"):
+            return
+
+        record_timing("db", elapsed)
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+
+        if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+            logger.warning("Медленный запрос %.1f мс: %s", elapsed * 1000, normalize_sql(statement))
+            if settings.EXPLAIN_SLOW_QUERIES and not executemany:
+                _schedule_explain(statement, parameters)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+        if starts:
+            starts.pop()
+
+
+class QueryStatsMiddleware:
+    """Считает SQL-запросы каждого HTTP-запроса и предупреждает о превышении бюджета и N+1."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_query_stats.reset(token)
+            self.report(scope, stats)
+
+    @staticmethod
+    def report(scope, stats: QueryStats) -> None:
+        route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+        ctx = current_request.get()
+        if ctx is not None:
+            ctx.db_time, ctx.db_statements = stats.total_time, stats.count
+        DB_STATEMENTS_PER_REQUEST.labels(route).observe(stats.count)
+
+        repeated = stats.repeated(settings.N_PLUS_ONE_REPEATS)
+        if stats.count <= settings.QUERY_BUDGET and not repeated:
+            return
+
+        lines = [f"{scope['method']} {route}: {stats.count} SQL-запросов, {stats.total_time * 1000:.1f} мс в БД"]
+        if stats.count > settings.QUERY_BUDGET:
+            lines.append(f"превышен бюджет в {settings.QUERY_BUDGET} запросов")
+        for shape, n in repeated:
+            lines.append(f"возможный N+1, повторов {n}: {shape}")
+        for elapsed, shape in sorted(stats.slowest, reverse=True):
+            lines.append(f"{elapsed * 1000:.1f} мс: {shape}")
+        logger.warning("\n  ".join(lines))
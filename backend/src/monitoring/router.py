@@ -0,0 +1,42 @@
+import os
+
+from fastapi import APIRouter, Depends, Query, Response
+from fastapi.responses import JSONResponse
+
+from src.model import UserModel
+from src.monitoring.health import FAIL, readiness
+from src.monitoring.metrics import CONTENT_TYPE_LATEST, render
+from src.monitoring.profiler import MAX_SECONDS, profile_response, sample_worker
+from src.users.auth import get_current_admin_user
+
+router = APIRouter(tags=["Мониторинг"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(render(), media_type=CONTENT_TYPE_LATEST)
+
+
+@router.get("/health/live")
+async def liveness():
+    """Процесс жив и цикл событий отвечает; зависимости не проверяются."""
+    return {"status": "ok", "pid": os.getpid()}
+
+
+@router.get("/health/ready")
+async def readiness_check():
+    """Готовность принимать трафик: 503, если недоступны БД или хранилище либо пул соединений исчерпан."""
+    report = await readiness.report()
+    return JSONResponse(report, status_code=503 if report["status"] == FAIL else 200)
+
+
+@router.post("/monitoring/profile")
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=MAX_SECONDS),
+    interval_ms: float = Query(5, ge=1, le=100),
+    format: str = Query("speedscope", pattern="^(speedscope|collapsed)$"),
+    admin: UserModel = Depends(get_current_admin_user),
+):
+    """Сэмплирование всех потоков воркера в течение seconds; профиль одного запроса — заголовок X-Profile."""
+    sampler = await sample_worker(seconds, interval_ms / 1000)
+    return profile_response(sampler, format, f"worker {os.getpid()}")
@@ -0,0 +1,127 @@
+import functools
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+import fastapi.dependencies.utils as dependency_utils
+import fastapi.routing as fastapi_routing
+from starlette.responses import JSONResponse
+
+# Порядок записей в заголовке; вложенные интервалы (auth включает db) не вычитаются.
+# Значения заголовков — только ASCII, поэтому описания на английском
+METRICS = ("auth", "db", "cache", "validation", "serialization")
+DESCRIPTIONS = {
+    "auth": "get_current_user",
+    "db": "SQL statements",
+    "cache": "Redis calls",
+    "validation": "request params and body",
+    "serialization": "response model and JSON",
+}
+
+current_timings: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar("current_timings", default=None)
+
+
+def record(name: str, elapsed: float) -> None:
+    timings = current_timings.get()
+    if timings is not None:
+        entry = timings.setdefault(name, [0.0, 0])
+        entry[0] += elapsed
+        entry[1] += 1
+
+
+def timed_async(name: str):
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if current_timings.get() is None:
+                return await func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+def timed_sync(name: str):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if current_timings.get() is None:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+_installed = False
+
+
+def install() -> None:
+    """Замеры разбора запроса и сериализации ответа внутри FastAPI.
+
+    Функции FastAPI вызываются по имени из своих модулей, поэтому подменяются там же.
+    Ответ с response_model валидируется и кодируется в JSON одним вызовом serialize_response,
+    так что обе стадии попадают в serialization.
+    """
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    dependency_utils.request_params_to_args = timed_sync("validation")(dependency_utils.request_params_to_args)
+    dependency_utils.request_body_to_args = timed_async("validation")(dependency_utils.request_body_to_args)
+    fastapi_routing.serialize_response = timed_async("serialization")(fastapi_routing.serialize_response)
+    JSONResponse.render = timed_sync("serialization")(JSONResponse.render)
+
+
+def server_timing(timings: Dict[str, List[float]], total: float) -> str:
+    entries = []
+    for name in METRICS:
+        if name in timings:
+            elapsed, count = timings[name]
+            entries.append(f'{name};dur={elapsed * 1000:.2f};desc="{DESCRIPTIONS[name]}: {count}"')
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+class ServerTimingMiddleware:
+    """Заголовок Server-Timing: время до отправки заголовков ответа по стадиям запроса."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: Dict[str, List[float]] = {}
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                value = server_timing(timings, time.perf_counter() - started)
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (b"server-timing", value.encode()),
+                        (b"timing-allow-origin", b"*"),
+                    ],
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_timings.reset(token)
@@ -0,0 +1,110 @@
+import functools
+from contextlib import nullcontext
+
+import sentry_sdk
+from sentry_sdk.integrations.fastapi import FastApiIntegration
+from sentry_sdk.integrations.starlette import StarletteIntegration
+
+from src.config import settings
+
+# Служебные маршруты не трассируются независимо от частоты сэмплирования
+IGNORED_PATHS = ("/metrics", "/health")
+
+_enabled = False
+
+
+def traces_sampler(sampling_context: dict) -> float:
+    """Частота по префиксу пути из SENTRY_TRACES_SAMPLE_RATES, иначе общая; решение родителя важнее."""
+    parent = sampling_context.get("parent_sampled")
+    if parent is not None:
+        return float(parent)
+
+    path = (sampling_context.get("asgi_scope") or {}).get("path", "")
+    if path.startswith(IGNORED_PATHS):
+        return 0.0
+    for prefix in sorted(settings.SENTRY_TRACES_SAMPLE_RATES, key=len, reverse=True):
+        if path.startswith(prefix):
+            return settings.SENTRY_TRACES_SAMPLE_RATES[prefix]
+    return settings.SENTRY_TRACES_SAMPLE_RATE
+
+
+def init_tracing() -> None:
+    global _enabled
+    if not settings.SENTRY_DSN:
+        return
+    sentry_sdk.init(
+        dsn=settings.SENTRY_DSN,
+        environment=settings.SENTRY_ENVIRONMENT,
+        release=settings.SENTRY_RELEASE,
+        traces_sampler=traces_sampler,
+        send_default_pii=False,
+        # span-ы на каждый middleware и каждый receive/send только зашумляют водопад
+        integrations=[
+            StarletteIntegration(middleware_spans=False),
+            FastApiIntegration(middleware_spans=False),
+        ],
+    )
+    _enabled = True
+
+
+def span(op: str, name: str):
+    """Дочерний span текущей транзакции; без DSN — пустой контекст."""
+    if not _enabled:
+        return nullcontext()
+    return sentry_sdk.start_span(op=op, name=name)
+
+
+def traced(op: str, name: str = None):
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not _enabled:
+                return await func(*args, **kwargs)
+            with sentry_sdk.start_span(op=op, name=span_name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@functools.lru_cache(maxsize=None)
+def _traced_response_class(response_class):
+    class TracedResponse(response_class):
+        async def __call__(self, scope, receive, send):
+            with sentry_sdk.start_span(op=self.span_op, name=self.span_name):
+                await super().__call__(scope, receive, send)
+
+    TracedResponse.__name__ = TracedResponse.__qualname__ = f"Traced{response_class.__name__}"
+    return TracedResponse
+
+
+def traced_response(response, op: str, name: str):
+    """Span на отправку ответа: тело FileResponse/StreamingResponse читается уже после выхода из обработчика."""
+    if _enabled:
+        response.__class__ = _traced_response_class(type(response))
+        response.span_op, response.span_name = op, name
+    return response
+
+
+def traced_cache(op: str):
+    """Span по соглашениям Sentry Caches: cache.get/cache.put/cache.remove с ключами и попаданием."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, keys, *args, **kwargs):
+            if not _enabled:
+                return await func(self, keys, *args, **kwargs)
+            key_list = [keys] if isinstance(keys, str) else list(keys)
+            with sentry_sdk.start_span(op=op, name=", ".join(key_list)[:200]) as cache_span:
+                cache_span.set_data("cache.key", key_list)
+                result = await func(self, keys, *args, **kwargs)
+                if op == "cache.get":
+                    values = result if isinstance(result, list) else [result]
+                    cache_span.set_data("cache.hit", any(v is not None for v in values))
+                return result
+
+        return wrapper
+
+    return decorator
@@ -10,6 +10,10 @@ class AppointmentType(str, Enum):
     COMPLETED = "ЗАВЕРШЕНО"
     CANCELED = "ОТМЕНЕНО"
 
+class RecurrenceFrequency(str, Enum):
+    DAILY = "ЕЖЕДНЕВНО"
+    WEEKLY = "ЕЖЕНЕДЕЛЬНО"
+
 class PropertyType(str, Enum):
     FLAT = "КВАРТИРА"
     HOUSE = "ДОМ"
@@ -1,24 +1,22 @@
+from collections import Counter
 from typing import List, Optional
+import mimetypes
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from fastapi.responses import FileResponse
+from fastapi.responses import RedirectResponse
 from pathlib import Path
-import uuid
-import os
-import aiofiles
 
 from src.model import UserModel
 from src.properties.dao import PropertyDAO
 from src.properties.schema import PropertyUpdateSchema, PropertyReadSchema, PropertyPhotoResponse
 from src.properties.filter import PropertyFilter
+from src.storage.blobs import blob_store, blob_filename, sha256_from_filename
 from src.users.auth import get_current_user
 from src.cache import cache_manager
+from src.exceptions import AppException
 from src.my_types import PropertyType
 
 router = APIRouter(prefix="/properties", tags=["Недвижимость"])
 
-PROPERTY_PHOTOS_DIR = Path(r"C:\Users\Georgy\PycharmProjects\pythonProject\VKR\property_photos")
-PROPERTY_PHOTOS_DIR.mkdir(parents=True, exist_ok=True)
-
 ALLOWED_IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
 MAX_PHOTO_SIZE = 5 * 1024 * 1024  # 5 MB
 
@@ -31,11 +29,6 @@ def is_allowed_image(filename: str) -> bool:
     return get_file_extension(filename) in ALLOWED_IMAGE_EXTENSIONS
 
 
-def generate_unique_photo_name(original_filename: str) -> str:
-    ext = get_file_extension(original_filename)
-    return f"{uuid.uuid4()}{ext}"
-
-
 async def save_uploaded_file(file: UploadFile) -> str:
     if not file.filename:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Имя файла не указано")
@@ -46,33 +39,23 @@ async def save_uploaded_file(file: UploadFile) -> str:
             detail=f"Недопустимый формат. Разрешены: {', '.join(ALLOWED_IMAGE_EXTENSIONS)}"
         )
     
-    unique_filename = generate_unique_photo_name(file.filename)
-    file_path = PROPERTY_PHOTOS_DIR / unique_filename
-    
-    file_size = 0
     try:
-        async with aiofiles.open(file_path, 'wb') as f:
-            while chunk := await file.read(8192):
-                file_size += len(chunk)
-                if file_size > MAX_PHOTO_SIZE:
-                    raise HTTPException(
-                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                        detail=f"Размер файла превышает {MAX_PHOTO_SIZE / (1024*1024)} МБ"
-                    )
-                await f.write(chunk)
-    except HTTPException:
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        blob = await blob_store.save(file, MAX_PHOTO_SIZE)
+    except AppException:
         raise
     except Exception as e:
-        if os.path.exists(file_path):
-            os.remove(file_path)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка при сохранении файла: {str(e)}"
         )
     
-    return unique_filename
+    return blob_filename(blob.sha256, file.filename)
+
+
+async def release_photos(photo_names: List[str]) -> None:
+    await blob_store.release_many(
+        sha256 for sha256 in map(sha256_from_filename, photo_names) if sha256
+    )
 
 
 @router.get("/", response_model=List[PropertyReadSchema])
@@ -144,11 +127,8 @@ async def create_property(
             try:
                 photo_name = await save_uploaded_file(photo)
                 photo_names.append(photo_name)
-            except Exception as e:
-                for saved_photo in photo_names:
-                    photo_path = PROPERTY_PHOTOS_DIR / saved_photo
-                    if photo_path.exists():
-                        os.remove(photo_path)
+            except Exception:
+                await release_photos(photo_names)
                 raise
     
     property_dict = {
@@ -166,11 +146,8 @@ async def create_property(
     
     try:
         new_property = await PropertyDAO.add(**property_dict)
-    except Exception as e:
-        for photo in photo_names:
-            photo_path = PROPERTY_PHOTOS_DIR / photo
-            if photo_path.exists():
-                os.remove(photo_path)
+    except Exception:
+        await release_photos(photo_names)
         raise
     
     if cache_manager.redis:
@@ -186,8 +163,29 @@ async def update_property(id: int, payload: PropertyUpdateSchema, current_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Объект недвижимости не найден")
     
     update_data = payload.model_dump(exclude_unset=True)
+    
+    retained: List[str] = []
+    released_photos: List[str] = []
+    if "photos" in update_data:
+        new_photos = update_data["photos"] or []
+        added = Counter(new_photos) - Counter(property_obj.photos or [])
+        released_photos = list((Counter(property_obj.photos or []) - Counter(new_photos)).elements())
+        
+        for photo in added.elements():
+            sha256 = sha256_from_filename(photo)
+            if not sha256 or not await blob_store.retain(sha256):
+                await release_photos(retained)
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Фото {photo} не найдено")
+            retained.append(photo)
+    
     if update_data:
-        await PropertyDAO.update(filter_by={"id": id}, values=update_data)
+        try:
+            await PropertyDAO.update(filter_by={"id": id}, values=update_data)
+        except Exception:
+            await release_photos(retained)
+            raise
+    
+    await release_photos(released_photos)
     
     if cache_manager.redis:
         await cache_manager.delete(f"properties:id:{id}")
@@ -203,17 +201,11 @@ async def delete_property(id: int, current_user: UserModel = Depends(get_current
     if not property_obj:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Объект недвижимости не найден")
     
-    if property_obj.photos:
-        for photo in property_obj.photos:
-            photo_path = PROPERTY_PHOTOS_DIR / photo
-            if photo_path.exists():
-                try:
-                    os.remove(photo_path)
-                except Exception as e:
-                    print(f"Ошибка удаления фото {photo}: {e}")
-    
     await PropertyDAO.delete(id=id)
     
+    if property_obj.photos:
+        await release_photos(property_obj.photos)
+    
     if cache_manager.redis:
         await cache_manager.delete(f"properties:id:{id}")
         await cache_manager.delete(f"properties:user:{current_user.id}")
@@ -236,10 +228,14 @@ async def upload_property_photo(
     current_photos = property_obj.photos or []
     current_photos.append(photo_name)
     
-    await PropertyDAO.update(
-        filter_by={"id": property_id},
-        values={"photos": current_photos}
-    )
+    try:
+        await PropertyDAO.update(
+            filter_by={"id": property_id},
+            values={"photos": current_photos}
+        )
+    except Exception:
+        await release_photos([photo_name])
+        raise
     
     if cache_manager.redis:
         await cache_manager.delete(f"properties:id:{property_id}")
@@ -261,11 +257,20 @@ async def get_property_photo(property_id: int, photo_name: str, current_user: Us
     if not property_obj.photos or photo_name not in property_obj.photos:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Фото не найдено")
     
-    photo_path = PROPERTY_PHOTOS_DIR / photo_name
-    if not photo_path.exists():
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Файл не найден на диске")
+    sha256 = sha256_from_filename(photo_name)
+    if not sha256:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Файл не найден в хранилище")
+    
+    media_type, _ = mimetypes.guess_type(photo_name)
     
-    return FileResponse(photo_path)
+    url = await blob_store.presigned_url(sha256, media_type=media_type)
+    if url:
+        return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+    
+    try:
+        return await blob_store.response(sha256, media_type=media_type)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Файл не найден в хранилище")
 
 
 @router.delete("/{property_id}/photos/{photo_name}", status_code=status.HTTP_200_OK)
@@ -282,13 +287,6 @@ async def delete_property_photo(
     if not property_obj.photos or photo_name not in property_obj.photos:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Фото не найдено")
     
-    photo_path = PROPERTY_PHOTOS_DIR / photo_name
-    if photo_path.exists():
-        try:
-            os.remove(photo_path)
-        except Exception as e:
-            print(f"Ошибка удаления файла: {e}")
-
     current_photos = property_obj.photos.copy()
     current_photos.remove(photo_name)
     
@@ -296,6 +294,8 @@ async def delete_property_photo(
         filter_by={"id": property_id},
         values={"photos": current_photos}
     )
+    
+    await release_photos([photo_name])
 
     if cache_manager.redis:
         await cache_manager.delete(f"properties:id:{property_id}")
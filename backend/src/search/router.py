@@ -0,0 +1,23 @@
+from typing import List
+from fastapi import APIRouter, Depends, Query
+
+from src.model import UserModel
+from src.search import service as search_service
+from src.search.schema import SearchResultSchema
+from src.users.auth import get_current_user
+
+router = APIRouter(prefix="/search", tags=["Поиск"])
+
+
+@router.get("", response_model=List[SearchResultSchema])
+async def typeahead_search(
+    q: str = Query(..., min_length=search_service.MIN_QUERY_LENGTH, max_length=100),
+    limit: int = Query(10, ge=1, le=25),
+    current_user: UserModel = Depends(get_current_user)
+):
+    q = search_service.normalize_query(q)
+    if len(q) < search_service.MIN_QUERY_LENGTH:
+        return []
+    
+    rows = await search_service.typeahead(current_user.id, q, limit)
+    return [SearchResultSchema.model_validate(row) for row in rows]
@@ -0,0 +1,10 @@
+from typing import Literal, Optional
+from pydantic import BaseModel
+
+
+class SearchResultSchema(BaseModel):
+    type: Literal["client", "property", "deal"]
+    id: int
+    title: str
+    subtitle: Optional[str] = None
+    score: float
@@ -0,0 +1,149 @@
+import re
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import String, cast, func, literal, literal_column, select, union_all
+
+from src.cache import cache_manager
+from src.database import new_session
+from src.model import ClientModel, DealModel, PropertyModel
+
+MIN_QUERY_LENGTH = 3
+CACHE_EXPIRE = 30
+
+# Выражения должны совпадать с trigram-индексами из миграции, иначе планировщик их не использует
+CLIENT_TEXT = literal_column(
+    "lower(clients.last_name || ' ' || clients.first_name || ' ' || clients.phone_number || ' ' || clients.email)",
+    String,
+)
+PROPERTY_TEXT = literal_column("lower(properties.address)", String)
+DEAL_TEXT = literal_column("lower(coalesce(deals.buyer_name, '') || ' ' || coalesce(deals.seller_name, ''))", String)
+
+PHONE_RE = re.compile(r"^[\d\s()+-]+$")
+WORD_RE = re.compile(r"[^\W_]+")
+
+
+def normalize_query(q: str) -> str:
+    q = " ".join(q.lower().split())
+    # Фрагмент телефона ищется без пробелов, скобок и дефисов, как он хранится в базе
+    if PHONE_RE.match(q) and any(c.isdigit() for c in q):
+        q = "".join(c for c in q if c.isdigit())
+    return q
+
+
+def _trigrams(value: str) -> set:
+    result = set()
+    for word in WORD_RE.findall(value.lower()):
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def similarity(a: str, b: str) -> float:
+    """То же, что similarity() из pg_trgm: доля общих триграмм."""
+    ta, tb = _trigrams(a), _trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    common = len(ta & tb)
+    return common / (len(ta) + len(tb) - common)
+
+
+def _matches(haystack, q: str):
+    return haystack.contains(q, autoescape=True), func.similarity(haystack, q).label("score")
+
+
+async def _query(user_id: int, q: str, limit: int) -> List[Dict[str, Any]]:
+    clients_where, clients_score = _matches(CLIENT_TEXT, q)
+    clients = (
+        select(
+            literal("client").label("type"),
+            ClientModel.id,
+            func.concat_ws(" ", ClientModel.last_name, ClientModel.first_name).label("title"),
+            ClientModel.phone_number.label("subtitle"),
+            CLIENT_TEXT.label("haystack"),
+            clients_score,
+        )
+        .where(ClientModel.user_id == user_id, clients_where)
+        .order_by(clients_score.desc(), ClientModel.id)
+        .limit(limit)
+    )
+
+    properties_where, properties_score = _matches(PROPERTY_TEXT, q)
+    properties = (
+        select(
+            literal("property").label("type"),
+            PropertyModel.id,
+            PropertyModel.address.label("title"),
+            cast(PropertyModel.type, String).label("subtitle"),
+            PROPERTY_TEXT.label("haystack"),
+            properties_score,
+        )
+        .join(ClientModel, PropertyModel.owner_id == ClientModel.id)
+        .where(ClientModel.user_id == user_id, properties_where)
+        .order_by(properties_score.desc(), PropertyModel.id)
+        .limit(limit)
+    )
+
+    deals_where, deals_score = _matches(DEAL_TEXT, q)
+    deals = (
+        select(
+            literal("deal").label("type"),
+            DealModel.id,
+            func.concat_ws(" — ", DealModel.buyer_name, DealModel.seller_name).label("title"),
+            cast(DealModel.operation_type, String).label("subtitle"),
+            DEAL_TEXT.label("haystack"),
+            deals_score,
+        )
+        .where(DealModel.user_id == user_id, deals_where)
+        .order_by(deals_score.desc(), DealModel.id)
+        .limit(limit)
+    )
+
+    async with new_session() as s:
+        parts = [query.subquery() for query in (clients, properties, deals)]
+        result = await s.execute(union_all(*(select(part) for part in parts)))
+        return [dict(row) for row in result.mappings().all()]
+
+
+def _cache_key(user_id: int, q: str, limit: int) -> str:
+    return f"search:user:{user_id}:{limit}:{q}"
+
+
+def _from_prefix(entry: Dict[str, Any], q: str) -> List[Dict[str, Any]]:
+    rows = []
+    for row in entry["rows"]:
+        if q in row["haystack"]:
+            rows.append({**row, "score": similarity(row["haystack"], q)})
+    return rows
+
+
+def _rank(rows: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    return sorted(rows, key=lambda r: (-r["score"], r["type"], r["id"]))[:limit]
+
+
+async def typeahead(user_id: int, q: str, limit: int) -> List[Dict[str, Any]]:
+    """Быстрый поиск по клиентам, объектам и сделкам агента.
+
+    Результат кэшируется ненадолго. Если для более короткого префикса запроса
+    в кэше лежит полный (не обрезанный лимитом) результат, то совпадения для
+    продолжения запроса — его подмножество, и в базу идти не нужно.
+    """
+    keys = [_cache_key(user_id, q[:length], limit) for length in range(len(q), MIN_QUERY_LENGTH - 1, -1)]
+    cached = await cache_manager.get_many(keys)
+
+    if cached[0] is not None:
+        return _rank(cached[0]["rows"], limit)
+
+    rows: Optional[List[Dict[str, Any]]] = None
+    for entry in cached[1:]:
+        if entry is not None and entry["complete"]:
+            rows = _from_prefix(entry, q)
+            break
+
+    if rows is None:
+        rows = await _query(user_id, q, limit)
+        complete = all(sum(1 for r in rows if r["type"] == t) < limit for t in ("client", "property", "deal"))
+    else:
+        complete = True
+
+    await cache_manager.set(keys[0], {"rows": rows, "complete": complete}, expire=CACHE_EXPIRE)
+    return _rank(rows, limit)
@@ -0,0 +1,78 @@
+"""Запуск в продакшене: python -m src.serve
+
+Для разработки с перезагрузкой — python -m src.main.
+"""
+import glob
+import logging
+import os
+import tempfile
+from importlib.util import find_spec
+
+import uvicorn
+
+from src.config import settings
+from src.monitoring.logs import setup_logging
+
+logger = logging.getLogger("src.serve")
+
+
+def worker_count() -> int:
+    """Приложение асинхронное, поэтому один воркер на доступное ядро, а не 2 * CPU + 1."""
+    if settings.SERVER_WORKERS:
+        return settings.SERVER_WORKERS
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def implementation(module: str) -> str:
+    if find_spec(module) is not None:
+        return module
+    logger.warning("%s не установлен, используется реализация по умолчанию", module)
+    return "auto"
+
+
+def prepare_metrics_dir(workers: int) -> None:
+    """У каждого воркера свой реестр Prometheus — /metrics собирает их из общего каталога.
+
+    Каталог задаётся до запуска воркеров и очищается от файлов прошлого запуска.
+    """
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory is None:
+        if workers == 1:
+            return
+        directory = os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="vkr-metrics-")
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "*.db")):
+        os.remove(path)
+
+
+def main() -> None:
+    setup_logging()
+    workers = worker_count()
+    prepare_metrics_dir(workers)
+    logger.info("Запуск на %s:%s, воркеров: %s", settings.SERVER_HOST, settings.SERVER_PORT, workers)
+    # По SIGTERM uvicorn перестаёт принимать соединения, ждёт текущие запросы до
+    # SERVER_GRACEFUL_TIMEOUT секунд и затем выполняет shutdown lifespan — закрытие пулов
+    uvicorn.run(
+        "src.main:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=workers,
+        loop=implementation("uvloop"),
+        http=implementation("httptools"),
+        backlog=settings.SERVER_BACKLOG,
+        # Дольше простоя балансировщика (обычно 60 с), иначе он получит разрыв соединения
+        timeout_keep_alive=settings.SERVER_KEEPALIVE,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+        proxy_headers=True,
+        server_header=False,
+        # Логирование настраивает приложение, строки доступа пишет AccessLogMiddleware
+        log_config=None,
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Tuple
+
+from starlette.responses import Response
+
+CHUNK_SIZE = 64 * 1024
+
+# Минимальный размер части multipart-загрузки в S3 (кроме последней)
+PART_SIZE = 8 * 1024 * 1024
+
+
+class StorageBackend(ABC):
+    """Хранилище файлов по ключам вида `ab/cd/<имя>`."""
+
+    async def connect(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    @abstractmethod
+    async def put_file(self, key: str, path: Path) -> None:
+        """Переносит локальный файл в хранилище; исходный файл после этого не существует."""
+
+    @abstractmethod
+    async def put_stream(self, key: str, chunks: AsyncIterator[bytes]) -> int:
+        ...
+
+    @abstractmethod
+    def get_stream(self, key: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        ...
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def size(self, key: str) -> Optional[int]:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def create_multipart(self, key: str) -> str:
+        ...
+
+    @abstractmethod
+    async def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        ...
+
+    @abstractmethod
+    async def complete_multipart(self, key: str, upload_id: str, parts: List[Tuple[int, str]]) -> None:
+        ...
+
+    @abstractmethod
+    async def abort_multipart(self, key: str, upload_id: str) -> None:
+        ...
+
+    @abstractmethod
+    async def response(
+        self,
+        key: str,
+        filename: Optional[str] = None,
+        media_type: Optional[str] = None,
+    ) -> Response:
+        """Ответ с содержимым файла. Если файла нет, выбрасывает FileNotFoundError."""
+
+    async def presigned_url(
+        self,
+        key: str,
+        filename: Optional[str] = None,
+        media_type: Optional[str] = None,
+        expires: int = 300,
+    ) -> Optional[str]:
+        """Прямая ссылка на скачивание в обход API; None, если хранилище их не выдаёт."""
+        return None
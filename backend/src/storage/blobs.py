@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Optional
+
+import aiofiles
+from fastapi import UploadFile
+from starlette.responses import Response
+
+from src.config import settings
+from src.exceptions import PayloadTooLargeException
+from src.monitoring.tracing import traced, traced_response
+from src.storage.base import CHUNK_SIZE, StorageBackend
+from src.storage.dao import BlobDAO
+from src.storage.executor import io_executor, run_io
+from src.storage.factory import storage
+
+logger = logging.getLogger(__name__)
+
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+REAP_BATCH_SIZE = 100
+
+
+def blob_key(sha256: str) -> str:
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def blob_filename(sha256: str, original_filename: str) -> str:
+    return f"{sha256}{Path(original_filename).suffix.lower()}"
+
+
+def sha256_from_filename(filename: str) -> str | None:
+    stem = Path(filename).stem
+    return stem if SHA256_RE.match(stem) else None
+
+
+@dataclass
+class StoredBlob:
+    sha256: str
+    size: int
+    created: bool
+
+    @property
+    def key(self) -> str:
+        return blob_key(self.sha256)
+
+
+class BlobStore:
+    """Контентно-адресуемое хранилище: каждый файл хранится один раз под `ab/cd/<sha256>`.
+
+    Загрузка хешируется по мере записи в локальный staging-файл, который затем
+    переносится в бэкенд хранения (локальный диск или S3).
+    """
+
+    def __init__(self, backend: StorageBackend, staging_dir: Path):
+        self.backend = backend
+        self.staging_dir = staging_dir
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+
+    @traced("file.write", "blob.save")
+    async def save(self, file: UploadFile, max_size: int) -> StoredBlob:
+        hasher = hashlib.sha256()
+        size = 0
+        tmp_path = self.staging_dir / f"{uuid.uuid4()}.part"
+
+        try:
+            async with aiofiles.open(tmp_path, 'wb', executor=io_executor) as f:
+                while chunk := await file.read(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_size:
+                        raise PayloadTooLargeException(
+                            f"Файл слишком большой. Максимальный размер: {max_size / (1024*1024)} МБ"
+                        )
+                    hasher.update(chunk)
+                    await f.write(chunk)
+
+            return await self.commit_staged(tmp_path, hasher.hexdigest(), size)
+        finally:
+            await run_io(tmp_path.unlink, missing_ok=True)
+
+    @traced("file.write", "blob.commit")
+    async def commit_staged(self, tmp_path: Path, sha256: str, size: int) -> StoredBlob:
+        """Регистрирует ссылку на уже захешированный staging-файл и переносит его в хранилище."""
+        await BlobDAO.acquire(sha256, size)
+
+        # Дубликат: содержимое уже лежит в хранилище, повторной записи нет
+        key = blob_key(sha256)
+        if await self.backend.exists(key):
+            await run_io(tmp_path.unlink, missing_ok=True)
+            return StoredBlob(sha256=sha256, size=size, created=False)
+
+        try:
+            await self.backend.put_file(key, tmp_path)
+        except BaseException:
+            await self.release(sha256)
+            raise
+        return StoredBlob(sha256=sha256, size=size, created=True)
+
+    def stream(self, sha256: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        return self.backend.get_stream(blob_key(sha256), chunk_size)
+
+    async def restore(self, sha256: str, path: Path) -> None:
+        """Копирует содержимое блоба обратно в локальный файл — откат commit_staged."""
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.restore")
+        try:
+            async with aiofiles.open(tmp_path, 'wb', executor=io_executor) as f:
+                async for chunk in self.stream(sha256):
+                    await f.write(chunk)
+            await run_io(os.replace, tmp_path, path)
+        finally:
+            await run_io(tmp_path.unlink, missing_ok=True)
+
+    async def response(
+        self,
+        sha256: str,
+        filename: Optional[str] = None,
+        media_type: Optional[str] = None,
+    ) -> Response:
+        response = await self.backend.response(blob_key(sha256), filename=filename, media_type=media_type)
+        return traced_response(response, "file.serve", "blob.response")
+
+    @traced("file.presign", "blob.presigned_url")
+    async def presigned_url(
+        self,
+        sha256: str,
+        filename: Optional[str] = None,
+        media_type: Optional[str] = None,
+    ) -> Optional[str]:
+        return await self.backend.presigned_url(
+            blob_key(sha256),
+            filename=filename,
+            media_type=media_type,
+            expires=settings.PRESIGNED_URL_EXPIRE,
+        )
+
+    async def retain(self, sha256: str) -> bool:
+        return await BlobDAO.retain(sha256)
+
+    async def release(self, sha256: str) -> bool:
+        return await BlobDAO.release(sha256)
+
+    async def release_many(self, sha256_list: Iterable[str]) -> int:
+        return await BlobDAO.release_many(sha256_list)
+
+    async def reap(self, limit: int = REAP_BATCH_SIZE) -> int:
+        async def purge(sha256: str) -> None:
+            await self.backend.delete(blob_key(sha256))
+
+        return await BlobDAO.reap(purge, limit)
+
+    async def run_reaper(self) -> None:
+        """Фоновое физическое удаление: ответ на удаление не ждёт работы с хранилищем."""
+        while True:
+            try:
+                while await self.reap() == REAP_BATCH_SIZE:
+                    pass
+            except Exception:
+                logger.exception("Ошибка удаления неиспользуемых блобов")
+            await asyncio.sleep(settings.BLOB_REAPER_INTERVAL)
+
+
+blob_store = BlobStore(storage, Path(settings.STORAGE_DIR) / "staging")
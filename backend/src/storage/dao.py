@@ -0,0 +1,108 @@
+import logging
+from collections import Counter
+from typing import Awaitable, Callable, Iterable
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from src.dao.base import BaseDAO
+from src.model import BlobModel
+from src.database import new_session
+
+logger = logging.getLogger(__name__)
+
+
+class BlobDAO(BaseDAO):
+    model = BlobModel
+
+    @classmethod
+    async def acquire(cls, sha256: str, size: int) -> int:
+        """Добавляет ссылку на блоб, создавая запись при первой загрузке."""
+        async with new_session() as s:
+            stmt = (
+                insert(cls.model)
+                .values(sha256=sha256, size=size, ref_count=1)
+                .on_conflict_do_update(
+                    index_elements=[cls.model.sha256],
+                    set_={"ref_count": cls.model.ref_count + 1},
+                )
+                .returning(cls.model.ref_count)
+            )
+            result = await s.execute(stmt)
+            await s.commit()
+            return result.scalar_one()
+
+    @classmethod
+    async def retain(cls, sha256: str) -> bool:
+        async with new_session() as s:
+            stmt = (
+                update(cls.model)
+                .where(cls.model.sha256 == sha256)
+                .values(ref_count=cls.model.ref_count + 1)
+            )
+            result = await s.execute(stmt)
+            await s.commit()
+            return result.rowcount > 0
+
+    @classmethod
+    async def release(cls, sha256: str) -> bool:
+        """Снимает ссылку на блоб; возвращает True, если ссылок не осталось.
+
+        Запись с нулевым счётчиком и сам файл удаляет позже `reap`.
+        """
+        return await cls.release_many([sha256]) > 0
+
+    @classmethod
+    async def release_many(cls, sha256_list: Iterable[str]) -> int:
+        """Снимает по ссылке за каждое вхождение; возвращает число блобов без ссылок."""
+        counts = Counter(sha256_list)
+        if not counts:
+            return 0
+
+        async with new_session() as s:
+            async with s.begin():
+                released = 0
+                # Фиксированный порядок блокировок строк
+                for sha256, count in sorted(counts.items()):
+                    result = await s.execute(
+                        update(cls.model)
+                        .where(cls.model.sha256 == sha256, cls.model.ref_count > 0)
+                        .values(ref_count=func.greatest(cls.model.ref_count - count, 0))
+                        .returning(cls.model.ref_count)
+                    )
+                    if result.scalar_one_or_none() == 0:
+                        released += 1
+        return released
+
+    @classmethod
+    async def reap(cls, purge: Callable[[str], Awaitable[None]], limit: int) -> int:
+        """Удаляет блобы без ссылок вместе с файлами.
+
+        `purge` вызывается до коммита: пока строка заблокирована, параллельная загрузка
+        того же содержимого ждёт и после коммита создаёт блоб заново. Блобы, которые
+        подхватила новая ссылка, заблокированы загрузкой или уже обнуляются другим
+        воркером, пропускаются.
+        """
+        async with new_session() as s:
+            async with s.begin():
+                result = await s.execute(
+                    select(cls.model.sha256)
+                    .where(cls.model.ref_count == 0)
+                    .limit(limit)
+                    .with_for_update(skip_locked=True)
+                )
+                candidates = list(result.scalars().all())
+
+                purged = []
+                for sha256 in candidates:
+                    try:
+                        await purge(sha256)
+                    except Exception:
+                        logger.exception("Ошибка удаления файла блоба %s", sha256)
+                        continue
+                    purged.append(sha256)
+
+                if purged:
+                    await s.execute(
+                        delete(cls.model).where(cls.model.sha256.in_(purged), cls.model.ref_count == 0)
+                    )
+        return len(candidates)
@@ -0,0 +1,49 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from src.config import settings
+
+T = TypeVar("T")
+
+
+class IOExecutor(Executor):
+    """Пул потоков, который после shutdown создаётся заново при следующей задаче.
+
+    Модули держат ссылку на io_executor, а lifespan в тестах и бенчмарках перезапускается.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> Future:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix=self.thread_name_prefix)
+            return self._pool.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+# Отдельный ограниченный пул для блокирующей работы с файлами: медленный диск
+# не занимает общий пул потоков, которым пользуются FastAPI и драйверы
+io_executor = IOExecutor(max_workers=settings.STORAGE_IO_WORKERS, thread_name_prefix="storage-io")
+
+
+async def run_io(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_executor, functools.partial(func, *args, **kwargs))
+
+
+async def shutdown_io() -> None:
+    # Ожидание текущих операций с диском не должно останавливать цикл событий
+    await asyncio.to_thread(io_executor.shutdown, wait=True, cancel_futures=True)
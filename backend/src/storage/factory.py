@@ -0,0 +1,27 @@
+from importlib.util import find_spec
+from pathlib import Path
+
+from src.config import settings
+from src.storage.base import StorageBackend
+
+
+def create_storage() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "s3":
+        if find_spec("aiobotocore") is None:
+            raise RuntimeError("Для STORAGE_BACKEND=s3 нужен пакет aiobotocore: pip install aiobotocore")
+        from src.storage.s3 import S3Storage
+
+        return S3Storage(
+            bucket=settings.S3_BUCKET,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            access_key=settings.S3_ACCESS_KEY,
+            secret_key=settings.S3_SECRET_KEY,
+            region=settings.S3_REGION,
+        )
+
+    from src.storage.local import LocalStorage
+
+    return LocalStorage(Path(settings.STORAGE_DIR) / "blobs")
+
+
+storage = create_storage()
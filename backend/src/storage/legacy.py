@@ -0,0 +1,49 @@
+"""Удаление исходных файлов, скопированных миграцией 763fd48c70e4 в хранилище блобов.
+
+Запуск из каталога backend после успешного `alembic upgrade`:
+
+    python -m src.storage.legacy
+
+Файл удаляется, только если его блоб есть в хранилище; запись legacy_files удаляется вместе с ним,
+поэтому повторный запуск безопасен.
+"""
+import asyncio
+from pathlib import Path
+
+from sqlalchemy import delete, select
+
+from src.database import engine, new_session
+from src.model import LegacyFileModel
+from src.storage.blobs import blob_key
+from src.storage.executor import run_io, shutdown_io
+from src.storage.factory import storage
+
+
+async def remove_legacy_files() -> int:
+    removed = 0
+    async with new_session() as s:
+        legacy_files = (await s.execute(select(LegacyFileModel))).scalars().all()
+        for legacy in legacy_files:
+            if not await storage.exists(blob_key(legacy.sha256)):
+                print(f"Блоб {legacy.sha256} для {legacy.path} не найден в хранилище, файл оставлен")
+                continue
+            await run_io(Path(legacy.path).unlink, missing_ok=True)
+            await s.execute(delete(LegacyFileModel).where(LegacyFileModel.path == legacy.path))
+            await s.commit()
+            removed += 1
+    return removed
+
+
+async def main() -> None:
+    await storage.connect()
+    try:
+        removed = await remove_legacy_files()
+        print(f"Удалено исходных файлов: {removed}")
+    finally:
+        await storage.close()
+        await shutdown_io()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Tuple
+
+import aiofiles
+from fastapi.responses import FileResponse
+from starlette.responses import Response
+
+from src.storage.base import CHUNK_SIZE, StorageBackend
+from src.storage.executor import io_executor, run_io
+
+
+def _move(src: Path, target: Path, tmp_dir: Path) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        # На одном устройстве — атомарное переименование без копирования данных
+        os.replace(src, target)
+    except OSError:
+        # Файл на другом устройстве: копируем во временный файл рядом и переименовываем
+        tmp_path = tmp_dir / f"{uuid.uuid4()}.part"
+        try:
+            shutil.copyfile(src, tmp_path)
+            os.replace(tmp_path, target)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        src.unlink(missing_ok=True)
+
+
+def _size(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return None
+
+
+def _concat_parts(parts_dir: Path, part_numbers: List[int], out_path: Path) -> None:
+    with open(out_path, 'wb') as out:
+        for part_number in part_numbers:
+            with open(parts_dir / f"{part_number:05d}", 'rb') as part:
+                shutil.copyfileobj(part, out)
+
+
+class LocalStorage(StorageBackend):
+    """Хранилище на локальной (или общей сетевой) файловой системе."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.tmp_dir = root / ".tmp"
+        self.multipart_dir = root / ".multipart"
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(exist_ok=True)
+        self.multipart_dir.mkdir(exist_ok=True)
+
+    def path(self, key: str) -> Path:
+        # Проверка без обращения к диску: ключ не может выходить за пределы корня
+        relative = Path(key)
+        if relative.is_absolute() or ".." in relative.parts:
+            raise ValueError(f"Недопустимый ключ: {key}")
+        return self.root / relative
+
+    async def put_file(self, key: str, path: Path) -> None:
+        await run_io(_move, path, self.path(key), self.tmp_dir)
+
+    async def put_stream(self, key: str, chunks: AsyncIterator[bytes]) -> int:
+        tmp_path = self.tmp_dir / f"{uuid.uuid4()}.part"
+        size = 0
+        try:
+            async with aiofiles.open(tmp_path, 'wb', executor=io_executor) as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    await f.write(chunk)
+            await self.put_file(key, tmp_path)
+        finally:
+            await run_io(tmp_path.unlink, missing_ok=True)
+        return size
+
+    async def get_stream(self, key: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        async with aiofiles.open(self.path(key), 'rb', executor=io_executor) as f:
+            while chunk := await f.read(chunk_size):
+                yield chunk
+
+    async def exists(self, key: str) -> bool:
+        return await run_io(self.path(key).is_file)
+
+    async def size(self, key: str) -> Optional[int]:
+        return await run_io(_size, self.path(key))
+
+    async def delete(self, key: str) -> None:
+        await run_io(self.path(key).unlink, missing_ok=True)
+
+    def _parts_dir(self, upload_id: str) -> Path:
+        return self.multipart_dir / uuid.UUID(upload_id).hex
+
+    async def create_multipart(self, key: str) -> str:
+        upload_id = str(uuid.uuid4())
+        await run_io(self._parts_dir(upload_id).mkdir)
+        return upload_id
+
+    async def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        part_path = self._parts_dir(upload_id) / f"{part_number:05d}"
+        async with aiofiles.open(part_path, 'wb', executor=io_executor) as f:
+            await f.write(data)
+        return str(part_number)
+
+    async def complete_multipart(self, key: str, upload_id: str, parts: List[Tuple[int, str]]) -> None:
+        parts_dir = self._parts_dir(upload_id)
+        tmp_path = self.tmp_dir / f"{uuid.uuid4()}.part"
+        try:
+            await run_io(_concat_parts, parts_dir, [number for number, _ in sorted(parts)], tmp_path)
+            await self.put_file(key, tmp_path)
+        finally:
+            await run_io(tmp_path.unlink, missing_ok=True)
+        await run_io(shutil.rmtree, parts_dir, ignore_errors=True)
+
+    async def abort_multipart(self, key: str, upload_id: str) -> None:
+        await run_io(shutil.rmtree, self._parts_dir(upload_id), ignore_errors=True)
+
+    async def response(
+        self,
+        key: str,
+        filename: Optional[str] = None,
+        media_type: Optional[str] = None,
+    ) -> Response:
+        path = self.path(key)
+        if not await run_io(path.is_file):
+            raise FileNotFoundError(key)
+        return FileResponse(path=path, filename=filename, media_type=media_type)
@@ -0,0 +1,189 @@
+from pathlib import Path
+from typing import Any, AsyncIterator, List, Optional, Tuple
+from urllib.parse import quote
+
+import aiofiles
+from fastapi.responses import StreamingResponse
+from starlette.responses import Response
+
+from src.storage.base import CHUNK_SIZE, PART_SIZE, StorageBackend
+from src.storage.executor import io_executor, run_io
+
+
+class S3Storage(StorageBackend):
+    """Хранилище в S3-совместимом сервисе (AWS S3, MinIO).
+
+    Требует пакет aiobotocore; локально проверяется на MinIO:
+    `docker run -p 9000:9000 minio/minio server /data`.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str] = None,
+        access_key: Optional[str] = None,
+        secret_key: Optional[str] = None,
+        region: str = "us-east-1",
+    ):
+        self.bucket = bucket
+        self.endpoint_url = endpoint_url
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self._client_cm: Any = None
+        self.client: Any = None
+
+    async def connect(self) -> None:
+        from aiobotocore.config import AioConfig
+        from aiobotocore.session import get_session
+
+        self._client_cm = get_session().create_client(
+            's3',
+            endpoint_url=self.endpoint_url,
+            aws_access_key_id=self.access_key,
+            aws_secret_access_key=self.secret_key,
+            region_name=self.region,
+            config=AioConfig(signature_version='s3v4', s3={'addressing_style': 'path'}),
+        )
+        self.client = await self._client_cm.__aenter__()
+
+        try:
+            await self.client.head_bucket(Bucket=self.bucket)
+        except self.client.exceptions.ClientError:
+            await self.client.create_bucket(Bucket=self.bucket)
+
+    async def close(self) -> None:
+        if self._client_cm:
+            await self._client_cm.__aexit__(None, None, None)
+            self._client_cm = None
+            self.client = None
+
+    async def put_file(self, key: str, path: Path) -> None:
+        async def chunks() -> AsyncIterator[bytes]:
+            async with aiofiles.open(path, 'rb', executor=io_executor) as f:
+                while chunk := await f.read(PART_SIZE):
+                    yield chunk
+
+        await self.put_stream(key, chunks())
+        await run_io(path.unlink, missing_ok=True)
+
+    async def put_stream(self, key: str, chunks: AsyncIterator[bytes]) -> int:
+        buffer = bytearray()
+        size = 0
+        upload_id: Optional[str] = None
+        parts: List[Tuple[int, str]] = []
+
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                buffer.extend(chunk)
+                if len(buffer) >= PART_SIZE:
+                    if upload_id is None:
+                        upload_id = await self.create_multipart(key)
+                    etag = await self.upload_part(key, upload_id, len(parts) + 1, bytes(buffer))
+                    parts.append((len(parts) + 1, etag))
+                    buffer.clear()
+
+            if upload_id is None:
+                await self.client.put_object(Bucket=self.bucket, Key=key, Body=bytes(buffer))
+                return size
+
+            if buffer:
+                etag = await self.upload_part(key, upload_id, len(parts) + 1, bytes(buffer))
+                parts.append((len(parts) + 1, etag))
+            await self.complete_multipart(key, upload_id, parts)
+        except BaseException:
+            if upload_id is not None:
+                await self.abort_multipart(key, upload_id)
+            raise
+        return size
+
+    async def get_stream(self, key: str, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+        try:
+            obj = await self.client.get_object(Bucket=self.bucket, Key=key)
+        except self.client.exceptions.NoSuchKey:
+            raise FileNotFoundError(key)
+
+        async with obj['Body'] as body:
+            while chunk := await body.read(chunk_size):
+                yield chunk
+
+    async def _head(self, key: str) -> Optional[dict]:
+        try:
+            return await self.client.head_object(Bucket=self.bucket, Key=key)
+        except self.client.exceptions.ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    async def exists(self, key: str) -> bool:
+        return await self._head(key) is not None
+
+    async def size(self, key: str) -> Optional[int]:
+        head = await self._head(key)
+        return head['ContentLength'] if head else None
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    async def create_multipart(self, key: str) -> str:
+        result = await self.client.create_multipart_upload(Bucket=self.bucket, Key=key)
+        return result['UploadId']
+
+    async def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        result = await self.client.upload_part(
+            Bucket=self.bucket,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=data,
+        )
+        return result['ETag']
+
+    async def complete_multipart(self, key: str, upload_id: str, parts: List[Tuple[int, str]]) -> None:
+        await self.client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={
+                'Parts': [{'PartNumber': number, 'ETag': etag} for number, etag in sorted(parts)]
+            },
+        )
+
+    async def abort_multipart(self, key: str, upload_id: str) -> None:
+        await self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+
+    async def response(
+        self,
+        key: str,
+        filename: Optional[str] = None,
+        media_type: Optional[str] = None,
+    ) -> Response:
+        try:
+            obj = await self.client.get_object(Bucket=self.bucket, Key=key)
+        except self.client.exceptions.NoSuchKey:
+            raise FileNotFoundError(key)
+
+        async def body() -> AsyncIterator[bytes]:
+            async with obj['Body'] as stream:
+                while chunk := await stream.read(CHUNK_SIZE):
+                    yield chunk
+
+        headers = {"Content-Length": str(obj['ContentLength'])}
+        if filename:
+            headers["Content-Disposition"] = f"attachment; filename*=utf-8''{quote(filename)}"
+        return StreamingResponse(body(), media_type=media_type, headers=headers)
+
+    async def presigned_url(
+        self,
+        key: str,
+        filename: Optional[str] = None,
+        media_type: Optional[str] = None,
+        expires: int = 300,
+    ) -> Optional[str]:
+        params = {'Bucket': self.bucket, 'Key': key}
+        if filename:
+            params['ResponseContentDisposition'] = f"attachment; filename*=utf-8''{quote(filename)}"
+        if media_type:
+            params['ResponseContentType'] = media_type
+        return await self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=expires)
@@ -9,6 +9,8 @@ from src.config import get_auth_data
 from src.model import UserModel
 from src.users.dao import UserDAO
 from src.exceptions import UnauthorizedException, ForbiddenException
+from src.monitoring.logs import bind_user
+from src.monitoring.timing import timed_async
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 auth_data = get_auth_data()
@@ -51,6 +53,7 @@ def get_token(request: Request) -> str:
     return token
 
 
+@timed_async("auth")
 async def get_current_user(token: str = Depends(get_token)) -> UserModel:
     try:
         payload = jwt.decode(token, auth_data['secret_key'], algorithms=[auth_data['algorithm']])
@@ -69,6 +72,7 @@ async def get_current_user(token: str = Depends(get_token)) -> UserModel:
     if not user.is_active:
         raise ForbiddenException('Аккаунт деактивирован')
     
+    bind_user(user.id)
     return user
 
 
@@ -4,6 +4,7 @@ import '../styles/Documents.css';
 
 export const DocumentManager = () => {
   const [documents, setDocuments] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [folders, setFolders] = useState([]);
   const [selectedFolder, setSelectedFolder] = useState(null);
   const [loading, setLoading] = useState(false);
@@ -30,7 +31,23 @@ export const DocumentManager = () => {
       setLoading(true);
       const params = selectedFolder ? { folder: selectedFolder } : {};
       const data = await api.documents.getAll(params);
-      setDocuments(data);
+      setDocuments(data.items);
+      setNextCursor(data.next_cursor);
+      setError('');
+    } catch (err) {
+      setError(err.message);
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  const loadMoreDocuments = async () => {
+    try {
+      setLoading(true);
+      const params = selectedFolder ? { folder: selectedFolder } : {};
+      const data = await api.documents.getAll({ ...params, cursor: nextCursor });
+      setDocuments([...documents, ...data.items]);
+      setNextCursor(data.next_cursor);
       setError('');
     } catch (err) {
       setError(err.message);
@@ -233,6 +250,16 @@ export const DocumentManager = () => {
                 ))}
               </div>
             )}
+
+            {nextCursor && (
+              <button
+                onClick={loadMoreDocuments}
+                className="btn-load-more"
+                disabled={loading}
+              >
+                {loading ? 'Загрузка...' : 'Показать ещё'}
+              </button>
+            )}
           </div>
         </div>
       </div>